@@ -1,16 +1,32 @@
-# # backend/app/config/intent_requirements.py
-# from app.models.intent_model import IntentType
+# backend/app/config/intent_requirements.py
+from app.models.intent_model import IntentType
 
-# # Define required entities for each intent
-# INTENT_REQUIREMENTS = {
-#     IntentType.BOOK_APPOINTMENT: ["patient_name", "doctor_name", "date", "time"],
-#     IntentType.RESCHEDULE_APPOINTMENT: ["patient_name", "date", "new_date", "new_time"],
-#     IntentType.CANCEL_APPOINTMENT: ["patient_name", "date"],  # OR appointment_id
-#     IntentType.QUERY_AVAILABILITY: ["doctor_name", "date"],
-# }
+# Entities each intent needs before the database step can run, in the order we ask for them
+INTENT_REQUIREMENTS = {
+    IntentType.BOOK_APPOINTMENT: ["patient_name", "doctor_name", "date", "time"],
+    IntentType.RESCHEDULE_APPOINTMENT: ["appointment_id", "date", "time"],
+    IntentType.CANCEL_APPOINTMENT: ["appointment_id"],
+    IntentType.QUERY_APPOINTMENT: ["appointment_id"],
+}
 
-# # Alternative entities that can satisfy requirements
-# ENTITY_ALTERNATIVES = {
-#     "date": ["appointment_id"],  # For cancellation, either date or appointment_id works
-#     "appointment_id": ["date"],
-# }
\ No newline at end of file
+
+def missing_requirements(intent, entities) -> list:
+    """Required slots of intent (IntentType or its value) not in entities yet, in asking order"""
+    try:
+        intent = IntentType(intent)
+    except ValueError:
+        return []
+    return [slot for slot in INTENT_REQUIREMENTS.get(intent, []) if not (entities or {}).get(slot)]
+
+def pending_requirements(previous, state=None):
+    """
+    (intent value, collected entities, missing slots) of the request in progress - from the
+    slot-filling state when there is one, else from the last reply - or None
+    """
+    if state is not None and state.current_intent:
+        return state.current_intent.value, dict(state.collected_entities), list(state.missing_requirements)
+    if previous:
+        intent = previous.get("intent")
+        entities = {k: v for k, v in (previous.get("entities") or {}).items() if v is not None}
+        return intent, entities, missing_requirements(intent, entities)
+    return None
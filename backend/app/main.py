@@ -139,6 +139,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from app.services import handle_websocket_connection
 from app.services.mongodb_service import mongodb_service
+from app.services.metrics import metrics
+from app.services.tts_executor import tts_executor
+from app.services.deepgram_service import deepgram_pool, DEEPGRAM_API_KEY, ELEVENLABS_AVAILABLE
 from app.routes import appointments
 from app.routes import auth
 from app.routes import admin
@@ -174,6 +177,7 @@ async def root():
             "root": "/",
             "health": "/health",
             "test": "/test",
+            "metrics": "/metrics",
             "websocket": "/ws/transcribe"
         }
     })
@@ -193,6 +197,11 @@ async def test_endpoint():
         "status": "success"
     })
 
+@app.get("/metrics")
+async def get_metrics():
+    """Voice pipeline counters and latency summaries"""
+    return JSONResponse(metrics.snapshot())
+
 @app.websocket("/ws/transcribe")
 async def websocket_transcribe(websocket: WebSocket):
     """
@@ -245,6 +254,25 @@ async def startup_event():
     else:
         print("⚠️ MongoDB connection failed during startup")
 
+@app.on_event("startup")
+async def start_deepgram_pool():
+    """Pre-open Deepgram sockets so new sessions skip the handshake"""
+    if DEEPGRAM_API_KEY:
+        deepgram_pool.start()
+
+@app.on_event("startup")
+async def warm_tts_cache():
+    """Synthesize recurring replies ahead of the first session"""
+    if ELEVENLABS_AVAILABLE:
+        from app.services.elevenlabs_service import elevenlabs_service
+        elevenlabs_service.start_warming()
+
+@app.on_event("shutdown")
+async def close_deepgram_pool():
+    """Close pooled Deepgram sockets and stop the TTS workers"""
+    await deepgram_pool.close()
+    tts_executor.shutdown()
+
 # ← ADD THE initialize_admin_user FUNCTION RIGHT HERE
 async def initialize_admin_user():
     """Create admin user from environment variables"""
@@ -2,6 +2,8 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 
+APPOINTMENT_ID_DIGITS = 6  # appointment IDs are random digit strings of this length
+
 class AppointmentCreate(BaseModel):
     patientName: str
     doctorName: str
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.models.user import UserCreateByAdmin
 from app.services.mongodb_service import mongodb_service
+from app.services.prompt_builder import prompt_builder
 from app.utils.auth import get_password_hash
 import datetime
 from datetime import datetime
@@ -35,6 +36,8 @@ async def add_doctor(doctor_data: UserCreateByAdmin):
         
         # Insert into database
         doctor_id = await mongodb_service.create_user(doctor_dict)
+        # New doctor must appear in the assistant's roster
+        prompt_builder.invalidate("doctor added")
         
         return {
             "message": "Doctor added successfully",
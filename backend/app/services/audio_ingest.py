@@ -0,0 +1,160 @@
+# app/services/audio_ingest.py
+import os
+import json
+import time
+import asyncio
+from .metrics import metrics
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # linear16
+BYTES_PER_MS = SAMPLE_RATE * BYTES_PER_SAMPLE // 1000
+
+# Size of each frame sent to Deepgram (20-100 ms)
+AUDIO_FRAME_MS = min(100, max(20, int(os.getenv("AUDIO_FRAME_MS", "40"))))
+# Audio held between the client socket and Deepgram before the overflow policy applies
+AUDIO_INGEST_MAX_MS = int(os.getenv("AUDIO_INGEST_MAX_MS", "2000"))
+# "drop_oldest" keeps the newest audio, "block" stops reading from the client until there is room
+AUDIO_OVERFLOW_POLICY = os.getenv("AUDIO_OVERFLOW_POLICY", "drop_oldest")
+# Deepgram closes idle sockets after ~10s without audio
+DEEPGRAM_KEEPALIVE_INTERVAL = float(os.getenv("DEEPGRAM_KEEPALIVE_INTERVAL", "5"))
+
+# Time the writer gets to send buffered audio and CloseStream after the client disconnects
+AUDIO_DRAIN_TIMEOUT = float(os.getenv("AUDIO_DRAIN_TIMEOUT", "2"))
+
+OVERFLOW_POLICIES = ("drop_oldest", "block")
+
+
+class AudioIngest:
+    """
+    Per-session stage between the client socket and Deepgram.
+    put() only appends to a bounded buffer; a separate writer task (run) coalesces the
+    bytes into fixed-size frames, applies the VAD gate and sends them, so a slow
+    Deepgram socket never stalls reading from the browser.
+    """
+
+    def __init__(self, deepgram_ws, vad=None, frame_ms: int = AUDIO_FRAME_MS,
+                 max_buffer_ms: int = AUDIO_INGEST_MAX_MS, overflow_policy: str = AUDIO_OVERFLOW_POLICY):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.deepgram_ws = deepgram_ws
+        self.vad = vad
+        self.frame_bytes = frame_ms * BYTES_PER_MS
+        self.capacity = max(self.frame_bytes, max_buffer_ms * BYTES_PER_MS)
+        self.overflow_policy = overflow_policy
+
+        self.buffer = bytearray()
+        self.data_ready = asyncio.Event()
+        self.space_ready = asyncio.Event()
+        self.closed = False
+        self.last_sent = time.monotonic()
+
+        # Per-session counters
+        self.bytes_received = 0
+        self.bytes_dropped = 0
+        self.frames_sent = 0
+        self.keepalives_sent = 0
+        self.max_depth_bytes = 0
+
+    @property
+    def depth_ms(self) -> float:
+        return len(self.buffer) / BYTES_PER_MS
+
+    async def put(self, audio: bytes):
+        """Queue client audio for the writer (never waits on Deepgram unless the policy is 'block')"""
+        if self.closed:
+            return
+        self.bytes_received += len(audio)
+
+        if self.overflow_policy == "block":
+            # Fill what fits and wait for the rest - a chunk larger than the whole buffer would never fit
+            # at once, and a full buffer always holds a frame for the writer to take
+            while audio:
+                if len(self.buffer) >= self.capacity and not self.closed:
+                    self.space_ready.clear()
+                    await self.space_ready.wait()
+                    continue
+                room = len(audio) if self.closed else self.capacity - len(self.buffer)
+                self._append(audio[:room])
+                audio = audio[room:]
+            return
+
+        overflow = len(self.buffer) + len(audio) - self.capacity
+        if overflow > 0:
+            overflow += overflow % BYTES_PER_SAMPLE  # stay sample aligned
+            dropped = min(overflow, len(self.buffer))
+            del self.buffer[:dropped]
+            if overflow > dropped:
+                audio = audio[overflow - dropped:]  # chunk larger than the whole buffer
+            self.bytes_dropped += overflow
+            metrics.increment("ingest.dropped_bytes", overflow)
+        self._append(audio)
+
+    def _append(self, audio: bytes):
+        self.buffer.extend(audio)
+        self.max_depth_bytes = max(self.max_depth_bytes, len(self.buffer))
+        metrics.observe("ingest.queue_depth_ms", self.depth_ms)
+        self.data_ready.set()
+
+    async def run(self):
+        """Writer task - send fixed-size frames to Deepgram until closed and drained"""
+        while True:
+            if len(self.buffer) < self.frame_bytes:
+                if self.closed:
+                    break
+                self.data_ready.clear()
+                try:
+                    await asyncio.wait_for(self.data_ready.wait(), timeout=DEEPGRAM_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                await self._keepalive_if_idle()
+                continue
+
+            frame = bytes(self.buffer[:self.frame_bytes])
+            del self.buffer[:self.frame_bytes]
+            self.space_ready.set()
+
+            audio = self.vad.process(frame) if self.vad else frame
+            if audio:
+                await self._send(audio)
+            else:
+                await self._keepalive_if_idle()
+
+        # Flush the partial last frame
+        if self.buffer:
+            audio = self.vad.process(bytes(self.buffer)) if self.vad else bytes(self.buffer)
+            self.buffer.clear()
+            if audio:
+                await self._send(audio)
+        # Let Deepgram finalize the last words and close the stream
+        await self.deepgram_ws.send(json.dumps({"type": "CloseStream"}))
+
+    async def _send(self, audio: bytes):
+        started = time.perf_counter()
+        await self.deepgram_ws.send(audio)
+        metrics.observe("ingest.send_latency_ms", (time.perf_counter() - started) * 1000)
+        self.frames_sent += 1
+        self.last_sent = time.monotonic()
+
+    async def _keepalive_if_idle(self):
+        """Long silence - keep the Deepgram socket open without streaming audio"""
+        if time.monotonic() - self.last_sent < DEEPGRAM_KEEPALIVE_INTERVAL:
+            return
+        await self.deepgram_ws.send(json.dumps({"type": "KeepAlive"}))
+        metrics.increment("deepgram.keepalives")
+        self.keepalives_sent += 1
+        self.last_sent = time.monotonic()
+
+    def close(self):
+        """No more client audio - the writer drains what is buffered and stops"""
+        self.closed = True
+        self.data_ready.set()
+        self.space_ready.set()
+
+    def stats(self) -> dict:
+        return {
+            "bytes_received": self.bytes_received,
+            "bytes_dropped": self.bytes_dropped,
+            "frames_sent": self.frames_sent,
+            "keepalives_sent": self.keepalives_sent,
+            "max_queue_depth_ms": round(self.max_depth_bytes / BYTES_PER_MS, 1)
+        }
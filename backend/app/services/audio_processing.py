@@ -1,15 +1,28 @@
 # app/services/audio_processing.py
+import os
 import json
+import time
 import asyncio
+import functools
 from fastapi import WebSocket
 from .transcript_buffer import TranscriptBuffer
 from .websocket_utils import safe_send_json
+from .speech_pipeline import SpeechPipeline
+from .endpointing import create_endpoint_detector, parse_result, EndpointDecision, DeepgramRecorder
+from .audio_ingest import AudioIngest, AUDIO_DRAIN_TIMEOUT
+from .turn_controller import TurnController
+from .metrics import metrics
+from .text_normalizer import TranscriptNormalizer, normalize_transcript
+from .transcript_channel import TranscriptChannel
+from .speculation import IntentSpeculator, SPECULATIVE_INTENT
+from .prompt_builder import prompt_builder
+from .conversation_service import conversation_service
 from app.models.intent_model import IntentType
 import difflib
 
 try:
     from app.services.elevenlabs_service import elevenlabs_service
-    ELEVENLABS_AVAILABLE = True
+    ELEVENLABS_AVAILABLE = elevenlabs_service.enabled
 except ImportError:
     ELEVENLABS_AVAILABLE = False
 
@@ -19,6 +32,13 @@ try:
 except ImportError:
     OPENAI_AVAILABLE = False
 
+try:
+    from app.services.vad import VoiceActivityDetector
+    VAD_AVAILABLE = True
+except ImportError:
+    VAD_AVAILABLE = False
+    print("⚠️ NumPy not installed - voice activity detection disabled")
+
 try:
     from app.services.mongodb_service import mongodb_service
     MONGODB_AVAILABLE = True
@@ -26,57 +46,21 @@ except ImportError:
     MONGODB_AVAILABLE = False
     print("⚠️ MongoDB service not available")
 
-# Global variable to track speaking state
-is_ai_speaking = False
-
-def convert_spoken_numbers_to_digits(text):
-    """Convert spoken numbers like 'one two three' to digits '123'"""
-    number_words = {
-        'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
-        'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9',
-        'ten': '10', 'eleven': '11', 'twelve': '12', 'thirteen': '13', 
-        'fourteen': '14', 'fifteen': '15', 'sixteen': '16', 'seventeen': '17',
-        'eighteen': '18', 'nineteen': '19', 'twenty': '20', 'thirty': '30',
-        'forty': '40', 'fifty': '50', 'sixty': '60', 'seventy': '70',
-        'eighty': '80', 'ninety': '90'
-    }
-    
-    # Split text into words
-    words = text.split()
-    result = []
-    i = 0
-    
-    while i < len(words):
-        word = words[i].lower()
-        
-        # Check if current word is a number word
-        if word in number_words:
-            # Check if next words are also number words (for multi-digit numbers)
-            number_sequence = [number_words[word]]
-            j = i + 1
-            
-            while j < len(words) and words[j].lower() in number_words:
-                number_sequence.append(number_words[words[j].lower()])
-                j += 1
-            
-            # If we have a sequence of single digits, combine them
-            if all(len(num) == 1 for num in number_sequence):
-                result.append(''.join(number_sequence))
-            else:
-                # For larger numbers, keep them separate
-                result.extend(number_sequence)
-            
-            i = j  # Skip the processed words
-        else:
-            result.append(words[i])
-            i += 1
-    
-    return ' '.join(result)
+# Gate silence out of the Deepgram stream (VAD_ENABLED=false forwards everything)
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+
+# Intents whose reply is never rewritten by the database step, so it can be spoken while it streams
+EARLY_SPEECH_INTENTS = {
+    IntentType.GREETING.value,
+    IntentType.THANKS.value,
+    IntentType.UNKNOWN.value,
+    IntentType.QUERY_AVAILABILITY.value
+}
 
 async def _verify_doctor_exists_enhanced(doctor_name: str) -> dict:
     """Enhanced doctor verification with fuzzy matching for speech recognition errors"""
     try:
-        doctors = await mongodb_service.get_available_doctors()
+        doctors = await prompt_builder.doctors()
         mentioned_lower = doctor_name.lower().replace('dr.', '').replace('doctor', '').strip()
         
         exact_matches = []
@@ -139,99 +123,111 @@ async def _verify_doctor_exists_enhanced(doctor_name: str) -> dict:
         print(f"❌ Doctor verification error: {e}")
         return {"status": "error"}
 
-def proper_capitalization(text):
-    """Convert text to proper capitalization with name and proper noun support"""
-    if not text:
-        return text
-    
-    # First, capitalize the first letter of the entire text
-    text = text[0].upper() + text[1:]
-    
-    # Capitalize names and proper nouns (words after specific patterns)
-    words = text.split()
-    
-    # Patterns that typically precede names/proper nouns
-    name_indicators = ['my name is', 'i am', 'call me', 'this is', 'it is', 'name is', 
-                      'doctor', 'dr.', 'mr.', 'mrs.', 'ms.', 'miss', 'professor', 'prof.']
-    
-    for i in range(len(words) - 1):
-        current_phrase = ' '.join(words[i:i+2]).lower()
-        current_word = words[i].lower()
-        
-        # If we detect a name indicator, capitalize the next word
-        if current_phrase in name_indicators or current_word in name_indicators:
-            if i + 2 < len(words):
-                words[i + 2] = words[i + 2].capitalize()
-            elif i + 1 < len(words):
-                words[i + 1] = words[i + 1].capitalize()
-        
-        # Capitalize words after apostrophes (like O'Brian)
-        if "'" in words[i] and i + 1 < len(words):
-            words[i + 1] = words[i + 1].capitalize()
-    
-    # Capitalize after periods, question marks, and exclamation points
-    for punctuation in ['.', '?', '!']:
-        parts = ' '.join(words).split(punctuation + ' ')
-        text = (punctuation + ' ').join([part.capitalize() for part in parts])
-        words = text.split()  # Update words after punctuation processing
-    
-    # Capitalize 'I' and common proper nouns
-    text = ' '.join(words)
-    text = text.replace(' i ', ' I ')
-    text = text.replace(" i'", " I'")
-    
-    # Capitalize common titles and names
-    text = text.replace('dr. ', 'Dr. ')
-    text = text.replace('mr. ', 'Mr. ')
-    text = text.replace('mrs. ', 'Mrs. ')
-    text = text.replace('ms. ', 'Ms. ')
-    
-    return text
+async def delayed_processing(client_ws, transcript_buffer, endpoint_detector, delay, controller, speculator=None):
+    """
+    Commit the buffered utterance once the endpoint delay passes without new speech.
+    The endpoint detector chooses the delay; the task is cancelled and rescheduled if the patient keeps talking.
+    """
+    await asyncio.sleep(delay)
+
+    sentence = transcript_buffer.take_sentence()
+    endpoint_detector.reset()
+    # Early intent call started on the stable interim transcript (SPECULATIVE_INTENT=true)
+    speculation = speculator.take(sentence or "") if speculator else None
+    if not sentence:
+        return
 
-async def delayed_processing(client_ws, sentence):
-    """Wait before processing to ensure user finished speaking"""
-    # Wait 1.5 seconds before processing
-    await asyncio.sleep(2)
+    metrics.increment("endpoint.commits")
+    print(f"🎯 Complete sentence detected: {sentence} (committed after {delay:.2f}s)")
     
     # Check if client is still connected
     if client_ws.client_state.name == 'CONNECTED':
-        await process_complete_sentence(client_ws, sentence)
+        # Turns run one at a time per session; the controller can cancel them on barge-in
+        controller.submit(sentence, functools.partial(
+            process_complete_sentence, client_ws, controller=controller, speculation=speculation
+        ))
     else:
         print("⚠️ Client disconnected during delay, skipping processing")
+        if speculation:
+            speculation.discard("abandoned")
 
 
 def process_transcript_text(text):
-    """Apply all text processing: capitalization + number conversion"""
+    """Apply all text processing: number conversion + capitalization (single pass, memoized)"""
     if not text:
         return text
-    
-    # First convert spoken numbers to digits
-    text_with_numbers = convert_spoken_numbers_to_digits(text)
-    
-    # Then apply proper capitalization
-    return proper_capitalization(text_with_numbers)
+    return normalize_transcript(text)
 
 
-async def receive_audio(client_ws: WebSocket, deepgram_ws):
-    """Receive audio from client and forward to Deepgram"""
+async def receive_audio(client_ws: WebSocket, deepgram_ws, controller=None, channel=None):
+    """
+    Receive audio from client and queue it for Deepgram.
+    A separate writer task coalesces the audio into frames, gates silence with the VAD and sends it.
+    Text frames are client events: playback_ended (the reply finished playing), transcript_ack
+    (the TranscriptChannel delta the client applied) and end_of_speech.
+    """
+    vad = VoiceActivityDetector() if VAD_AVAILABLE and VAD_ENABLED else None
+    ingest = AudioIngest(deepgram_ws, vad=vad)
+    writer_task = asyncio.create_task(ingest.run())
     try:
         print("🎤 Waiting for audio data from client...")
-        async for message in client_ws.iter_bytes():
+        while True:
+            message = await client_ws.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if writer_task.done():
+                print(f"Error forwarding audio: {writer_task.exception()}")
+                break
+            if message.get("bytes") is not None:
+                await ingest.put(message["bytes"])
+                continue
+
             try:
-                print(f"📦 Received {len(message)} bytes from client")
-                # Forward audio data to Deepgram
-                await deepgram_ws.send(message)
-                print(f"📤 Forwarded {len(message)} bytes to Deepgram")
-            except Exception as e:
-                print(f"Error forwarding audio: {e}")
+                data = json.loads(message.get("text") or "{}")
+                event = data.get("type")
+            except (ValueError, AttributeError):
+                print(f"⚠️ Ignoring client message: {message.get('text')!r}")
+                continue
+            if event == "transcript_ack" and channel:
+                channel.ack(data.get("seq"))
+            elif event == "playback_ended" and controller:
+                controller.playback_ended()
+            elif event == "end_of_speech":
+                print("🎤 Client stopped recording")
                 break
     except Exception as e:
         print(f"Error receiving audio: {e}")
+    finally:
+        # Let the writer send the buffered audio and CloseStream so the last words are transcribed
+        ingest.close()
+        try:
+            await asyncio.wait_for(writer_task, timeout=AUDIO_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Audio writer did not drain within {AUDIO_DRAIN_TIMEOUT}s - dropping the rest")
+            metrics.increment("ingest.drain_timeouts")
+        except Exception as e:
+            print(f"Error draining audio: {e}")
+
+        stats = ingest.stats()
+        print(f"📦 Ingest: {stats['frames_sent']} frames sent, {stats['bytes_dropped']} bytes dropped, "
+              f"max queue {stats['max_queue_depth_ms']} ms")
+        if vad:
+            stats = vad.stats()
+            metrics.increment("vad.audio_seconds_received", stats["audio_seconds_received"])
+            metrics.increment("vad.audio_seconds_forwarded", stats["audio_seconds_forwarded"])
+            print(f"🔈 VAD: received {stats['audio_seconds_received']}s, "
+                  f"forwarded {stats['audio_seconds_forwarded']}s ({stats['savings']:.0%} saved)")
 
 
-async def process_complete_sentence(client_ws, transcript):
-    """Process a complete sentence with OpenAI and convert response to speech"""
-    global is_ai_speaking
+async def process_complete_sentence(client_ws, transcript, controller=None, speculation=None):
+    """
+    Process a complete sentence with OpenAI and convert response to speech.
+    The reply is spoken sentence by sentence; the session's TurnController can cancel the turn on barge-in.
+    speculation is an intent call already started for this text, used if it still matches.
+    """
+    controller = controller or TurnController(client_ws)
+    turn_started_at = time.perf_counter()
+    speech = None
     
     try:
         # Check if WebSocket is still connected before processing
@@ -242,10 +238,26 @@ async def process_complete_sentence(client_ws, transcript):
         print(f"🔄 Processing complete sentence: {transcript}")
         
         # Get session ID for conversation tracking
-        session_id = str(id(client_ws))
+        session_id = controller.session_id
         
-        # 🎯 SIMPLIFIED: Just call OpenAI - it handles conversation logic now!
-        intent_response = await openai_service.analyze_intent(transcript, session_id)
+        # Speech pipeline - sentences are synthesized while later ones are still being generated
+        if ELEVENLABS_AVAILABLE:
+            speech = SpeechPipeline(client_ws, elevenlabs_service, slots=controller.tts_slots, started_at=turn_started_at)
+
+        async def stream_response(text, intent):
+            # Draft reply text for the client while the LLM is still generating (replaced by the intent message)
+            await safe_send_json(client_ws, {"type": "response_delta", "intent": intent, "text": text})
+            # Replies the database step may rewrite are only spoken once final
+            if speech and intent in EARLY_SPEECH_INTENTS:
+                speech.feed(text)
+
+        # A reply that only fills the slot we asked for is answered locally, anything else goes to OpenAI
+        controller.set_phase(TurnController.THINKING)
+        answer = conversation_service.answer_locally(transcript, session_id)
+        intent_response = await openai_service.analyze_intent(
+            transcript, session_id, on_response_text=stream_response, speculation=speculation,
+            state=conversation_service.get_state(session_id), answer=answer
+        )
         
         print(f"✅ Intent: {intent_response.intent}")
         print(f"📋 Entities: {intent_response.entities}")
@@ -253,6 +265,9 @@ async def process_complete_sentence(client_ws, transcript):
         print(f"💬 Response: {intent_response.processed_response}")
 
         # 🗄️ DATABASE OPERATIONS - Save to MongoDB when appropriate
+        controller.set_phase(TurnController.ACTING)
+        # The whole request, not just what the model returned this turn
+        intent_response.entities = conversation_service.request_entities(intent_response, session_id)
         if MONGODB_AVAILABLE and intent_response.entities:
             try:
                 # Handle different intents with database operations
@@ -268,7 +283,7 @@ async def process_complete_sentence(client_ws, transcript):
                         
                         if verification_result["status"] == "not_found":
                             # Doctor not found
-                            available_doctors = await mongodb_service.get_available_doctors()
+                            available_doctors = await prompt_builder.doctors()
                             alternatives = ", ".join([f"Dr. {doc['name']}" for doc in available_doctors[:3]])
                             intent_response.processed_response = f"I don't see Dr. {doctor_name} in our system. We have {alternatives}. Who would you prefer?"
                             
@@ -314,7 +329,7 @@ async def process_complete_sentence(client_ws, transcript):
                                 
                     else:
                         # No doctor specified
-                        available_doctors = await mongodb_service.get_available_doctors()
+                        available_doctors = await prompt_builder.doctors()
                         doctors_list = ", ".join([f"Dr. {doc['name']}" for doc in available_doctors[:3]])
                         intent_response.processed_response = f"I'd be happy to book your appointment! We have {doctors_list}. Which doctor would you like to see?"
                 elif intent_response.intent == IntentType.CANCEL_APPOINTMENT:
@@ -426,6 +441,12 @@ async def process_complete_sentence(client_ws, transcript):
         # Keep the original OpenAI response which should ask for missing info                        
             except Exception as db_error:
                 print(f"❌ Database operation failed: {db_error}")
+
+        # Track what the patient has given us and what we still need to ask for
+        next_prompt, should_speak = await conversation_service.process_intent(intent_response, session_id)
+        if should_speak and not intent_response.processed_response:
+            # The model left the reply empty - ask for the next missing slot (or confirm) instead of going quiet
+            intent_response.processed_response = next_prompt
         
         # Send intent response to frontend
         success = await safe_send_json(client_ws, {
@@ -443,33 +464,32 @@ async def process_complete_sentence(client_ws, transcript):
             return
 
         # Try speech generation
-        if (ELEVENLABS_AVAILABLE and 
-            intent_response.processed_response and 
-            not is_ai_speaking and
+        if (speech and
+            intent_response.processed_response and
+            not controller.interrupted and
             client_ws.client_state.name == 'CONNECTED'):
             
             try:
-                is_ai_speaking = True
-                print(f"🎵 Generating speech: {intent_response.processed_response}")
-                
-                # Send speech start signal
-                await safe_send_json(client_ws, {
-                    "type": "speech_start",
-                    "message": "AI is responding..."
-                })
+                controller.set_phase(TurnController.SPEAKING)
+                final_text = intent_response.processed_response
+                if final_text.startswith(speech.spoken_text):
+                    # Queue whatever was not already spoken while the LLM streamed
+                    speech.feed(final_text[len(speech.spoken_text):])
+                else:
+                    print("⚠️ Final reply differs from the streamed text, keeping what was spoken")
+                print(f"🎵 Generating speech: {final_text}")
 
-                audio = await elevenlabs_service.generate_speech(intent_response.processed_response)
-                
-                # Check connection before sending audio
-                if client_ws.client_state.name == 'CONNECTED' and audio:
-                    audio_bytes = b''.join([chunk for chunk in audio])
-                    await client_ws.send_bytes(audio_bytes)
-                    print(f"✅ Sent audio: {len(audio_bytes)} bytes")
-                    
-                    # Send speech end signal
+                speech_stats = await speech.close()
+
+                if speech_stats and speech_stats["chunks"]:
+                    print(f"⏱️ Time to first audio: {speech_stats['time_to_first_audio_ms']} ms")
+                    # Playback started with the first chunk - the client is busy for the rest of the audio
+                    played_ms = speech_stats["total_ms"] - speech_stats["time_to_first_audio_ms"]
+                    controller.start_playback(speech_stats["audio_ms"] - played_ms)
+                elif client_ws.client_state.name == 'CONNECTED':
                     await safe_send_json(client_ws, {
-                        "type": "speech_end", 
-                        "message": "AI finished speaking"
+                        "type": "speech_error",
+                        "message": "Text-to-speech unavailable, continuing with text only"
                     })
                 else:
                     print("❌ Connection closed during audio generation")
@@ -481,8 +501,6 @@ async def process_complete_sentence(client_ws, transcript):
                     "message": "Text-to-speech unavailable, continuing with text only",
                     "error": str(speech_error)
                 })
-            finally:
-                is_ai_speaking = False
         else:
             print("🔇 Speech generation skipped")
         
@@ -495,11 +513,31 @@ async def process_complete_sentence(client_ws, transcript):
             "is_final": True,
             "error": "Processing failed"
         })
+    finally:
+        # Also runs when a barge-in cancels the turn - stop any synthesis still in flight
+        if speech and speech.sender_task and not speech.sender_task.done():
+            await speech.cancel()
+        if speculation:
+            speculation.discard("unused")  # no-op once analyze_intent settled it
+        controller.set_phase(TurnController.IDLE)
 
 
-async def send_transcripts(deepgram_ws, client_ws: WebSocket):
+async def send_transcripts(deepgram_ws, client_ws: WebSocket, controller=None, channel=None):
     """Receive transcripts from Deepgram, buffer sentences, and send complete ones to OpenAI"""
+    controller = controller or TurnController(client_ws)
     transcript_buffer = TranscriptBuffer()
+    # Interim results mostly extend the previous one - only the new words are normalized
+    normalizer = TranscriptNormalizer()
+    # Rate-limited, delta-encoded interim updates to the browser
+    channel = channel or TranscriptChannel(client_ws)
+    # Starts the intent call once the interim transcript is stable (opt-in)
+    speculator = None
+    if SPECULATIVE_INTENT and OPENAI_AVAILABLE:
+        speculator = IntentSpeculator(functools.partial(openai_service.speculate, session_id=controller.session_id))
+    # Decides when the patient has finished speaking
+    endpoint_detector = create_endpoint_detector()
+    pending_commit = None
+    recorder = DeepgramRecorder.from_env(controller.session_id)
     
     try:
         print("🎧 Starting to listen for Deepgram responses...")
@@ -511,39 +549,66 @@ async def send_transcripts(deepgram_ws, client_ws: WebSocket):
                     break
 
                 data = json.loads(message)
+                if recorder:
+                    recorder.record(data)
+
+                decision = endpoint_detector.observe(data, time.monotonic())
                 
-                # Extract transcript
-                transcript = data.get("channel", {}).get("alternatives", [{}])[0].get("transcript", "")
-                is_final = data.get("is_final", False)
+                # Extract transcript (UtteranceEnd / SpeechStarted messages carry none)
+                result = parse_result(data)
+                transcript = result["transcript"] if result else ""
+                is_final = result["is_final"] if result else False
                 
                 if transcript:
-                    # Check for complete sentence
-                    complete_sentence = transcript_buffer.add_transcript(transcript, is_final)
-                    
-                    if complete_sentence:
-                        print(f"🎯 Complete sentence detected: {complete_sentence}")
-                        # Process in background
-                        asyncio.create_task(delayed_processing(client_ws, complete_sentence))
+                    # The patient is talking over the AI - cancel the stale reply / stop its playback
+                    if controller.busy or controller.playing:
+                        await controller.barge_in()
+
+                    # More speech inside the commit window - joins the pending utterance
+                    if is_final and transcript_buffer.has_text and pending_commit and not pending_commit.done():
+                        controller.note_merged()
+
+                    # Audio window lets the buffer replace revised finals and drop replays
+                    transcript_buffer.add_transcript(transcript, is_final, data.get("start"), data.get("duration"))
+                    if speculator and not controller.busy:
+                        speculator.observe(" ".join(filter(None, (transcript_buffer.buffer, transcript_buffer.interim))))
                                             
-                    # Send interim transcripts for real-time display
-                    await safe_send_json(client_ws, {
-                        "type": "transcript",
-                        "transcript": process_transcript_text(transcript),
-                        "is_final": is_final,
-                        "is_interim": not is_final
-                    })
+                    # Send interim transcripts for real-time display (finals go out immediately)
+                    if is_final:
+                        await channel.final(normalizer.normalize(transcript))
+                    else:
+                        await channel.interim(normalizer.normalize(transcript))
+
+                # Local silence timer - (re)scheduled on every decision, cancelled when speech resumes
+                if decision.action != EndpointDecision.WAIT and pending_commit and not pending_commit.done():
+                    pending_commit.cancel()
+                    pending_commit = None
+                if decision.action == EndpointDecision.COMMIT:
+                    pending_commit = asyncio.create_task(
+                        delayed_processing(client_ws, transcript_buffer, endpoint_detector, decision.delay, controller, speculator)
+                    )
                         
             except json.JSONDecodeError:
                 print(f"Failed to parse JSON: {message}")
             except Exception as e:
                 print(f"Error processing message: {e}")
+
+        if pending_commit and not pending_commit.done():
+            pending_commit.cancel()
                 
         # Process any remaining text when connection closes
         final_sentence = transcript_buffer.get_final_buffer()
         if final_sentence and client_ws.client_state.name == 'CONNECTED':
             print(f"📚 Processing final buffer: {final_sentence}")
             processed_sentence = process_transcript_text(final_sentence)
-            await process_complete_sentence(client_ws, processed_sentence)
+            controller.submit(processed_sentence, functools.partial(process_complete_sentence, client_ws, controller=controller))
+            await controller.drain()
 
     except Exception as e:
-        print(f"Error in send_transcripts: {e}")
\ No newline at end of file
+        print(f"Error in send_transcripts: {e}")
+    finally:
+        channel.close()
+        if speculator:
+            speculator.close()
+        if recorder:
+            recorder.close()
@@ -1,111 +1,144 @@
 # app/services/conversation_service.py
-from typing import Tuple
+import os
+import time
+from typing import Dict, Optional, Tuple
+from app.config.intent_requirements import INTENT_REQUIREMENTS, missing_requirements
 from app.models.conversation_state import ConversationState
 from app.models.intent_model import IntentResponse, IntentType
-from app.services.openai_service import openai_service # Import the REQUIREMENTS_MAP
+from app.services.session_store import SessionStore
+from app.services.slot_extractors import extract_slot
+from app.services.metrics import metrics
+
+# Replies that only answer the slot we asked for are handled without the LLM
+LOCAL_SLOT_FILLING = os.getenv("LOCAL_SLOT_FILLING", "true").lower() == "true"
+LOCAL_SLOT_CONFIDENCE = 0.95
+
 
 class ConversationService:
-    # This will store active conversations in memory (for now)
-    def __init__(self):
-        self.active_conversations: Dict[str, ConversationState] = {}
+    """
+    Multi-turn slot filling. process_intent() tracks the intent in progress, the entities
+    collected so far and the ones still missing (INTENT_REQUIREMENTS) after every turn;
+    answer_locally() completes a turn that only answers the slot we are waiting for
+    (appointment ID, name, date, time) with a local extractor instead of the LLM.
+    """
+
+    # This will store active conversations in memory (bounded, idle sessions expire)
+    def __init__(self, enabled: bool = LOCAL_SLOT_FILLING):
+        self.active_conversations = SessionStore("conversation_state")
+        self.enabled = enabled
+
+    def release(self, session_id: str):
+        """Drop the conversation state when the session ends"""
+        self.active_conversations.release(session_id)
+
+    def get_state(self, session_id: str) -> ConversationState:
+        """Slot-filling state of the session (created on first use)"""
+        state = self.active_conversations.get(session_id)
+        if state is None:
+            state = ConversationState(session_id=session_id)
+            self.active_conversations[session_id] = state
+        return state
+
+    def answer_locally(self, transcript: str, session_id: str) -> Optional[IntentResponse]:
+        """
+        Turn result for a reply that fills the slot we are waiting for, or None to ask the LLM.
+        The state itself is updated by process_intent once the turn is done.
+        """
+        state = self.active_conversations.get(session_id)
+        if not self.enabled or state is None or not state.current_intent or not state.missing_requirements:
+            return None
+        started = time.perf_counter()
+        slot = state.missing_requirements[0]
+        found = extract_slot(slot, transcript)
+        if not found:
+            metrics.increment("slots.local.misses")
+            self._update_rate()
+            return None
+
+        entities = {**state.collected_entities, **found}
+        missing = missing_requirements(state.current_intent, entities)
+        if missing:
+            reply = self._generate_question(missing[0], state.current_intent)
+        else:
+            reply = self._generate_confirmation_message(state.current_intent, entities)
+        metrics.increment("slots.local.hits")
+        metrics.increment(f"slots.local.{slot}")
+        metrics.observe("slots.local.ms", (time.perf_counter() - started) * 1000)
+        self._update_rate()
+        print(f"🧩 Filled {', '.join(found)} locally: {found}")
+        return IntentResponse(
+            intent=state.current_intent,
+            entities=entities,
+            confidence=LOCAL_SLOT_CONFIDENCE,
+            raw_transcript=transcript,
+            processed_response=reply
+        )
 
     async def process_intent(self, intent_response: IntentResponse, session_id: str) -> Tuple[str, bool]:
         """
         The CORE LOGIC.
-        Takes the user's intent and the current session, and decides what to do next.
-        Returns: (response_text, should_speak)
+        Takes the user's intent and the current session, and updates what we have and what we still need.
+        Returns: (response_text, should_speak) - the question for the next missing slot, or the confirmation
         """
-            # 0. Handle the case where this is an answer to a previous question
-        current_state = self.active_conversations.get(session_id, ConversationState(session_id=session_id))
-        
-        # FIX: If this is an unknown intent BUT we have an active conversation, treat it as an answer
-        if (intent_response.intent == IntentType.UNKNOWN and 
-            current_state.current_intent and 
-            current_state.missing_requirements):
-            
-            print(f"🔍 Treating unknown intent as response to previous question: {intent_response.raw_transcript}")
-            # Assume this is answering our last question
-            intent_response.intent = current_state.current_intent
-            
-            # Try to extract entities from what might be the answer
-            if current_state.missing_requirements:
-                next_requirement = current_state.missing_requirements[0]
-                # For appointment IDs, we can try to extract numbers from the raw transcript
-                if next_requirement == "appointment_id":
-                    # Simple extraction: look for numbers in the transcript
-                    import re
-                    numbers = re.findall(r'\d+', intent_response.raw_transcript)
-                    if numbers:
-                        intent_response.entities["appointment_id"] = " ".join(numbers)
-                        print(f"✅ Extracted appointment_id from numbers: {intent_response.entities['appointment_id']}")
-                else:
-                    # For other requirements, use the raw transcript as the value
-                    intent_response.entities[next_requirement] = intent_response.raw_transcript
-                    print(f"📝 Using raw transcript for {next_requirement}: {intent_response.raw_transcript}")
-        
-        # 1. Get or create the conversation state for this session
-        current_state = self.active_conversations.get(session_id, ConversationState(session_id=session_id))
-
-        # 2. Check if this is a new intent or a response to a previous question
-        if current_state.current_intent != intent_response.intent:
-            # It's a NEW INTENT! Reset and start fresh.
-            current_state.reset()
-            current_state.current_intent = intent_response.intent
-            # Start with the entities OpenAI just extracted
-            current_state.collected_entities = intent_response.entities
-            # Figure out what we're missing
-            required_slots = openai_service.REQUIREMENTS_MAP.get(intent_response.intent, [])
-            current_state.missing_requirements = [
-                slot for slot in required_slots 
-                if not intent_response.entities.get(slot) # Check if the slot is missing
-            ]
+        current_state = self.get_state(session_id)
+        intent = intent_response.intent
+
+        if intent not in INTENT_REQUIREMENTS:
+            # Greetings, thanks and replies the LLM could not place leave the request in progress alone
+            if not current_state.missing_requirements:
+                return "", False
+            return self._generate_question(current_state.missing_requirements[0], current_state.current_intent), True
 
+        entities = self._turn_entities(current_state, intent_response)
+        if current_state.current_intent != intent:
+            # It's a NEW INTENT! Reset and start fresh with what was just extracted.
+            current_state.reset()
+            current_state.current_intent = intent
+            current_state.collected_entities = entities
         else:
-            # It's the SAME INTENT. The user is probably answering our last question.
-            if current_state.missing_requirements:
-                next_slot = current_state.missing_requirements[0]
-                
-                # NEW FIXED CODE: Use extracted entity if available, otherwise use raw transcript
-                if next_slot in intent_response.entities:
-                    # YES! OpenAI found the exact entity we were looking for
-                    slot_value = intent_response.entities[next_slot]
-                    print(f"✅ Extracted {next_slot}: {slot_value}")
-                else:
-                    # OpenAI didn't find it, so use the raw transcript as a fallback
-                    slot_value = intent_response.raw_transcript
-                    print(f"⚠️  Using raw transcript for {next_slot}: {slot_value}")
-                
-                current_state.collected_entities[next_slot] = slot_value
-                current_state.missing_requirements.pop(0)  # Remove from missing list
-
-            # CRITICAL: Check if user provided OTHER entities we need
-            for slot, value in intent_response.entities.items():
-                if slot in current_state.missing_requirements:  # Don't double-process
-                    print(f"🎁 Bonus extracted {slot}: {value}")
-                    current_state.collected_entities[slot] = value
-                    if slot in current_state.missing_requirements:
-                        current_state.missing_requirements.remove(slot)
-
-        # 3. Save the updated state
-        self.active_conversations[session_id] = current_state
-
-        # 4. Check: Do we have everything we need?
+            # Same intent - the user answered our question (and maybe gave more); latest value wins.
+            current_state.collected_entities.update(entities)
+        current_state.missing_requirements = missing_requirements(intent, current_state.collected_entities)
+
+        # Do we have everything we need for the database step?
         if not current_state.missing_requirements:
-            # YES! We are ready to talk to the database.
             current_state.is_fulfilled = True
-            # For now, just confirm. Later, this will trigger a DB insert.
-            response_text = self._generate_confirmation_message(current_state)
-            # Reset after fulfilling
+            response_text = self._generate_confirmation_message(intent, current_state.collected_entities)
+            # The database step runs on this turn's entities - the next request starts clean
             current_state.reset()
             return response_text, True
-        else:
-            # NO. We need to ask for the next piece of information.
-            next_slot = current_state.missing_requirements[0]
-            response_text = self._generate_question(next_slot, intent_response.intent)
-            return response_text, True
+
+        return self._generate_question(current_state.missing_requirements[0], intent), True
+
+    def request_entities(self, intent_response: IntentResponse, session_id: str) -> Dict[str, str]:
+        """
+        Everything known for the request this turn belongs to: the entities collected on earlier
+        turns with this turn's on top. The database step needs these - the LLM often returns only
+        the slot it was just given. The state itself is updated by process_intent afterwards.
+        """
+        state = self.active_conversations.get(session_id)
+        if state is None or intent_response.intent not in INTENT_REQUIREMENTS:
+            return intent_response.entities
+        entities = self._turn_entities(state, intent_response)
+        if state.current_intent != intent_response.intent:
+            return entities
+        return {**state.collected_entities, **entities}
+
+    def _turn_entities(self, state: ConversationState, intent_response: IntentResponse) -> Dict[str, str]:
+        """
+        This turn's non-empty entities. Raw transcripts are not stored as values: when the reply
+        to our question carries no value for it, the typed slot is extracted locally or stays missing
+        """
+        entities = {k: v for k, v in intent_response.entities.items() if v}
+        pending = state.missing_requirements[0] if state.missing_requirements else None
+        if state.current_intent == intent_response.intent and pending and pending not in entities:
+            entities = {**extract_slot(pending, intent_response.raw_transcript), **entities}
+        return entities
 
     def _generate_question(self, missing_slot: str, intent: IntentType) -> str:
         """Generates a natural language question to ask for missing information."""
+        if intent == IntentType.RESCHEDULE_APPOINTMENT and missing_slot in ("date", "time"):
+            return f"What {missing_slot} would you like to move your appointment to?"
         questions = {
             "patient_name": "Sure, may I please have your full name?",
             "date": "What date would you like to book for?",
@@ -117,11 +150,26 @@ class ConversationService:
         }
         return questions.get(missing_slot, "Could you please provide that information?")
 
-    def _generate_confirmation_message(self, state: ConversationState) -> str:
-        """Generates a confirmation message with the collected info."""
-        # Build a simple confirmation message from the collected entities
-        details = ", ".join([f"{k}: {v}" for k, v in state.collected_entities.items()])
+    def _generate_confirmation_message(self, intent: IntentType, entities: Dict[str, str]) -> str:
+        """Confirmation with the collected info (the database step replaces it with the outcome)"""
+        appointment_id = entities.get("appointment_id")
+        if intent == IntentType.BOOK_APPOINTMENT:
+            return (f"Thank you, {entities['patient_name']}. Let me book your appointment with "
+                    f"Dr. {entities['doctor_name']} on {entities['date']} at {entities['time']}.")
+        if intent == IntentType.RESCHEDULE_APPOINTMENT:
+            return f"Let me move appointment {appointment_id} to {entities['date']} at {entities['time']}."
+        if intent == IntentType.CANCEL_APPOINTMENT:
+            return f"Let me cancel appointment {appointment_id} for you."
+        if intent == IntentType.QUERY_APPOINTMENT:
+            return f"Let me look up appointment {appointment_id} for you."
+        details = ", ".join(f"{k}: {v}" for k, v in entities.items())
         return f"Great! I will process your request for: {details}."
 
+    def _update_rate(self):
+        hits = metrics.counters.get("slots.local.hits", 0)
+        total = hits + metrics.counters.get("slots.local.misses", 0)
+        metrics.set_gauge("slots.local.rate", round(hits / total, 3) if total else 0.0)
+
+
 # Create a global instance
-conversation_service = ConversationService()
\ No newline at end of file
+conversation_service = ConversationService()
@@ -0,0 +1,366 @@
+# app/services/datetime_resolver.py
+import re
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from .text_normalizer import UNITS, TEENS, TENS
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3, "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5, "sunday": 6, "sun": 6
+}
+MONTHS = {
+    "january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4,
+    "may": 5, "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8,
+    "september": 9, "sep": 9, "sept": 9, "october": 10, "oct": 10, "november": 11, "nov": 11,
+    "december": 12, "dec": 12
+}
+ORDINAL_UNITS = {
+    "first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+    "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9
+}
+ORDINAL_WORDS = {
+    **ORDINAL_UNITS, "tenth": 10, "eleventh": 11, "twelfth": 12, "thirteenth": 13, "fourteenth": 14,
+    "fifteenth": 15, "sixteenth": 16, "seventeenth": 17, "eighteenth": 18, "nineteenth": 19,
+    "twentieth": 20, "thirtieth": 30
+}
+# Short weekday names that are also words ("I sat down") - need "on"/"this"/"next" in front
+AMBIGUOUS_WEEKDAYS = {"sun", "sat", "wed", "mon"}
+PERIODS = {"morning": "am", "afternoon": "pm", "evening": "pm", "night": "pm", "tonight": "pm"}
+# Words allowed around a bare time answer ("um about ten thirty please")
+TIME_ANSWER_WORDS = {
+    "at", "around", "about", "say", "let's", "lets", "how", "maybe", "um", "uh", "please",
+    "make", "it", "is", "fine", "okay", "ok", "yes", "yeah", "for", "the", "ish", "works"
+}
+
+# Words allowed around a date/time answer ("on Tuesday then", "next Friday would be good")
+ANSWER_WORDS = TIME_ANSWER_WORDS | {
+    "on", "then", "that", "would", "be", "good", "great", "perfect", "sure", "i'd", "i", "like",
+    "prefer", "can", "do", "sounds", "so", "in", "of", "and", "or", "thanks", "thank", "you"
+}
+
+TOKEN_PATTERN = re.compile(r"iso:\d{4}-\d{2}-\d{2}|\d{1,2}:\d{2}|[a-z0-9']+")
+ISO_DATE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+MERIDIEM = re.compile(r"\b([ap])\.?\s?m\b\.?")
+ATTACHED_SUFFIX = re.compile(r"(\d)(am|pm|st|nd|rd|th)\b")
+
+# Parsed number: (value, next token index, is_ordinal)
+Number = Tuple[int, int, bool]
+
+
+def _tokenize(text: str) -> List[str]:
+    text = text.lower().replace("o'clock", "oclock")
+    text = ISO_DATE.sub(lambda m: f" iso:{m.group(0)} ", text)
+    text = MERIDIEM.sub(r"\1m", text)
+    text = ATTACHED_SUFFIX.sub(r"\1 \2", text)
+    return TOKEN_PATTERN.findall(text)
+
+
+def _number(tokens: List[str], i: int) -> Optional[Number]:
+    """Number at tokens[i]: digits ("25", "25 th"), words ("twenty five") or ordinals ("twenty fifth")"""
+    if i >= len(tokens):
+        return None
+    token = tokens[i]
+    if token.isdigit():
+        if i + 1 < len(tokens) and tokens[i + 1] in ("st", "nd", "rd", "th"):
+            return int(token), i + 2, True
+        return int(token), i + 1, False
+    if token in ORDINAL_WORDS:
+        return ORDINAL_WORDS[token], i + 1, True
+    if token in TENS:
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if following in UNITS and UNITS[following] > 0:
+            return TENS[token] + UNITS[following], i + 2, False
+        if following in ORDINAL_UNITS:
+            return TENS[token] + ORDINAL_UNITS[following], i + 2, True
+        return TENS[token], i + 1, False
+    if token in TEENS:
+        return TEENS[token], i + 1, False
+    if token in UNITS:
+        return UNITS[token], i + 1, False
+    return None
+
+
+def _minutes(tokens: List[str], i: int) -> Optional[Tuple[int, int]]:
+    """Minutes after an hour: "30", "thirty", "forty five", "oh five" """
+    if i < len(tokens) and tokens[i] in ("oh", "o") and i + 1 < len(tokens):
+        number = _number(tokens, i + 1)
+        if number and not number[2] and number[0] < 10:
+            return number[0], number[1]
+        return None
+    number = _number(tokens, i)
+    if number and not number[2] and 0 <= number[0] < 60 and (number[0] >= 10 or len(tokens[i]) == 2):
+        return number[0], number[1]
+    return None
+
+
+def _clock(hour: int, minute: int, meridiem: Optional[str]) -> Optional[str]:
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "pm" else 0)
+    elif hour <= 6 and hour != 0:
+        hour += 12  # clinic hours: "at 3" is the afternoon, "at 9" the morning
+    if not 0 <= hour <= 23 or not 0 <= minute <= 59:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _make_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+class DateTimeResolver:
+    """
+    Deterministic resolver for the dates and times patients say: "tomorrow", "next Friday",
+    "Monday next week", "in three days", "the 25th", "October twenty fifth", "2 PM",
+    "half past ten", "noon", "ten thirty". Results are YYYY-MM-DD / HH:MM relative to today.
+    When several dates or times are mentioned the last one wins ("not Monday, Tuesday").
+    Weeks start on Monday: "this Friday" is in the current week, "next Friday" in the next one.
+    A bare ordinal is a day of the month only when a date is expected (we asked for one), with
+    "of the month", or after "on"/"for" at the end of the phrase - "the second doctor" is not a date.
+    """
+
+    def resolve(self, text: str, today: date, expecting_date: bool = False) -> Dict[str, str]:
+        return self._scan(_tokenize(text), today, expecting_date)[0]
+
+    def answer(self, text: str, today: date) -> Dict[str, str]:
+        """
+        Dates/times when they are the whole reply ("next Tuesday", "Thursday at 3 pm",
+        "half past ten please"), else {} - anything more and the reply needs the LLM
+        """
+        found, rest = self._scan(_tokenize(text), today, expecting_date=True)
+        if any(token not in ANSWER_WORDS for token in rest):
+            return {}
+        return found
+
+    def _scan(self, tokens: List[str], today: date, expecting_date: bool = False) -> Tuple[Dict[str, str], List[str]]:
+        """Dates/times found, and the tokens that were not part of one"""
+        found: Dict[str, str] = {}
+        rest: List[str] = []
+        i = 0
+        while i < len(tokens):
+            step = self._date_at(tokens, i, today, expecting_date) or self._time_at(tokens, i)
+            if step:
+                key, value, i = step
+                found[key] = value
+            else:
+                rest.append(tokens[i])
+                i += 1
+
+        if "time" not in found:
+            bare = self._bare_time(tokens)
+            if bare:
+                found["time"] = bare
+                rest = []
+        return found, rest
+
+    # --- Dates -----------------------------------------------------------------
+
+    def _date_at(self, tokens: List[str], i: int, today: date,
+                 expecting_date: bool = False) -> Optional[Tuple[str, str, int]]:
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+
+        if token.startswith("iso:"):
+            parts = token[4:].split("-")
+            resolved = _make_date(int(parts[0]), int(parts[1]), int(parts[2]))
+            return ("date", resolved.isoformat(), i + 1) if resolved else None
+        if token in ("today", "tonight"):
+            return "date", today.isoformat(), i + 1
+        if token == "tomorrow":
+            return "date", (today + timedelta(days=1)).isoformat(), i + 1
+        if token == "day" and tokens[i + 1:i + 3] == ["after", "tomorrow"]:
+            return "date", (today + timedelta(days=2)).isoformat(), i + 3
+
+        # "in 3 days", "in two weeks", "in a week"
+        if token == "in" and following is not None:
+            if following in ("a", "one") and i + 2 < len(tokens) and tokens[i + 2] in ("week", "day"):
+                days = 7 if tokens[i + 2] == "week" else 1
+                return "date", (today + timedelta(days=days)).isoformat(), i + 3
+            number = _number(tokens, i + 1)
+            if number and not number[2] and number[1] < len(tokens) and tokens[number[1]] in ("days", "weeks"):
+                days = number[0] * (7 if tokens[number[1]] == "weeks" else 1)
+                return "date", (today + timedelta(days=days)).isoformat(), number[1] + 1
+
+        # "next week friday", "next week on friday"
+        if token == "next" and following == "week":
+            j = i + 2
+            if j < len(tokens) and tokens[j] == "on":
+                j += 1
+            if j < len(tokens) and tokens[j] in WEEKDAYS:
+                return "date", self._weekday(today, WEEKDAYS[tokens[j]], "next").isoformat(), j + 1
+            return None
+
+        # "this friday", "next friday", "coming friday", "friday", "friday next week"
+        modifier = None
+        j = i
+        if token in ("this", "next", "coming") and following in WEEKDAYS:
+            modifier = "this" if token == "this" else ("next" if token == "next" else None)
+            j = i + 1
+        if tokens[j] in WEEKDAYS and (j > i or tokens[j] not in AMBIGUOUS_WEEKDAYS or self._date_context(tokens, i)):
+            weekday = WEEKDAYS[tokens[j]]
+            end = j + 1
+            if tokens[end:end + 2] in (["next", "week"], ["this", "week"]):
+                modifier = tokens[end]
+                end += 2
+            return "date", self._weekday(today, weekday, modifier).isoformat(), end
+
+        # "october 25", "october the twenty fifth", "oct 25th 2027"
+        if token in MONTHS:
+            j = i + 1
+            if j < len(tokens) and tokens[j] == "the":
+                j += 1
+            number = _number(tokens, j)
+            if number and 1 <= number[0] <= 31:
+                return self._month_day(tokens, number[1], today, MONTHS[token], number[0])
+            return None
+
+        # "25th of october", "the 25th", "25 october"
+        start = i + 1 if token == "the" else i
+        number = _number(tokens, start)
+        if number and 1 <= number[0] <= 31:
+            j = number[1]
+            if j < len(tokens) and tokens[j] == "of":
+                j += 1
+            if j < len(tokens) and tokens[j] in MONTHS and (tokens[j] != "may" or j > number[1] or number[2]):
+                return self._month_day(tokens, j + 1, today, MONTHS[tokens[j]], number[0])
+            if number[2] and (token == "the" or self._date_context(tokens, i)):
+                # "the 25th" on its own - this month, or next month once it has passed
+                end = number[1]
+                of_month = tokens[end:end + 3] == ["of", "the", "month"]
+                if of_month:
+                    end += 3
+                elif not expecting_date and not self._ends_date_phrase(tokens, i, end):
+                    return None  # "the second doctor", "the first one please"
+                day = number[0]
+                resolved = _make_date(today.year, today.month, day)
+                if resolved is None or resolved < today:
+                    month = today.month % 12 + 1
+                    year = today.year + (1 if month == 1 else 0)
+                    resolved = _make_date(year, month, day)
+                return ("date", resolved.isoformat(), end) if resolved else None
+        return None
+
+    def _date_context(self, tokens: List[str], i: int) -> bool:
+        # Words that double as dates ("sat", "second") - only trusted after "on"/"for"
+        return i > 0 and tokens[i - 1] in ("on", "for", "by", "until")
+
+    def _ends_date_phrase(self, tokens: List[str], i: int, end: int) -> bool:
+        # "on the 20th please", "for the 25th at 3" - but not "on the second floor"
+        return self._date_context(tokens, i) and (end == len(tokens) or tokens[end] in ANSWER_WORDS)
+
+    def _weekday(self, today: date, weekday: int, modifier: Optional[str]) -> date:
+        if modifier == "next":
+            start_of_next_week = today - timedelta(days=today.weekday()) + timedelta(days=7)
+            return start_of_next_week + timedelta(days=weekday)
+        if modifier == "this":
+            this_week = today - timedelta(days=today.weekday()) + timedelta(days=weekday)
+            if this_week >= today:
+                return this_week
+        # Next occurrence after today
+        days_ahead = (weekday - today.weekday()) % 7 or 7
+        return today + timedelta(days=days_ahead)
+
+    def _month_day(self, tokens: List[str], j: int, today: date, month: int, day: int) -> Optional[Tuple[str, str, int]]:
+        year = None
+        if j < len(tokens) and tokens[j].isdigit() and len(tokens[j]) == 4:
+            year = int(tokens[j])
+            j += 1
+        resolved = _make_date(year or today.year, month, day)
+        if resolved and year is None and resolved < today:
+            resolved = _make_date(today.year + 1, month, day)
+        return ("date", resolved.isoformat(), j) if resolved else None
+
+    # --- Times -----------------------------------------------------------------
+
+    def _time_at(self, tokens: List[str], i: int) -> Optional[Tuple[str, str, int]]:
+        token = tokens[i]
+        if token in ("noon", "midday"):
+            return "time", "12:00", i + 1
+
+        # "half past two", "quarter past ten", "quarter to four"
+        if token in ("half", "quarter") and i + 1 < len(tokens) and tokens[i + 1] in ("past", "to"):
+            number = _number(tokens, i + 2)
+            if number and not number[2] and 1 <= number[0] <= 12:
+                hour, minute = number[0], 30 if token == "half" else 15
+                if tokens[i + 1] == "to":
+                    if token == "half":
+                        return None
+                    hour, minute = hour - 1 or 12, 45
+                meridiem, end = self._meridiem(tokens, number[1])
+                value = _clock(hour, minute, meridiem)
+                return ("time", value, end) if value else None
+
+        # "14:30", "2:30 pm"
+        if ":" in token:
+            hour, minute = (int(part) for part in token.split(":"))
+            meridiem, end = self._meridiem(tokens, i + 1)
+            if meridiem is None and hour > 12:
+                value = f"{hour:02d}:{minute:02d}" if hour <= 23 and minute <= 59 else None
+            else:
+                value = _clock(hour, minute, meridiem)
+            return ("time", value, end) if value else None
+
+        # "at 3", "at ten thirty", "2 pm", "10 in the morning", "3 o'clock"
+        anchored = token == "at"
+        start = i + 1 if anchored else i
+        number = _number(tokens, start)
+        if not number or number[2] or not 0 <= number[0] <= 23:
+            return None
+        hour, end = number[0], number[1]
+        minute = 0
+        minutes = _minutes(tokens, end)
+        if minutes:
+            minute, end = minutes
+        if end < len(tokens) and tokens[end] == "oclock":
+            meridiem, end = self._meridiem(tokens, end + 1)
+        else:
+            meridiem, end_after = self._meridiem(tokens, end)
+            if meridiem is None and not anchored:
+                return None
+            end = end_after
+        value = _clock(hour, minute, meridiem)
+        return ("time", value, end) if value else None
+
+    def _meridiem(self, tokens: List[str], j: int) -> Tuple[Optional[str], int]:
+        if j < len(tokens) and tokens[j] in ("am", "pm"):
+            return tokens[j], j + 1
+        if tokens[j:j + 2] in (["in", "the"], ["at", "the"]) and j + 2 < len(tokens) and tokens[j + 2] in PERIODS:
+            return PERIODS[tokens[j + 2]], j + 3
+        if tokens[j:j + 1] == ["at"] and j + 1 < len(tokens) and tokens[j + 1] == "night":
+            return "pm", j + 2
+        if j < len(tokens) and tokens[j] == "tonight":
+            return "pm", j  # leave "tonight" for the date rule
+        return None, j
+
+    def _bare_time(self, tokens: List[str]) -> Optional[str]:
+        """A reply that is only a time ("ten thirty", "about 2 30")"""
+        words = [token for token in tokens if token not in TIME_ANSWER_WORDS]
+        number = _number(words, 0)
+        if not number or number[2] or not 1 <= number[0] <= 12:
+            return None
+        minutes = _minutes(words, number[1])
+        if not minutes or minutes[1] != len(words):
+            return None
+        return _clock(number[0], minutes[0], None)
+
+
+# Global instance
+datetime_resolver = DateTimeResolver()
+
+
+def resolve_datetime(text: str, today: Optional[date] = None, expecting_date: bool = False) -> Dict[str, str]:
+    """
+    {"date": "YYYY-MM-DD", "time": "HH:MM"} for whatever the text mentions.
+    expecting_date: we asked for a date, so a bare "the 25th" is one
+    """
+    return datetime_resolver.resolve(text, today or date.today(), expecting_date)
+
+
+def resolve_answer(text: str, today: Optional[date] = None) -> Dict[str, str]:
+    """Like resolve_datetime, but only when the text is nothing but a date and/or time"""
+    return datetime_resolver.answer(text, today or date.today())
\ No newline at end of file
@@ -0,0 +1,161 @@
+# app/services/deepgram_pool.py
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+import websockets
+from .metrics import metrics
+
+# Pre-opened Deepgram sockets waiting for a session (0 disables the pool)
+DEEPGRAM_POOL_SIZE = int(os.getenv("DEEPGRAM_POOL_SIZE", "2"))
+# Idle pooled sockets get a KeepAlive this often - Deepgram closes sockets after ~10s without data
+DEEPGRAM_POOL_KEEPALIVE_INTERVAL = float(os.getenv("DEEPGRAM_POOL_KEEPALIVE_INTERVAL", "5"))
+# Pooled sockets older than this are replaced with fresh ones
+DEEPGRAM_POOL_MAX_IDLE = float(os.getenv("DEEPGRAM_POOL_MAX_IDLE", "300"))
+
+
+class DeepgramPool:
+    """
+    Small pool of pre-opened Deepgram streaming sockets.
+    acquire() hands out a warm socket (falling back to a fresh connect when the pool is empty)
+    and triggers a refill. Sockets are single use: once a session is done with one - it may have
+    sent CloseStream - release() closes it instead of putting it back.
+    """
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None, size: int = DEEPGRAM_POOL_SIZE,
+                 keepalive_interval: float = DEEPGRAM_POOL_KEEPALIVE_INTERVAL,
+                 max_idle: float = DEEPGRAM_POOL_MAX_IDLE):
+        self.url = url
+        self.headers = headers or {}
+        self.size = max(0, size)
+        self.keepalive_interval = keepalive_interval
+        self.max_idle = max_idle
+
+        self.idle: List[Tuple[object, float]] = []  # (socket, opened_at)
+        self.connecting = 0
+        self.refill_event = asyncio.Event()
+        self.maintenance_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+
+    async def _connect(self):
+        started = time.perf_counter()
+        ws = await websockets.connect(
+            self.url,
+            extra_headers=self.headers,
+            ping_interval=20,
+            ping_timeout=60
+        )
+        metrics.observe("deepgram.connect_ms", (time.perf_counter() - started) * 1000)
+        return ws
+
+    def start(self):
+        """Open the pool and start the refill / KeepAlive task"""
+        if self.size == 0 or self.maintenance_task:
+            return
+        self.closed = False
+        self.maintenance_task = asyncio.create_task(self._maintain())
+        print(f"🏊 Deepgram pool started ({self.size} sockets)")
+
+    async def acquire(self):
+        """Check out a socket for one session"""
+        while self.idle:
+            ws, _ = self.idle.pop()
+            self.refill_event.set()
+            if ws.open:
+                self.hits += 1
+                metrics.increment("deepgram.pool.hits")
+                metrics.set_gauge("deepgram.pool.idle", len(self.idle))
+                return ws
+            metrics.increment("deepgram.pool.discarded")
+
+        self.misses += 1
+        metrics.increment("deepgram.pool.misses")
+        self.refill_event.set()
+        return await self._connect()
+
+    async def release(self, ws):
+        """Session finished with the socket - never handed out again"""
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def connection(self):
+        """async with pool.connection() as deepgram_ws: ..."""
+        ws = await self.acquire()
+        try:
+            yield ws
+        finally:
+            await self.release(ws)
+
+    async def _maintain(self):
+        while not self.closed:
+            self.refill_event.clear()
+            await self._check_idle()
+            await self._refill()
+            try:
+                await asyncio.wait_for(self.refill_event.wait(), timeout=self.keepalive_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check_idle(self):
+        """Health check - KeepAlive every idle socket, drop dead or stale ones"""
+        now = time.monotonic()
+        healthy = []
+        for ws, opened_at in list(self.idle):
+            if ws.open and now - opened_at < self.max_idle:
+                try:
+                    await ws.send(json.dumps({"type": "KeepAlive"}))
+                    healthy.append((ws, opened_at))
+                    continue
+                except Exception:
+                    pass
+            metrics.increment("deepgram.pool.discarded")
+            await self.release(ws)
+        # Sockets checked out while we were awaiting are no longer in self.idle
+        self.idle = [entry for entry in healthy if entry in self.idle]
+        metrics.set_gauge("deepgram.pool.idle", len(self.idle))
+
+    async def _refill(self):
+        missing = self.size - len(self.idle) - self.connecting
+        if missing <= 0:
+            return
+        self.connecting += missing
+        results = await asyncio.gather(*(self._connect() for _ in range(missing)), return_exceptions=True)
+        self.connecting -= missing
+
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"⚠️ Deepgram pool connect failed: {result}")
+            elif self.closed:
+                await self.release(result)
+            else:
+                self.idle.append((result, time.monotonic()))
+        metrics.set_gauge("deepgram.pool.idle", len(self.idle))
+
+    async def close(self):
+        """Stop refilling and close every idle socket"""
+        self.closed = True
+        if self.maintenance_task:
+            self.maintenance_task.cancel()
+            await asyncio.gather(self.maintenance_task, return_exceptions=True)
+            self.maintenance_task = None
+        idle, self.idle = self.idle, []
+        for ws, _ in idle:
+            await self.release(ws)
+        metrics.set_gauge("deepgram.pool.idle", 0)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self.idle),
+            "hits": self.hits,
+            "misses": self.misses
+        }
\ No newline at end of file
@@ -1,17 +1,21 @@
 import os
 import asyncio
-import websockets
 from fastapi import WebSocket, WebSocketDisconnect
 from dotenv import load_dotenv
 from .audio_processing import receive_audio, send_transcripts
+from .turn_controller import TurnController
+from .transcript_channel import TranscriptChannel
+from .deepgram_pool import DeepgramPool
 from .websocket_utils import safe_send_json
+from .session_store import new_session_id
+from .conversation_service import conversation_service
 
 # Load environment variables from .env file
 load_dotenv()
 
 try:
     from app.services.elevenlabs_service import elevenlabs_service
-    ELEVENLABS_AVAILABLE = True
+    ELEVENLABS_AVAILABLE = elevenlabs_service.enabled
     print("✅ ElevenLabs service imported successfully")
 except ImportError as e:
     ELEVENLABS_AVAILABLE = False
@@ -31,28 +35,40 @@ DEEPGRAM_API_KEY = os.getenv("DEEPGRAM_API_KEY")
 if not DEEPGRAM_API_KEY:
     print("WARNING: DEEPGRAM_API_KEY not set. Please set it in .env file")
 
-DEEPGRAM_URL = f"wss://api.deepgram.com/v1/listen?model=nova-2&encoding=linear16&sample_rate=16000&channels=1"
+DEEPGRAM_UTTERANCE_END_MS = os.getenv("DEEPGRAM_UTTERANCE_END_MS", "1000")
+DEEPGRAM_ENDPOINTING_MS = os.getenv("DEEPGRAM_ENDPOINTING_MS", "300")
+
+# Interim results, VAD events and UtteranceEnd feed the endpoint detector
+DEEPGRAM_URL = (
+    f"wss://api.deepgram.com/v1/listen?model=nova-2&encoding=linear16&sample_rate=16000&channels=1"
+    f"&interim_results=true&vad_events=true"
+    f"&utterance_end_ms={DEEPGRAM_UTTERANCE_END_MS}&endpointing={DEEPGRAM_ENDPOINTING_MS}"
+)
+
+# Pre-opened sockets so the TLS handshake is not on the session's critical path
+deepgram_pool = DeepgramPool(DEEPGRAM_URL, {"Authorization": f"Token {DEEPGRAM_API_KEY}"})
 
 
 async def handle_websocket_connection(websocket: WebSocket):
     """Handle WebSocket connection with Deepgram"""
     await websocket.accept()
     print("Client connected to WebSocket")
+    # Per-session owner of in-flight LLM/TTS work (barge-in)
+    session_id = new_session_id()
+    controller = TurnController(websocket, session_id)
+    # Transcript stream to the browser - its acks arrive on the audio socket
+    channel = TranscriptChannel(websocket)
     
     try:
-        # Connect to Deepgram
-        async with websockets.connect(
-            DEEPGRAM_URL,
-            extra_headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"},
-            ping_interval=20,
-            ping_timeout=60
-        ) as deepgram_ws:
+        # Check out a pre-opened Deepgram socket (connects directly when the pool is empty)
+        async with deepgram_pool.connection() as deepgram_ws:
             print("Connected to Deepgram")
             
             # Send initial connection success message
             await safe_send_json(websocket, {
                 "type": "connection_status",
                 "message": "Connected to speech processing services",
+                "session_id": session_id,
                 "services": {
                     "deepgram": True,
                     "openai": OPENAI_AVAILABLE,
@@ -61,12 +77,12 @@ async def handle_websocket_connection(websocket: WebSocket):
             })
 
             # Create task for receiving audio
-            receive_task = asyncio.create_task(receive_audio(websocket, deepgram_ws))
+            receive_task = asyncio.create_task(receive_audio(websocket, deepgram_ws, controller, channel))
             
             # Create task for sending transcripts with longer timeout
             try:
                 await asyncio.wait_for(
-                    send_transcripts(deepgram_ws, websocket),
+                    send_transcripts(deepgram_ws, websocket, controller, channel),
                     timeout=300.0  # 5 minute timeout instead of immediate close
                 )
             except asyncio.TimeoutError:
@@ -84,6 +100,11 @@ async def handle_websocket_connection(websocket: WebSocket):
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
+        await controller.close()
+        # Conversation state is not reused across connections
+        if OPENAI_AVAILABLE:
+            openai_service.clear_conversation_history(session_id)
+        conversation_service.release(session_id)
         # Clean up - close connection gracefully
         try:
             if websocket.client_state.name == 'CONNECTED':
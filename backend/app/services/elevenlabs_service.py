@@ -60,74 +60,160 @@
 # # Global instance
 # elevenlabs_service = ElevenLabsService()
 
+
 # backend/app/services/elevenlabs_service.py
 import os
+import asyncio
+from typing import AsyncIterator, List, Optional
 from elevenlabs.client import ElevenLabs
 from elevenlabs import Voice, VoiceSettings
 from dotenv import load_dotenv
+from .speech_pipeline import SpeechPipeline, split_sentences
+from .tts_cache import TTSCache, TTS_CACHE_ENABLED, TTS_CACHE_WARM_PHRASES, cache_key as tts_cache_key
+from .tts_executor import tts_executor
 
 load_dotenv()
 
 class ElevenLabsService:
     def __init__(self):
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
-        if not self.api_key:
-            raise ValueError("ELEVENLABS_API_KEY not set in environment variables")
+        # Without a key the service is disabled instead of failing the import - replies are text only
+        self.enabled = bool(self.api_key)
+        if not self.enabled:
+            print("⚠️ ELEVENLABS_API_KEY not set - speech synthesis disabled")
         
-        self.client = ElevenLabs(api_key=self.api_key)
+        self.client = ElevenLabs(api_key=self.api_key) if self.enabled else None
         self.voice_id = "21m00Tcm4TlvDq8ikWAM"  # or your preferred voice ID
         self.model = "eleven_flash_v2"  # Fastest model for real-time
+        self.output_format = "mp3_44100_128"
+        self.voice_settings = VoiceSettings(
+            stability=0.7,
+            similarity_boost=0.8,
+            style=0.2,
+            use_speaker_boost=True
+        )
+        # Streaming mode forwards each MP3 chunk as soon as ElevenLabs produces it
+        self.streaming = os.getenv("ELEVENLABS_STREAMING", "true").lower() == "true"
+        self.optimize_streaming_latency = int(os.getenv("ELEVENLABS_OPTIMIZE_STREAMING_LATENCY", "2"))
+        # Recurring sentences are synthesized once and replayed from the cache (warm phrases kept on disk)
+        self.cache = TTSCache(persistent=self._warm_keys()) if TTS_CACHE_ENABLED else None
+        self.warm_task: Optional[asyncio.Task] = None
     
-    async def generate_speech(self, text: str):
-        """Generate speech audio from text"""
+    def _convert(self, text: str):
+        """Blocking ElevenLabs request - only ever called on a TTS worker thread"""
+        return self.client.text_to_speech.convert(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model,
+            voice_settings=self.voice_settings,
+            output_format=self.output_format
+        )
+
+    def _convert_stream(self, text: str):
+        """Blocking streaming request - only ever called on a TTS worker thread"""
+        return self.client.text_to_speech.convert_as_stream(
+            text=text,
+            voice_id=self.voice_id,
+            model_id=self.model,
+            voice_settings=self.voice_settings,
+            output_format=self.output_format,
+            optimize_streaming_latency=self.optimize_streaming_latency
+        )
+
+    async def generate_speech(self, text: str) -> Optional[bytes]:
+        """Generate the complete audio for text (runs on the TTS executor)"""
         try:
-            # Fixed syntax - voice settings should be passed differently
-            audio = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=self.voice_id,  # Pass voice_id directly
-                model_id=self.model,
-                voice_settings=VoiceSettings(  # Pass settings separately
-                    stability=0.7,
-                    similarity_boost=0.8,
-                    style=0.2,
-                    use_speaker_boost=True
-                ),
-                output_format="mp3_44100_128"
-            )
-            
-            return audio
-            
+            return await tts_executor.run(lambda: b"".join(self._convert(text)))
         except Exception as e:
             print(f"Error generating speech: {e}")
             print(f"Text attempted: {text}")
             return None
+
+    async def generate_speech_stream(self, text: str, cache_key: Optional[str] = None) -> AsyncIterator[bytes]:
+        """Yield MP3 chunks as ElevenLabs synthesizes them (runs on the TTS executor)"""
+        def open_stream():
+            audio = self._convert_stream(text)
+            # Stored by the worker thread once the whole sentence has streamed
+            return self.cache.record(cache_key, audio) if cache_key else audio
+
+        async for chunk in tts_executor.stream(open_stream):
+            yield chunk
+
+    def _cache_key(self, text: str) -> str:
+        return tts_cache_key(text, self.voice_id, self.model, self.voice_settings, self.output_format)
+
+    def _warm_keys(self) -> List[str]:
+        """Cache keys of the warm phrases, per sentence the way SpeechPipeline asks for them"""
+        return [self._cache_key(sentence) for phrase in TTS_CACHE_WARM_PHRASES for sentence in split_sentences(phrase)]
+
+    async def synthesize(self, text: str) -> AsyncIterator[bytes]:
+        """
+        Audio chunks for text - streaming endpoint unless ELEVENLABS_STREAMING=false.
+        Sentences synthesized before are served from the cache without calling ElevenLabs.
+        """
+        key = self._cache_key(text) if self.cache else None
+        if key:
+            cached = await self.cache.lookup(key)
+            if cached is not None:
+                yield cached
+                return
+
+        if self.streaming:
+            async for chunk in self.generate_speech_stream(text, cache_key=key):
+                yield chunk
+            return
+
+        audio = await self.generate_speech(text)
+        if audio:
+            if key:
+                await tts_executor.run(self.cache.put, key, audio)
+            yield audio
+
+    async def warm_cache(self, phrases: Optional[List[str]] = None):
+        """Synthesize recurring phrases (TTS_CACHE_WARM_PHRASES) that are not cached yet"""
+        if not self.cache:
+            return
+        warmed = 0
+        for phrase in phrases or TTS_CACHE_WARM_PHRASES:
+            # Keyed per sentence, the way SpeechPipeline asks for them
+            for sentence in split_sentences(phrase):
+                key = self._cache_key(sentence)
+                if await asyncio.to_thread(self.cache.contains, key):
+                    continue
+                audio = await self.generate_speech(sentence)
+                if audio:
+                    await tts_executor.run(self.cache.put, key, audio, persist=True)
+                    warmed += 1
+        print(f"🔥 TTS cache warmed: {warmed} new sentences, {self.cache.stats()['entries']} in memory")
+
+    def start_warming(self):
+        """Warm the cache in the background so startup is not delayed"""
+        if self.enabled and self.cache and self.warm_task is None:
+            self.warm_task = asyncio.create_task(self.warm_cache())
     
-    async def stream_speech_to_client(self, text: str, websocket):
-        """Stream speech audio directly to WebSocket client"""
+    async def stream_speech_to_client(self, text: str, websocket, started_at: Optional[float] = None) -> Optional[dict]:
+        """
+        Stream speech audio to the WebSocket client.
+        Frames: speech_start, then one speech_chunk header + binary frame per chunk, then speech_end.
+        started_at (time.perf_counter()) is when the turn began, used for time-to-first-audio.
+        Returns playback stats, or None if nothing could be sent.
+        """
         try:
             # Check if websocket is still connected
             if websocket.client_state.name != 'CONNECTED':
                 print("❌ WebSocket not connected, skipping speech generation")
-                return
+                return None
                 
             print(f"🎵 Generating speech for: {text[:50]}...")
-            audio = await self.generate_speech(text)
-            
-            if audio and websocket.client_state.name == 'CONNECTED':
-                # Convert generator to bytes and send
-                try:
-                    audio_bytes = b''.join([chunk for chunk in audio])
-                    await websocket.send_bytes(audio_bytes)
-                    print(f"🎵 Sent audio: {len(audio_bytes)} bytes")
-                    print("✅ Speech streaming completed")
-                except Exception as send_error:
-                    print(f"Error sending audio bytes: {send_error}")
-            else:
-                print("❌ Failed to generate speech or WebSocket disconnected")
+            speech = SpeechPipeline(websocket, self, started_at=started_at)
+            speech.feed(text)
+            stats = await speech.close()
+            return stats if stats and stats["chunks"] else None
                 
         except Exception as e:
             print(f"Error streaming speech: {e}")
             print(f"WebSocket state: {websocket.client_state.name if hasattr(websocket, 'client_state') else 'Unknown'}")
+            return None
 
 # Global instance
-elevenlabs_service = ElevenLabsService()
\ No newline at end of file
+elevenlabs_service = ElevenLabsService()
@@ -0,0 +1,254 @@
+# app/services/endpointing.py
+import os
+import re
+import json
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+from app.models.appointment import APPOINTMENT_ID_DIGITS
+
+# Commit delays (seconds) - chosen per utterance by AdaptiveEndpointDetector
+SHORT_DELAY = float(os.getenv("ENDPOINT_SHORT_DELAY", "0.2"))      # "yes", complete appointment IDs
+DEFAULT_DELAY = float(os.getenv("ENDPOINT_DEFAULT_DELAY", "0.7"))  # ordinary sentences
+LONG_DELAY = float(os.getenv("ENDPOINT_LONG_DELAY", "1.6"))        # mid-sentence pauses, half-spoken IDs
+# Local silence timer - commit if Deepgram goes quiet without a speech_final/UtteranceEnd
+SILENCE_TIMEOUT = float(os.getenv("ENDPOINT_SILENCE_TIMEOUT", "2.0"))
+# Must match utterance_end_ms in the Deepgram URL
+UTTERANCE_END_SECONDS = float(os.getenv("DEEPGRAM_UTTERANCE_END_MS", "1000")) / 1000
+ENDPOINT_DETECTOR = os.getenv("ENDPOINT_DETECTOR", "adaptive")
+
+# Legacy behaviour (fixed sleep in delayed_processing)
+LEGACY_DELAY = 2.0
+
+SHORT_ANSWERS = {
+    "yes", "no", "yeah", "yep", "nope", "ok", "okay", "sure", "correct", "right",
+    "thanks", "thank you", "thank you so much", "thanks a lot", "hello", "hi", "hey",
+    "bye", "goodbye", "yes please", "no thanks", "no thank you", "that's right", "that's all",
+    "that's correct", "sounds good", "perfect", "great"
+}
+
+# Last words that mean the patient is still mid-sentence
+INCOMPLETE_ENDINGS = {
+    "my", "the", "a", "an", "to", "for", "with", "and", "or", "i", "want", "need", "is", "because",
+    "at", "on", "in", "of", "dr", "doctor", "um", "uh", "like", "see", "book", "about", "but",
+    "so", "it's", "its", "name", "id", "number", "next", "this", "by", "from", "would", "can"
+}
+
+DIGIT_WORDS = {"zero", "oh", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"}
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def parse_result(data: dict) -> Optional[dict]:
+    """Pull the fields endpointing needs out of a Deepgram Results message"""
+    if data.get("type", "Results") != "Results":
+        return None
+    channel = data.get("channel")
+    if not isinstance(channel, dict):
+        return None
+    alternative = (channel.get("alternatives") or [{}])[0]
+    return {
+        "transcript": alternative.get("transcript", "").strip(),
+        "words": alternative.get("words", []),
+        "is_final": data.get("is_final", False),
+        "speech_final": data.get("speech_final", False),
+        "start": data.get("start", 0.0),
+        "duration": data.get("duration", 0.0)
+    }
+
+
+def utterance_delay(text: str) -> Tuple[float, str]:
+    """Pick how long to wait for more speech after this utterance"""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return LONG_DELAY, "empty"
+
+    # Appointment IDs are read digit by digit - wait longer until all six are in
+    if all(word.isdigit() or word in DIGIT_WORDS for word in words):
+        digits = sum(len(word) if word.isdigit() else 1 for word in words)
+        if digits >= APPOINTMENT_ID_DIGITS:
+            return SHORT_DELAY, "appointment_id"
+        return LONG_DELAY, "partial_id"
+
+    if words[-1] in INCOMPLETE_ENDINGS:
+        return LONG_DELAY, "incomplete"
+
+    if " ".join(words) in SHORT_ANSWERS or (len(words) <= 3 and words[0] in ("yes", "no", "yeah", "yep")):
+        return SHORT_DELAY, "short_answer"
+
+    return DEFAULT_DELAY, "sentence"
+
+
+class EndpointDecision:
+    """What to do with the pending commit after a Deepgram message"""
+    WAIT = "wait"      # leave any pending commit alone
+    COMMIT = "commit"  # (re)schedule the commit `delay` seconds from now
+    CANCEL = "cancel"  # drop any pending commit
+
+    def __init__(self, action: str, delay: float = 0.0, reason: str = ""):
+        self.action = action
+        self.delay = delay
+        self.reason = reason
+
+    def __repr__(self):
+        return f"EndpointDecision({self.action}, {self.delay:.2f}s, {self.reason})"
+
+
+WAIT = EndpointDecision(EndpointDecision.WAIT)
+
+
+class EndpointDetector(ABC):
+    """Base class for end-of-utterance detectors - fed every Deepgram message of a session"""
+
+    @abstractmethod
+    def observe(self, data: dict, now: float) -> EndpointDecision:
+        """What to do with the pending commit after this message"""
+
+    @abstractmethod
+    def reset(self):
+        """Called once the buffered utterance has been committed"""
+
+
+class AdaptiveEndpointDetector(EndpointDetector):
+    """
+    Combines Deepgram speech_final / UtteranceEnd events, word timings and a local
+    silence timer. The commit delay depends on what was said: short for "yes" or a
+    complete appointment ID, long when the patient stopped mid-sentence.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.segments: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.segments)
+
+    def observe(self, data: dict, now: float) -> EndpointDecision:
+        message_type = data.get("type", "Results")
+
+        if message_type == "UtteranceEnd":
+            if not self.segments:
+                return WAIT
+            # Deepgram has already seen utterance_end_ms of silence after the last word
+            return self._commit_after_silence(UTTERANCE_END_SECONDS, "utterance_end")
+
+        if message_type == "SpeechStarted":
+            # New speech - push the commit out to the silence timeout
+            return self._keep_listening("speech_started")
+
+        result = parse_result(data)
+        if result is None:
+            return WAIT
+
+        if not result["is_final"]:
+            if result["transcript"]:
+                return self._keep_listening("interim")
+            return WAIT
+
+        if result["transcript"]:
+            self.segments.append(result["transcript"])
+
+        if not self.segments:
+            return WAIT
+
+        if result["speech_final"]:
+            # Silence Deepgram already observed after the last word of this segment
+            trailing_silence = 0.0
+            words = result["words"]
+            if words:
+                segment_end = result["start"] + result["duration"]
+                trailing_silence = max(0.0, segment_end - words[-1].get("end", segment_end))
+            return self._commit_after_silence(trailing_silence, "speech_final")
+
+        # Final segment without speech_final - the patient is most likely still talking
+        return EndpointDecision(EndpointDecision.COMMIT, SILENCE_TIMEOUT, "final_segment")
+
+    def _keep_listening(self, reason: str) -> EndpointDecision:
+        if not self.segments:
+            return WAIT
+        return EndpointDecision(EndpointDecision.COMMIT, SILENCE_TIMEOUT, reason)
+
+    def _commit_after_silence(self, elapsed_silence: float, reason: str) -> EndpointDecision:
+        delay, kind = utterance_delay(self.text)
+        return EndpointDecision(EndpointDecision.COMMIT, max(0.0, delay - elapsed_silence), f"{reason}:{kind}")
+
+
+class FixedDelayEndpointDetector(EndpointDetector):
+    """The original behaviour: TranscriptBuffer heuristics on finals followed by a fixed 2s wait"""
+
+    LEGACY_INCOMPLETE_ENDINGS = ['my', 'the', 'a', 'an', 'to', 'for', 'with', 'and', 'or', 'i', 'want', 'need', 'is', 'id is', 'because']
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.segments: List[str] = []
+        self.committed = False
+
+    def observe(self, data: dict, now: float) -> EndpointDecision:
+        result = parse_result(data)
+        if result is None or not result["is_final"] or not result["transcript"]:
+            return WAIT
+
+        self.segments.append(result["transcript"])
+        if self.committed or not self._should_process_sentence():
+            return WAIT
+
+        self.committed = True
+        return EndpointDecision(EndpointDecision.COMMIT, LEGACY_DELAY, "legacy")
+
+    def _should_process_sentence(self) -> bool:
+        buffer = " ".join(self.segments).strip()
+        buffer_words = buffer.split()
+
+        if buffer.endswith(('.', '?', '!')):
+            return len(buffer_words) >= 2
+
+        last_word = buffer_words[-1].lower() if buffer_words else ""
+        return (len(buffer_words) >= 3 and
+                len(buffer) >= 15 and
+                last_word not in self.LEGACY_INCOMPLETE_ENDINGS)
+
+
+ENDPOINT_DETECTORS = {
+    "adaptive": AdaptiveEndpointDetector,
+    "fixed": FixedDelayEndpointDetector
+}
+
+
+def create_endpoint_detector(name: Optional[str] = None) -> EndpointDetector:
+    """Build the configured detector (ENDPOINT_DETECTOR=adaptive|fixed)"""
+    detector_class = ENDPOINT_DETECTORS.get(name or ENDPOINT_DETECTOR, AdaptiveEndpointDetector)
+    return detector_class()
+
+
+class DeepgramRecorder:
+    """Writes a session's Deepgram messages to JSONL so they can be replayed by benchmark_endpointing.py"""
+
+    def __init__(self, directory: str, session_id: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"deepgram_{int(time.time())}_{session_id}.jsonl")
+        self.file = open(self.path, "w")
+        self.started_at = time.monotonic()
+
+    @classmethod
+    def from_env(cls, session_id: str) -> Optional["DeepgramRecorder"]:
+        """Recorder for DEEPGRAM_RECORD_DIR, or None when recording is off"""
+        directory = os.getenv("DEEPGRAM_RECORD_DIR")
+        if not directory:
+            return None
+        try:
+            return cls(directory, session_id)
+        except OSError as e:
+            print(f"⚠️ Cannot record Deepgram messages: {e}")
+            return None
+
+    def record(self, data: dict):
+        self.file.write(json.dumps({"t": round(time.monotonic() - self.started_at, 3), "message": data}) + "\n")
+
+    def close(self):
+        self.file.close()
+        print(f"💾 Deepgram messages recorded to {self.path}")
@@ -0,0 +1,129 @@
+# app/services/history_manager.py
+import os
+import re
+import json
+from typing import Any, Dict, List, Optional
+from app.config.intent_requirements import INTENT_REQUIREMENTS, missing_requirements
+from .metrics import metrics
+
+# Exact counts when tiktoken is installed, a close local estimate otherwise
+try:
+    import tiktoken
+    TOKENIZER = tiktoken.get_encoding("o200k_base")
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    TOKENIZER = None
+    TIKTOKEN_AVAILABLE = False
+
+# Tokens allowed for the conversation part of the prompt (system prompt excluded)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "400"))
+# Most recent messages that are always sent verbatim
+HISTORY_KEEP_MESSAGES = int(os.getenv("HISTORY_KEEP_MESSAGES", "4"))
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators per chat message
+SUMMARY_PREFIX = ("Summary of the earlier conversation (patient, requests completed, request in progress "
+                  "with its details, latest value wins): ")
+# Requests whose details are scoped in the summary (the rest - greetings, thanks - leave it alone)
+REQUEST_INTENTS = {intent.value for intent in INTENT_REQUIREMENTS}
+
+# Words, numbers and single punctuation marks - close to BPE counts for English and JSON
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+
+def count_tokens(text: str) -> int:
+    if TOKENIZER is not None:
+        return len(TOKENIZER.encode(text))
+    return len(TOKEN_PATTERN.findall(text))
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def compact_reply(result: Dict[str, Any]) -> str:
+    """Assistant reply as stored in the history: no null entities, no whitespace"""
+    entities = {k: v for k, v in (result.get("entities") or {}).items() if v is not None}
+    return json.dumps({**result, "entities": entities}, separators=(",", ":"))
+
+
+class HistoryCompactor:
+    """
+    Keeps the conversation part of the prompt within a token budget.
+    Once the messages after the system prompt exceed budget tokens, the oldest ones are folded
+    into one summary message: the patient's name, the requests already completed, and the
+    request in progress with the entities collected for it, so the name or chosen doctor stay
+    in context however long the call runs. Entities are scoped to their request - a new
+    request or a completed one starts with none. The last keep_messages messages are always
+    kept verbatim.
+    """
+
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, keep_messages: int = HISTORY_KEEP_MESSAGES):
+        self.budget = budget
+        self.keep_messages = keep_messages
+
+    def compact(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Fold old turns into the summary (in place); history[0] is the system prompt"""
+        summary = self._read_summary(history[1]) if len(history) > 1 else None
+        start = 2 if summary is not None else 1
+        messages = history[start:]
+        sizes = [message_tokens(message) for message in messages]
+        used = sum(sizes) + (message_tokens(history[1]) if summary is not None else 0)
+        if used <= self.budget:
+            return history
+
+        summary = summary or {"turns": 0, "patient_name": None, "completed": [], "intent": None, "entities": {}}
+        folded = 0
+        while len(messages) - folded > self.keep_messages and used > self.budget:
+            self._fold(summary, messages[folded])
+            used -= sizes[folded]
+            folded += 1
+        if not folded:
+            return history
+
+        summary_message = {"role": "system", "content": SUMMARY_PREFIX + json.dumps(summary, separators=(",", ":"))}
+        history[1:] = [summary_message] + messages[folded:]
+        metrics.increment("history.folded_messages", folded)
+        metrics.observe("history.tokens", self.conversation_tokens(history))
+        return history
+
+    def conversation_tokens(self, history: List[Dict[str, str]]) -> int:
+        return sum(message_tokens(message) for message in history[1:])
+
+    def _fold(self, summary: Dict[str, Any], message: Dict[str, str]):
+        if message["role"] == "user":
+            summary["turns"] += 1
+            return
+        if message["role"] != "assistant":
+            return
+        try:
+            result = json.loads(message["content"])
+        except (TypeError, ValueError):
+            return
+        entities = {k: v for k, v in (result.get("entities") or {}).items() if v is not None}
+        if entities.get("patient_name"):
+            summary["patient_name"] = entities["patient_name"]
+        intent = result.get("intent")
+        if intent not in REQUEST_INTENTS:
+            return
+        if intent != summary["intent"]:
+            # A different request - the details of the previous one no longer apply
+            summary["intent"], summary["entities"] = intent, {}
+        summary["entities"].update(entities)
+        if not missing_requirements(intent, summary["entities"]):
+            # Fulfilled - remember it was done, the next request starts clean
+            done = " ".join(filter(None, (intent, summary["entities"].get("appointment_id"))))
+            if not summary["completed"] or summary["completed"][-1] != done:
+                summary["completed"].append(done)
+            summary["intent"], summary["entities"] = None, {}
+
+    def _read_summary(self, message: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        if message["role"] != "system" or not message["content"].startswith(SUMMARY_PREFIX):
+            return None
+        try:
+            return json.loads(message["content"][len(SUMMARY_PREFIX):])
+        except ValueError:
+            return None
+
+
+# Global instance
+history_compactor = HistoryCompactor()
\ No newline at end of file
@@ -0,0 +1,157 @@
+# app/services/intent_classifier.py
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from app.models.appointment import APPOINTMENT_ID_DIGITS
+from app.models.intent_model import IntentResponse, IntentType
+from .text_normalizer import normalize_transcript
+from .metrics import metrics
+
+# Answer trivial turns locally instead of calling OpenAI
+LOCAL_INTENT_ENABLED = os.getenv("LOCAL_INTENT_ENABLED", "true").lower() == "true"
+# Rules scoring below this fall through to the LLM
+LOCAL_INTENT_MIN_CONFIDENCE = float(os.getenv("LOCAL_INTENT_MIN_CONFIDENCE", "0.9"))
+
+# Words that carry no intent - dropped before matching
+FILLERS = {"um", "uh", "erm", "er", "hmm", "mm", "oh", "ah", "well", "just", "please"}
+
+ACKNOWLEDGEMENTS = r"(?:ok|okay|alright|all right|great|perfect|lovely|brilliant|cool)"
+GREETING_PATTERN = re.compile(
+    r"(?:hi|hello|hey|hiya|good (?:morning|afternoon|evening))(?: there)?(?: (?:hi|hello|hey))*"
+)
+THANKS_PATTERN = re.compile(
+    rf"(?:{ACKNOWLEDGEMENTS} )?(?:thanks|thank you|cheers|many thanks)"
+    r"(?: (?:so much|very much|a lot|again))?"
+    r"(?: (?:that's all|that is all|bye|goodbye|bye bye))?"
+)
+GOODBYE_PATTERN = re.compile(r"(?:that's all|that is all)?(?: ?(?:bye|goodbye|bye bye))+")
+ID_PATTERN = r"(\d(?: ?\d){%d})" % (APPOINTMENT_ID_DIGITS - 1)
+# Reply that is only an appointment ID ("123456", "my ID is 123456")
+ID_ONLY_PATTERN = re.compile(
+    r"(?:(?:it's|it is|its|yes|yeah|sure|the|my|appointment|id|number|is|it)\s)*" + ID_PATTERN
+)
+CANCEL_WITH_ID_PATTERN = re.compile(
+    r"(?:i want to |i'd like to |i would like to |i need to |can you |could you |can i )?"
+    r"cancel (?:my |the )?appointment(?: id| number)?(?: is)? " + ID_PATTERN
+)
+
+# Intents whose follow-up question is "what is your appointment ID?"
+ID_INTENTS = {
+    IntentType.CANCEL_APPOINTMENT.value,
+    IntentType.RESCHEDULE_APPOINTMENT.value,
+    IntentType.QUERY_APPOINTMENT.value
+}
+
+GREETING_REPLY = "Hello! How can I help you with your appointment today?"
+THANKS_REPLY = "You're welcome! Is there anything else I can help you with?"
+GOODBYE_REPLY = "You're welcome. Goodbye and take care!"
+
+
+def _clean(transcript: str) -> str:
+    """Lowercase, number words as digits, no punctuation or fillers"""
+    text = normalize_transcript(transcript).lower()
+    words = re.findall(r"[a-z0-9']+", text)
+    return " ".join(word for word in words if word not in FILLERS)
+
+
+def extract_appointment_id(transcript: str) -> Optional[str]:
+    """Appointment ID when it is the whole reply ("123456", "it's one two three four five six")"""
+    match = ID_ONLY_PATTERN.fullmatch(_clean(transcript))
+    return match.group(1).replace(" ", "") if match else None
+
+
+class LocalIntentClassifier:
+    """
+    Deterministic intent rules in front of OpenAI.
+    Each rule must explain the whole (cleaned) utterance and scores a confidence; a bare
+    appointment ID only scores when the previous assistant turn was asking for one.
+    classify() returns an IntentResponse when the best rule reaches min_confidence,
+    otherwise None and the turn goes to the LLM as before.
+    """
+
+    def __init__(self, min_confidence: float = LOCAL_INTENT_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+
+    def score(self, transcript: str, previous: Optional[Dict[str, Any]] = None) -> List[Tuple[float, dict]]:
+        """Candidate results (LLM response format) with their confidence, best first"""
+        text = _clean(transcript)
+        if not text:
+            return []
+        previous_intent = (previous or {}).get("intent")
+        candidates = []
+
+        if GREETING_PATTERN.fullmatch(text):
+            candidates.append((0.95, self._result(IntentType.GREETING, {}, GREETING_REPLY)))
+
+        if THANKS_PATTERN.fullmatch(text):
+            reply = GOODBYE_REPLY if text.endswith("bye") else THANKS_REPLY
+            candidates.append((0.95, self._result(IntentType.THANKS, {}, reply)))
+        elif GOODBYE_PATTERN.fullmatch(text):
+            # "bye" on its own is usually the end of the call, but could be cut off
+            candidates.append((0.9, self._result(IntentType.THANKS, {}, GOODBYE_REPLY)))
+
+        match = CANCEL_WITH_ID_PATTERN.fullmatch(text)
+        if match:
+            appointment_id = match.group(1).replace(" ", "")
+            candidates.append((0.95, self._result(
+                IntentType.CANCEL_APPOINTMENT, {"appointment_id": appointment_id},
+                f"Let me cancel appointment {appointment_id} for you."
+            )))
+
+        match = ID_ONLY_PATTERN.fullmatch(text)
+        if match:
+            appointment_id = match.group(1).replace(" ", "")
+            if previous_intent in ID_INTENTS:
+                # Answer to "what is your appointment ID?" - keep what the LLM already extracted
+                entities = {k: v for k, v in (previous.get("entities") or {}).items() if v is not None}
+                entities["appointment_id"] = appointment_id
+                candidates.append((0.95, self._result(
+                    IntentType(previous_intent), entities, self._id_reply(previous_intent, entities)
+                )))
+            else:
+                # A number out of context could be a date, time or phone number
+                candidates.append((0.5, self._result(IntentType.UNKNOWN, {"appointment_id": appointment_id}, "")))
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return candidates
+
+    def classify(self, transcript: str, previous: Optional[Dict[str, Any]] = None) -> Optional[IntentResponse]:
+        """Local IntentResponse for a high-confidence turn, None to ask the LLM"""
+        candidates = self.score(transcript, previous)
+        if not candidates or candidates[0][0] < self.min_confidence:
+            metrics.increment("intent.local.fallthrough")
+            self._update_rate()
+            return None
+        confidence, result = candidates[0]
+        metrics.increment("intent.local.hits")
+        self._update_rate()
+        return IntentResponse(
+            intent=IntentType(result["intent"]),
+            entities=result["entities"],
+            confidence=confidence,
+            raw_transcript=transcript,
+            processed_response=result["processed_response"]
+        )
+
+    def _result(self, intent: IntentType, entities: Dict[str, Any], reply: str) -> dict:
+        return {"intent": intent.value, "entities": entities, "processed_response": reply}
+
+    def _id_reply(self, intent: str, entities: Dict[str, Any]) -> str:
+        # Cancel and query replies are rewritten once the database answers
+        appointment_id = entities["appointment_id"]
+        if intent == IntentType.CANCEL_APPOINTMENT.value:
+            return f"Let me cancel appointment {appointment_id} for you."
+        if intent == IntentType.QUERY_APPOINTMENT.value:
+            return f"Let me look up appointment {appointment_id} for you."
+        if entities.get("date"):
+            return f"Let me move appointment {appointment_id} to {entities['date']}."
+        return f"Thanks. What date would you like to move appointment {appointment_id} to?"
+
+    def _update_rate(self):
+        hits = metrics.counters.get("intent.local.hits", 0)
+        total = hits + metrics.counters.get("intent.local.fallthrough", 0)
+        metrics.set_gauge("intent.local.rate", round(hits / total, 3) if total else 0.0)
+
+
+# Create global instance
+local_intent_classifier = LocalIntentClassifier()
\ No newline at end of file
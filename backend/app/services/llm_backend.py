@@ -0,0 +1,334 @@
+# app/services/llm_backend.py
+import os
+import re
+import json
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from openai import AsyncOpenAI
+from app.models.appointment import APPOINTMENT_ID_DIGITS
+from .history_manager import count_tokens, message_tokens
+from .intent_classifier import local_intent_classifier
+from .text_normalizer import normalize_transcript
+
+# openai | compatible (any OpenAI-compatible server) | scripted (offline, deterministic)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai").lower()
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+# For the compatible backend: vLLM, Ollama, LM Studio, a gateway...
+LLM_BASE_URL = os.getenv("LLM_BASE_URL")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "not-needed")
+# Some compatible servers reject stream_options - streamed calls then report no usage
+LLM_STREAM_USAGE = os.getenv("LLM_STREAM_USAGE", "true").lower() == "true"
+
+# Scripted backend: time to first token, spread, and generation speed (0 = instant)
+SCRIPTED_LATENCY_MS = float(os.getenv("SCRIPTED_LATENCY_MS", "300"))
+SCRIPTED_JITTER_MS = float(os.getenv("SCRIPTED_JITTER_MS", "0"))
+SCRIPTED_TOKENS_PER_SECOND = float(os.getenv("SCRIPTED_TOKENS_PER_SECOND", "80"))
+# Optional JSON file: [{"pattern": "<regex on the patient message>", "reply": {...}}, ...]
+SCRIPTED_LLM_SCRIPT = os.getenv("SCRIPTED_LLM_SCRIPT")
+
+CHARS_PER_TOKEN = 4  # size of the pieces the scripted stream yields
+
+PATIENT_PREFIX = "Patient message: "
+RESOLVED_PATTERN = re.compile(r"\n\(Resolved: (.*)\)$")
+NAME_PATTERN = re.compile(r"\b(?:my name is|this is|i'm|i am|call me)\s+([a-z]+(?:\s+[a-z]+)?)", re.I)
+DOCTOR_PATTERN = re.compile(r"\b(?:dr\.?|doctor)\s+([a-z]+(?:\s+[a-z]+)?)", re.I)
+APPOINTMENT_ID_PATTERN = re.compile(r"\b\d{%d}\b" % APPOINTMENT_ID_DIGITS)
+KEYWORD_INTENTS = [
+    (re.compile(r"\bcancel"), "cancel_appointment"),
+    (re.compile(r"\b(?:reschedule|move|change)\b"), "reschedule_appointment"),
+    (re.compile(r"\b(?:when is|what time is|details|look up)\b"), "query_appointment"),
+    (re.compile(r"\b(?:available|availability|which doctors)\b"), "query_availability"),
+    (re.compile(r"\b(?:book|appointment|see (?:a |the )?(?:dr|doctor))"), "book_appointment"),
+]
+# Slots the scripted responder asks for, in order, and how
+SLOT_QUESTIONS = {
+    "book_appointment": [
+        ("patient_name", "May I have your full name?"),
+        ("doctor_name", "Which doctor would you like to see?"),
+        ("date", "What date would you like?"),
+        ("time", "What time works for you?"),
+    ],
+    "reschedule_appointment": [
+        ("appointment_id", "Could you please provide your appointment ID?"),
+        ("date", "What date would you like to move it to?"),
+        ("time", "And what time?"),
+    ],
+    "cancel_appointment": [("appointment_id", "Could you please provide your appointment ID?")],
+    "query_appointment": [("appointment_id", "Could you please provide your appointment ID?")],
+}
+ENTITY_KEYS = ["doctor_name", "doctor_specialization", "date", "time", "reason", "patient_name", "appointment_id"]
+
+
+class Usage:
+    """Token counts for one completion"""
+
+    def __init__(self, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_tokens = cached_tokens
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class Completion:
+    def __init__(self, content: str, usage: Optional[Usage]):
+        self.content = content
+        self.usage = usage
+
+
+class StreamChunk:
+    """A piece of streamed reply text; the last chunk may carry only usage"""
+
+    def __init__(self, text: str, usage: Optional[Usage] = None):
+        self.text = text
+        self.usage = usage
+
+
+class LLMBackend(ABC):
+    """
+    Chat completion provider used by OpenAIService (JSON-object replies).
+    complete() returns the whole reply; stream() returns an async generator of StreamChunks -
+    closing it (aclose) releases the underlying connection. model overrides the default model.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @abstractmethod
+    async def complete(self, messages: List[Dict], timeout: float, max_tokens: int = 500,
+                       model: Optional[str] = None) -> Completion:
+        """The whole reply"""
+
+    @abstractmethod
+    async def stream(self, messages: List[Dict], timeout: float, max_tokens: int = 500,
+                     model: Optional[str] = None) -> AsyncIterator[StreamChunk]:
+        """An async generator of StreamChunks"""
+
+    async def close(self):
+        pass
+
+
+def _usage(usage) -> Optional[Usage]:
+    if not usage:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return Usage(usage.prompt_tokens, usage.completion_tokens, getattr(details, "cached_tokens", None) or 0)
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat completions (AsyncOpenAI; retries are left to the caller)"""
+
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str], model: str = LLM_MODEL, base_url: Optional[str] = None,
+                 stream_usage: bool = True):
+        super().__init__(model)
+        # Without a key the backend is still created (the app stays importable); every call
+        # then fails and the caller answers with its fallback reply
+        if not api_key:
+            print("⚠️ OPENAI_API_KEY not set - LLM calls disabled")
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0) if api_key else None
+        self.stream_usage = stream_usage
+
+    def _client(self) -> AsyncOpenAI:
+        if self.client is None:
+            raise RuntimeError("OPENAI_API_KEY not set in environment variables")
+        return self.client
+
+    async def complete(self, messages: List[Dict], timeout: float, max_tokens: int = 500,
+                       model: Optional[str] = None) -> Completion:
+        response = await self._client().chat.completions.create(
+            model=model or self.model,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            timeout=timeout
+        )
+        return Completion(response.choices[0].message.content, _usage(response.usage))
+
+    async def stream(self, messages: List[Dict], timeout: float, max_tokens: int = 500,
+                     model: Optional[str] = None) -> AsyncIterator[StreamChunk]:
+        options = {"stream_options": {"include_usage": True}} if self.stream_usage else {}
+        stream = await self._client().chat.completions.create(
+            model=model or self.model,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            stream=True,
+            timeout=timeout,
+            **options
+        )
+        return self._chunks(stream)
+
+    async def _chunks(self, stream) -> AsyncIterator[StreamChunk]:
+        try:
+            async for chunk in stream:
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                yield StreamChunk(text or "", _usage(chunk.usage))
+        finally:
+            await stream.close()
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.close()
+
+
+class CompatibleBackend(OpenAIBackend):
+    """Any server that speaks the OpenAI chat completions API, at LLM_BASE_URL"""
+
+    name = "compatible"
+
+    def __init__(self, base_url: Optional[str], api_key: str = LLM_API_KEY, model: str = LLM_MODEL,
+                 stream_usage: bool = LLM_STREAM_USAGE):
+        if not base_url:
+            raise ValueError("LLM_BASE_URL not set in environment variables")
+        super().__init__(api_key, model=model, base_url=base_url, stream_usage=stream_usage)
+
+
+class ScriptedBackend(LLMBackend):
+    """
+    Offline, deterministic stand-in for load tests and CI - no key, no network.
+    The reply to the last patient message comes from the script rules, else the local intent
+    rules, else keyword intents with simple slot filling; the same conversation always gets the
+    same replies. The first token arrives after latency_ms (plus a jitter fixed per message) and
+    the rest at tokens_per_second; usage is counted like a real call. model_speed makes other
+    models faster or slower (e.g. {"gpt-4.1-nano": 2.0} halves both latencies for that model).
+    """
+
+    name = "scripted"
+
+    def __init__(self, model: str = "scripted", latency_ms: float = SCRIPTED_LATENCY_MS,
+                 jitter_ms: float = SCRIPTED_JITTER_MS, tokens_per_second: float = SCRIPTED_TOKENS_PER_SECOND,
+                 script: Optional[List[Tuple[str, Dict[str, Any]]]] = None,
+                 model_speed: Optional[Dict[str, float]] = None):
+        super().__init__(model)
+        self.model_speed = model_speed or {}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        if script is None and SCRIPTED_LLM_SCRIPT:
+            with open(SCRIPTED_LLM_SCRIPT) as f:
+                script = [(rule["pattern"], rule["reply"]) for rule in json.load(f)]
+        self.script = [(re.compile(pattern, re.I), reply) for pattern, reply in (script or [])]
+
+    async def complete(self, messages: List[Dict], timeout: float, max_tokens: int = 500,
+                       model: Optional[str] = None) -> Completion:
+        content, usage = self._reply(messages)
+        speed = self.model_speed.get(model, 1.0)
+        await asyncio.sleep((self._first_token_delay(messages) + self._generation_time(usage.completion_tokens)) / speed)
+        return Completion(content, usage)
+
+    async def stream(self, messages: List[Dict], timeout: float, max_tokens: int = 500,
+                     model: Optional[str] = None) -> AsyncIterator[StreamChunk]:
+        content, usage = self._reply(messages)
+        return self._chunks(content, usage, self._first_token_delay(messages), self.model_speed.get(model, 1.0))
+
+    async def _chunks(self, content: str, usage: Usage, delay: float, speed: float) -> AsyncIterator[StreamChunk]:
+        await asyncio.sleep(delay / speed)
+        per_token = self._generation_time(1) / speed
+        for start in range(0, len(content), CHARS_PER_TOKEN):
+            if start and per_token:
+                await asyncio.sleep(per_token)
+            yield StreamChunk(content[start:start + CHARS_PER_TOKEN])
+        yield StreamChunk("", usage)
+
+    def _first_token_delay(self, messages: List[Dict]) -> float:
+        if not self.jitter_ms:
+            return self.latency_ms / 1000
+        digest = hashlib.md5(messages[-1]["content"].encode()).digest()
+        return (self.latency_ms + self.jitter_ms * digest[0] / 255) / 1000
+
+    def _generation_time(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _reply(self, messages: List[Dict]) -> Tuple[str, Usage]:
+        content = json.dumps(self.reply(messages))
+        usage = Usage(sum(message_tokens(message) for message in messages), count_tokens(content))
+        return content, usage
+
+    def reply(self, messages: List[Dict]) -> Dict[str, Any]:
+        """The reply (intent JSON) for the last user message"""
+        transcript, resolved = self._patient_message(messages[-1]["content"])
+        previous = self._previous(messages)
+
+        for pattern, reply in self.script:
+            if pattern.search(transcript):
+                return {"entities": {}, "confidence": 0.9, **reply}
+
+        candidates = local_intent_classifier.score(transcript, previous)
+        if candidates and candidates[0][0] >= 0.9:
+            confidence, result = candidates[0]
+            return dict(result, confidence=confidence)
+
+        text = normalize_transcript(transcript).lower()
+        intent = next((intent for pattern, intent in KEYWORD_INTENTS if pattern.search(text)), None)
+        if intent is None and previous and previous.get("intent") in SLOT_QUESTIONS:
+            intent = previous["intent"]  # answer to our last question
+        if intent is None:
+            return self._result("unknown", {}, 0.5, "Sorry, could you tell me how I can help with your appointment?")
+
+        entities = dict((previous or {}).get("entities") or {}) if previous and previous.get("intent") == intent else {}
+        entities.update(resolved)
+        for pattern, key in ((NAME_PATTERN, "patient_name"), (DOCTOR_PATTERN, "doctor_name")):
+            match = pattern.search(transcript)
+            if match:
+                entities[key] = match.group(1).title()
+        match = APPOINTMENT_ID_PATTERN.search(text)
+        if match:
+            entities["appointment_id"] = match.group(0)
+
+        for key, question in SLOT_QUESTIONS.get(intent, []):
+            if not entities.get(key):
+                return self._result(intent, entities, 0.85, question)
+        if intent == "book_appointment":
+            return self._result(intent, entities, 0.9, f"I'll book Dr. {entities['doctor_name']} on "
+                                                       f"{entities['date']} at {entities['time']} for you.")
+        if intent == "query_availability":
+            return self._result(intent, entities, 0.85, "Our doctors are available Monday to Friday, 9 to 5.")
+        return self._result(intent, entities, 0.9, f"One moment while I check appointment {entities['appointment_id']}.")
+
+    def _result(self, intent: str, entities: Dict[str, Any], confidence: float, response: str) -> Dict[str, Any]:
+        return {
+            "intent": intent,
+            "entities": {**{key: None for key in ENTITY_KEYS}, **entities},
+            "confidence": confidence,
+            "processed_response": response
+        }
+
+    def _patient_message(self, content: str) -> Tuple[str, Dict[str, str]]:
+        resolved = {}
+        match = RESOLVED_PATTERN.search(content)
+        if match:
+            content = content[:match.start()]
+            resolved = dict(part.split("=", 1) for part in match.group(1).split(", "))
+        if content.startswith(PATIENT_PREFIX):
+            content = content[len(PATIENT_PREFIX):]
+        return content, resolved
+
+    def _previous(self, messages: List[Dict]) -> Optional[Dict[str, Any]]:
+        for message in reversed(messages[:-1]):
+            if message["role"] == "assistant":
+                try:
+                    return json.loads(message["content"])
+                except ValueError:
+                    return None
+        return None
+
+
+def create_backend(name: str = LLM_BACKEND) -> LLMBackend:
+    """Backend selected by LLM_BACKEND"""
+    if name == "openai":
+        return OpenAIBackend(os.getenv("OPENAI_API_KEY"), model=LLM_MODEL)
+    if name == "compatible":
+        return CompatibleBackend(LLM_BASE_URL)
+    if name == "scripted":
+        return ScriptedBackend()
+    raise ValueError(f"Unknown LLM_BACKEND '{name}' (expected openai, compatible or scripted)")
\ No newline at end of file
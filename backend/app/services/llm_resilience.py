@@ -0,0 +1,220 @@
+# app/services/llm_resilience.py
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+from .metrics import metrics
+
+# Everything for one turn (attempts, hedges, retries, backoff) has to fit in this
+LLM_TURN_DEADLINE_S = float(os.getenv("LLM_TURN_DEADLINE_S", "8"))
+# Send a duplicate request once the first has been outstanding longer than the recent p95
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "400"))
+LLM_HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "2500"))  # until there are enough samples
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_MS = float(os.getenv("LLM_RETRY_BASE_MS", "200"))
+LLM_RETRY_MAX_MS = float(os.getenv("LLM_RETRY_MAX_MS", "2000"))
+# Consecutive failed attempts before the breaker opens, and how long it stays open
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 4000, 8000)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+BREAKER_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+T = TypeVar("T")
+
+
+class LLMUnavailable(Exception):
+    """No answer within the turn deadline, retries exhausted or the circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker. After failure_threshold failed attempts in a row
+    calls are rejected for cooldown_s; then a single probe is let through (half-open) and
+    its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = LLM_BREAKER_FAILURES,
+                 cooldown_s: float = LLM_BREAKER_COOLDOWN_S):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    @property
+    def is_open(self) -> bool:
+        """Calls would be rejected right now (does not use up the half-open probe)"""
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.cooldown_s
+        return self.state == HALF_OPEN and self.probing
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown_s:
+                return False
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.probing = False
+        if self.state != CLOSED:
+            print(f"✅ {self.name} circuit closed")
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            print(f"⚠️ {self.name} circuit open after {self.failures} failures - "
+                  f"local fallback for {self.cooldown_s:g}s")
+            self.opened_at = time.monotonic()
+            metrics.increment(f"{self.name}.breaker.opened")
+            self._set_state(OPEN)
+
+    def _set_state(self, state: str):
+        self.state = state
+        metrics.set_gauge(f"{self.name}.breaker.state", BREAKER_STATE_GAUGE[state])
+
+
+class ResilientCaller:
+    """
+    Deadline, hedging and retries around one kind of LLM request.
+    call(request) runs request(timeout_s) until it succeeds within deadline_s. If an attempt is
+    still outstanding after the recent p95 latency, a duplicate is sent and whichever answers
+    first wins (the other is cancelled or handed to discard). Retryable errors are retried with
+    full-jitter exponential backoff while the deadline allows. Every failed attempt counts towards
+    the circuit breaker; when it is open call() raises LLMUnavailable without touching the network.
+    """
+
+    def __init__(self, name: str, retryable: Tuple[Type[BaseException], ...] = (asyncio.TimeoutError,),
+                 deadline_s: float = LLM_TURN_DEADLINE_S, hedge: bool = LLM_HEDGE_ENABLED,
+                 hedge_min_ms: float = LLM_HEDGE_MIN_MS, hedge_default_ms: float = LLM_HEDGE_DEFAULT_MS,
+                 max_attempts: int = LLM_MAX_ATTEMPTS, retry_base_ms: float = LLM_RETRY_BASE_MS,
+                 retry_max_ms: float = LLM_RETRY_MAX_MS, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.retryable = tuple(retryable) + (asyncio.TimeoutError,)
+        self.deadline_s = deadline_s
+        self.hedge = hedge
+        self.hedge_min_ms = hedge_min_ms
+        self.hedge_default_ms = hedge_default_ms
+        self.max_attempts = max_attempts
+        self.retry_base_ms = retry_base_ms
+        self.retry_max_ms = retry_max_ms
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)  # ms per successful request
+        metrics.set_buckets(f"{name}.turn_ms", LATENCY_BUCKETS_MS)
+        metrics.set_buckets(f"{name}.attempt_ms", LATENCY_BUCKETS_MS)
+
+    def hedge_delay_ms(self) -> float:
+        """p95 of recent request latency (the default until there are enough samples)"""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return self.hedge_default_ms
+        values = sorted(self.latencies)
+        return max(self.hedge_min_ms, values[int(0.95 * (len(values) - 1))])
+
+    async def call(self, request: Callable[[float], Awaitable[T]],
+                   discard: Optional[Callable[[T], Awaitable[None]]] = None) -> T:
+        """
+        Result of request(timeout_s), or LLMUnavailable.
+        discard(result) releases a result that lost the hedge race (e.g. closes an open stream).
+        """
+        if not self.breaker.allow():
+            metrics.increment(f"{self.name}.breaker.rejected")
+            raise LLMUnavailable(f"{self.name} circuit open")
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.deadline_s
+        error: Optional[BaseException] = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                # Full jitter so sessions that failed together don't retry together
+                backoff = random.uniform(0, min(self.retry_max_ms, self.retry_base_ms * 2 ** attempt)) / 1000
+                if time.monotonic() + backoff >= deadline or not self.breaker.allow():
+                    break
+                metrics.increment(f"{self.name}.retries")
+                await asyncio.sleep(backoff)
+
+            try:
+                result = await self._hedged(request, deadline, discard)
+            except asyncio.CancelledError:
+                self.breaker.probing = False
+                raise
+            except Exception as e:
+                error = e
+                self.breaker.record_failure()
+                metrics.increment(f"{self.name}.failures")
+                print(f"⚠️ {self.name} attempt {attempt + 1} failed: {type(e).__name__}: {e}")
+                if not isinstance(e, self.retryable):
+                    break
+                continue
+
+            self.breaker.record_success()
+            metrics.observe(f"{self.name}.turn_ms", (time.perf_counter() - started) * 1000)
+            return result
+
+        if time.monotonic() >= deadline or isinstance(error, asyncio.TimeoutError):
+            metrics.increment(f"{self.name}.deadline_exceeded")
+        raise LLMUnavailable(f"{self.name} unavailable: {type(error).__name__ if error else 'deadline'}") from error
+
+    async def _hedged(self, request: Callable[[float], Awaitable[T]], deadline: float,
+                      discard: Optional[Callable[[T], Awaitable[None]]]) -> T:
+        """One attempt: the request plus (if it is slow) a hedged duplicate - first success wins"""
+        hedge_at = time.monotonic() + self.hedge_delay_ms() / 1000 if self.hedge else None
+        tasks = [asyncio.create_task(self._timed(request, deadline))]
+        pending = set(tasks)
+        winner = None
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise asyncio.TimeoutError()
+                waiting_for_hedge = hedge_at is not None and len(tasks) == 1
+                timeout = min(deadline, hedge_at) - now if waiting_for_hedge else deadline - now
+                done, pending = await asyncio.wait(pending, timeout=max(timeout, 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+                    error = task.exception()
+                if winner:
+                    if len(tasks) > 1:
+                        metrics.increment(f"{self.name}.hedge_wins" if winner is tasks[1] else f"{self.name}.hedge_losses")
+                    return winner.result()
+                if not done and waiting_for_hedge and time.monotonic() >= hedge_at:
+                    metrics.increment(f"{self.name}.hedges")
+                    hedge = asyncio.create_task(self._timed(request, deadline))
+                    tasks.append(hedge)
+                    pending.add(hedge)
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif task is not winner and discard and not task.cancelled() and task.exception() is None:
+                    await discard(task.result())
+
+    async def _timed(self, request: Callable[[float], Awaitable[T]], deadline: float) -> T:
+        started = time.perf_counter()
+        timeout = deadline - time.monotonic()
+        result = await asyncio.wait_for(request(timeout), timeout)
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.latencies.append(latency_ms)
+        metrics.observe(f"{self.name}.attempt_ms", latency_ms)
+        return result
\ No newline at end of file
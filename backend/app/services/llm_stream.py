@@ -0,0 +1,165 @@
+# app/services/llm_stream.py
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# Parser positions inside the top-level object
+KEY, COLON, VALUE_START, STRING_VALUE, NESTED_VALUE, LITERAL_VALUE, AFTER_VALUE = range(7)
+
+# ("field", key, value) once a top-level value is complete, ("delta", key, text) for streamed strings
+ParseEvent = Tuple[str, str, Any]
+
+
+class StreamingJSONParser:
+    """
+    Incremental parser for one JSON object arriving in chunks (a streamed json_object completion).
+    Each character is looked at once. A top-level field is reported as soon as its value is
+    complete, so "intent" is known long before the reply ends; string fields named in
+    stream_fields are also reported piece by piece as their text arrives.
+    """
+
+    def __init__(self, stream_fields: Iterable[str] = ("processed_response",)):
+        self.stream_fields = set(stream_fields)
+        self.values: Dict[str, Any] = {}  # completed top-level fields
+        self.started = False
+        self.done = False
+
+        self.state = KEY
+        self.key: Optional[str] = None
+        self.raw: List[str] = []     # source text of the current key or value
+        self.in_string = False
+        self.escape: Optional[str] = None  # escape sequence being read (after the backslash)
+        self.depth = 0               # nesting inside the current value
+        self.streaming = False       # current value is a stream field
+        self.text: List[str] = []    # decoded stream text not reported yet
+        self.high_surrogate: Optional[str] = None
+
+    def feed(self, delta: str) -> List[ParseEvent]:
+        """Parse the next chunk; returns the fields and stream text it completed"""
+        events: List[ParseEvent] = []
+        for char in delta:
+            if self.done:
+                break
+            self._char(char, events)
+        self._flush_text(events)
+        return events
+
+    def _char(self, char: str, events: List[ParseEvent]):
+        if not self.started:
+            if char == '{':
+                self.started = True
+            return
+
+        if self.in_string:
+            self._string_char(char, events)
+            return
+
+        state = self.state
+        if state == LITERAL_VALUE:
+            if char not in ',}' and not char.isspace():
+                self.raw.append(char)
+                return
+            self._finish_value(events)
+            state = AFTER_VALUE
+
+        if state == KEY:
+            if char == '"':
+                self.raw = [char]
+                self.in_string = True
+            elif char == '}':
+                self.done = True
+        elif state == COLON:
+            if char == ':':
+                self.state = VALUE_START
+        elif state == VALUE_START:
+            if char.isspace():
+                return
+            self.raw = [char]
+            if char == '"':
+                self.state = STRING_VALUE
+                self.in_string = True
+                self.streaming = self.key in self.stream_fields
+            elif char in '{[':
+                self.state = NESTED_VALUE
+                self.depth = 1
+            else:
+                self.state = LITERAL_VALUE
+        elif state == NESTED_VALUE:
+            self.raw.append(char)
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    self._finish_value(events)
+        elif state == AFTER_VALUE:
+            if char == ',':
+                self.state = KEY
+            elif char == '}':
+                self.done = True
+
+    def _string_char(self, char: str, events: List[ParseEvent]):
+        self.raw.append(char)
+        if self.escape is not None:
+            self.escape += char
+            if self.escape[0] == 'u' and len(self.escape) < 5:
+                return  # \uXXXX split across characters (or chunks)
+            if self.streaming:
+                self._decoded(self._unescape(self.escape))
+            self.escape = None
+            return
+        if char == '\\':
+            self.escape = ""
+            return
+        if char != '"':
+            if self.streaming:
+                self._decoded(char)
+            return
+
+        # Closing quote
+        self.in_string = False
+        if self.state == KEY:
+            self.key = json.loads(''.join(self.raw))
+            self.state = COLON
+        elif self.state == STRING_VALUE:
+            self._finish_value(events)
+
+    def _unescape(self, escape: str) -> str:
+        if escape[0] == 'u':
+            try:
+                return chr(int(escape[1:5], 16))
+            except ValueError:
+                return ""
+        return JSON_ESCAPES.get(escape, escape)
+
+    def _decoded(self, char: str):
+        # Characters outside the BMP arrive as two \u escapes - only pass on whole characters
+        if self.high_surrogate is not None:
+            pair = self.high_surrogate + char
+            self.high_surrogate = None
+            char = pair.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+        elif '\ud800' <= char <= '\udbff':
+            self.high_surrogate = char
+            return
+        self.text.append(char)
+
+    def _flush_text(self, events: List[ParseEvent]):
+        if self.text:
+            events.append(("delta", self.key, ''.join(self.text)))
+            self.text = []
+
+    def _finish_value(self, events: List[ParseEvent]):
+        self._flush_text(events)
+        source = ''.join(self.raw)
+        try:
+            value = json.loads(source)
+        except ValueError:
+            value = source
+        self.values[self.key] = value
+        events.append(("field", self.key, value))
+        self.state = AFTER_VALUE
+        self.streaming = False
+        self.raw = []
\ No newline at end of file
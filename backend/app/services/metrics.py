@@ -0,0 +1,74 @@
+# app/services/metrics.py
+import time
+from collections import deque
+from typing import Dict, Sequence
+
+
+class Metrics:
+    """In-process counters and latency samples for the voice pipeline"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, float] = {}
+        self.samples: Dict[str, deque] = {}
+        self.buckets: Dict[str, Sequence[float]] = {}
+        self.started_at = time.time()
+
+    def increment(self, name: str, value: float = 1):
+        """Add value to a counter"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float):
+        """Record the current value of a gauge"""
+        self.gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        """Record one sample (e.g. a latency in ms) for a summary"""
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.window)
+        self.samples[name].append(value)
+
+    def summary(self, name: str) -> dict:
+        """Count, mean and percentiles over the most recent samples"""
+        values = sorted(self.samples.get(name, ()))
+        if not values:
+            return {"count": 0}
+
+        def percentile(p):
+            index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+            return round(values[index], 2)
+
+        return {
+            "count": len(values),
+            "mean": round(sum(values) / len(values), 2),
+            "p50": percentile(50),
+            "p95": percentile(95),
+            "p99": percentile(99),
+            "max": round(values[-1], 2)
+        }
+
+    def set_buckets(self, name: str, bounds: Sequence[float]):
+        """Also report the samples of name as a histogram with these upper bounds"""
+        self.buckets[name] = sorted(bounds)
+
+    def histogram(self, name: str) -> dict:
+        """Cumulative sample counts per bucket ("le" upper bound) over the most recent samples"""
+        values = self.samples.get(name, ())
+        counts = {f"le_{bound:g}": sum(1 for value in values if value <= bound) for bound in self.buckets[name]}
+        counts["le_inf"] = len(values)
+        return counts
+
+    def snapshot(self) -> dict:
+        """All metrics in a JSON-serializable form"""
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+            "summaries": {name: self.summary(name) for name in self.samples},
+            "histograms": {name: self.histogram(name) for name in self.buckets}
+        }
+
+
+# Global instance
+metrics = Metrics()
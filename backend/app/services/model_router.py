@@ -0,0 +1,103 @@
+# app/services/model_router.py
+import os
+import json
+from typing import Any, Dict, Optional
+from app.config.intent_requirements import pending_requirements
+from app.models.conversation_state import ConversationState
+from app.models.intent_model import IntentType
+from .metrics import metrics
+
+# Slot-filling turns go to the fast tier first; everything else (and escalations) to the strong one
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "true").lower() == "true"
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "gpt-4.1-nano")
+# Fast-tier answers below this confidence are redone by the strong model
+LLM_ESCALATE_CONFIDENCE = float(os.getenv("LLM_ESCALATE_CONFIDENCE", "0.7"))
+LLM_FAST_DEADLINE_S = float(os.getenv("LLM_FAST_DEADLINE_S", "3"))
+
+# Slots a small model extracts reliably; doctor names need the roster and validation rules
+FAST_TIER_SLOTS = {"appointment_id", "patient_name", "date", "time"}
+INTENT_VALUES = {intent.value for intent in IntentType}
+
+FAST, STRONG = "fast", "strong"
+
+
+class ModelRouter:
+    """
+    Two-tier model routing. A turn that answers the single slot we are waiting for (the first
+    of ConversationState.missing_requirements, or of the last reply's intent) goes to fast_model
+    with a slimmed prompt; the answer is escalated to the strong model when it is not valid
+    intent JSON, changes the intent, leaves the slot empty or is below escalate_below confidence.
+    Latency, calls, tokens and the escalation rate are recorded per tier (llm.tier.*).
+    """
+
+    def __init__(self, fast_model: str = LLM_FAST_MODEL, escalate_below: float = LLM_ESCALATE_CONFIDENCE,
+                 enabled: bool = MODEL_ROUTING):
+        self.fast_model = fast_model
+        self.escalate_below = escalate_below
+        self.enabled = enabled
+
+    def route(self, previous: Optional[Dict[str, Any]],
+              state: Optional[ConversationState] = None) -> Optional[Dict[str, Any]]:
+        """
+        {"intent", "slot", "entities", "remaining"} when this turn most likely answers a slot
+        the fast tier can handle, else None (strong model)
+        """
+        pending = pending_requirements(previous, state) if self.enabled else None
+        if pending is None:
+            return None
+        intent, entities, missing = pending
+        if not missing or missing[0] not in FAST_TIER_SLOTS:
+            return None
+        return {"intent": intent, "slot": missing[0], "entities": entities, "remaining": missing[1:]}
+
+    def accept(self, content: Optional[str], intent: str, slot: str) -> Optional[Dict[str, Any]]:
+        """The parsed fast-tier result, or None (with the reason counted) to escalate"""
+        reason = None
+        result = None
+        try:
+            result = json.loads(content or "")
+        except ValueError:
+            reason = "invalid_json"
+        if reason is None:
+            entities = result.get("entities") if isinstance(result, dict) else None
+            confidence = result.get("confidence") if isinstance(result, dict) else None
+            if (not isinstance(entities, dict) or result.get("intent") not in INTENT_VALUES
+                    or not isinstance(confidence, (int, float))
+                    or not isinstance(result.get("processed_response"), str)):
+                reason = "invalid_json"
+            elif result["intent"] != intent:
+                reason = "intent_changed"
+            elif not entities.get(slot):
+                reason = "slot_missing"
+            elif confidence < self.escalate_below:
+                reason = "low_confidence"
+
+        if reason:
+            self._record_escalation(reason)
+            return None
+        metrics.increment(f"llm.tier.{FAST}.accepted")
+        self._update_rate()
+        return result
+
+    def escalated(self, reason: str):
+        """The fast tier failed outright (deadline, provider error)"""
+        self._record_escalation(reason)
+
+    def record(self, tier: str, latency_ms: float):
+        metrics.increment(f"llm.tier.{tier}.calls")
+        metrics.observe(f"llm.tier.{tier}.latency_ms", latency_ms)
+
+    def _record_escalation(self, reason: str):
+        print(f"⬆️ Escalating to the strong model ({reason})")
+        metrics.increment("llm.escalations")
+        metrics.increment(f"llm.escalations.{reason}")
+        self._update_rate()
+
+    def _update_rate(self):
+        escalations = metrics.counters.get("llm.escalations", 0)
+        total = escalations + metrics.counters.get(f"llm.tier.{FAST}.accepted", 0)
+        metrics.set_gauge("llm.escalation_rate", round(escalations / total, 3) if total else 0.0)
+
+
+# Global instance
+model_router = ModelRouter()
\ No newline at end of file
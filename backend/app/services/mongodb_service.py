@@ -6,6 +6,7 @@ from bson import ObjectId
 from datetime import datetime
 import random
 import string
+from app.models.appointment import APPOINTMENT_ID_DIGITS
 
 load_dotenv()
 
@@ -35,7 +36,7 @@ class MongoDBService:
     async def insert_appointment(self, appointment_data: dict):
         """Insert a new appointment and return just the appointment ID string"""
         try:
-            appointment_id = ''.join(random.choices(string.digits, k=6))
+            appointment_id = ''.join(random.choices(string.digits, k=APPOINTMENT_ID_DIGITS))
             # Add timestamps
             appointment_data.update({
                 "appointment_id": appointment_id,
@@ -1,85 +1,246 @@
 # backend/app/services/openai_service.py
 import os
+import re
 import json
+import time
+import asyncio
+import inspect
 import logging
-from openai import AsyncOpenAI
+from openai import APIConnectionError, RateLimitError, InternalServerError
 from dotenv import load_dotenv
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from app.models.intent_model import IntentResponse, IntentType
-from datetime import datetime, timedelta
+from app.services.llm_stream import StreamingJSONParser
+from app.services.intent_classifier import local_intent_classifier, LOCAL_INTENT_ENABLED
+from app.services.prompt_builder import prompt_builder, STABLE_PROMPT
+from app.services.metrics import metrics
+from app.services.session_store import SessionStore
+from app.services.history_manager import history_compactor, compact_reply
+from app.services.datetime_resolver import resolve_datetime
+from app.services.llm_resilience import ResilientCaller, LLMUnavailable
+from app.services.llm_backend import create_backend, LLMBackend
+from app.services.model_router import model_router, LLM_FAST_DEADLINE_S, FAST, STRONG
+from app.models.conversation_state import ConversationState
+from app.config.intent_requirements import pending_requirements
 
 # Load environment variables
 load_dotenv()
 
+# Entity formats the database step expects
+VALUE_FORMATS = {"date": re.compile(r"\d{4}-\d{2}-\d{2}"), "time": re.compile(r"\d{2}:\d{2}")}
+
+# Provider errors worth another attempt (APITimeoutError is an APIConnectionError)
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+FALLBACK_REPLY = "Sorry, I'm having trouble right now. Could you say that again in a moment?"
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-try:
-    from app.services.mongodb_service import mongodb_service
-    MONGODB_AVAILABLE = True
-except ImportError:
-    MONGODB_AVAILABLE = False
-    print("⚠️ MongoDB service not available in openai_service")
-
 class OpenAIService:
-    def __init__(self):
-        self.api_key = os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
-            raise ValueError("OPENAI_API_KEY not set in environment variables")
-        
-        self.client = AsyncOpenAI(api_key=self.api_key)
-        self.model = "gpt-4o-mini"
-        self.conversation_history: Dict[str, List[Dict]] = {}  # session_id -> message history
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        # OpenAI, any OpenAI-compatible server, or the offline scripted responder (LLM_BACKEND)
+        self.backend = backend or create_backend()
+        self.model = self.backend.model
+        # session_id -> message history (bounded, idle sessions expire)
+        self.conversation_history = SessionStore("conversation_history")
+        # Stream completions so the reply text can be spoken while the rest is generated
+        self.streaming = os.getenv("OPENAI_STREAMING", "true").lower() == "true"
+        # Greetings, thanks and bare appointment IDs are answered without a round trip
+        self.local_classifier = local_intent_classifier if LOCAL_INTENT_ENABLED else None
+        # Per-turn deadline, hedged requests, retries and the circuit breaker
+        self.llm = ResilientCaller("openai", retryable=RETRYABLE_ERRORS)
+        # Slot-filling turns try the fast model first (no retries - escalating is the retry)
+        self.router = model_router
+        self.fast_llm = ResilientCaller("openai.fast", retryable=RETRYABLE_ERRORS,
+                                        deadline_s=LLM_FAST_DEADLINE_S, max_attempts=1)
 
-    async def analyze_intent(self, transcript: str, session_id: str = "default") -> IntentResponse:
+    def _get_history(self, session_id: str) -> List[Dict]:
+        """Get or create conversation history - history[0] is the stable system prompt"""
+        if session_id not in self.conversation_history:
+            self.conversation_history[session_id] = [
+                {"role": "system", "content": STABLE_PROMPT}
+            ]
+        return self.conversation_history[session_id]
+
+    async def _request_messages(self, history: List[Dict], sections: tuple, user_message: Optional[Dict] = None) -> List[Dict]:
         """
-        Analyze transcript with conversation context and extract intent/entities
+        Messages for one completion: the stored history, then this turn's prompt sections and
+        context (date, roster) as a system message right before the newest patient message, so
+        everything up to the previous turn stays a cacheable prefix. user_message is appended
+        when it is not in the history (speculative calls).
         """
+        turn_prompt = {"role": "system", "content": await prompt_builder.turn_prompt(sections)}
+        if user_message is None:
+            return history[:-1] + [turn_prompt, history[-1]]
+        return history + [turn_prompt, user_message]
+
+    def _prompt_sections(self, session_id: str, transcript: str, resolved: Dict[str, str],
+                         state: Optional[ConversationState] = None) -> tuple:
+        """Prompt sections for this turn, from the request in progress and the slot we asked for"""
+        previous = self._last_result(self.conversation_history.get(session_id) or [])
+        return prompt_builder.sections_for(pending_requirements(previous, state), transcript, resolved)
+
+    def _resolve(self, session_id: str, transcript: str, state: Optional[ConversationState] = None) -> Dict[str, str]:
+        """Dates/times in the transcript - a bare "the 25th" only counts when we asked for a date"""
+        previous = self._last_result(self.conversation_history.get(session_id) or [])
+        pending = pending_requirements(previous, state)
+        expecting_date = bool(pending and pending[2] and pending[2][0] in ("date", "new_date"))
+        return resolve_datetime(transcript, expecting_date=expecting_date)
+
+    def _last_result(self, history: List[Dict]) -> Optional[Dict[str, Any]]:
+        """Most recent assistant reply in the history, parsed"""
+        for message in reversed(history):
+            if message["role"] == "assistant":
+                try:
+                    return json.loads(message["content"])
+                except (TypeError, ValueError):
+                    return None
+        return None
+
+    async def speculate(self, transcript: str, session_id: str = "default") -> dict:
+        """
+        Intent completion for a transcript that is not committed yet (speculative mode).
+        The history is left untouched; analyze_intent adopts the result if nothing changed.
+        """
+        if self.llm.breaker.is_open:
+            raise LLMUnavailable("openai circuit open")
+        resolved = self._resolve(session_id, transcript)
+        # A copy - the session history is only written by analyze_intent once the turn commits
+        history = list(self.conversation_history.get(session_id) or [{"role": "system", "content": STABLE_PROMPT}])
+        messages = await self._request_messages(history, self._prompt_sections(session_id, transcript, resolved),
+                                                {"role": "user", "content": self._user_message(transcript, resolved)})
+        response = await self.backend.complete(messages, timeout=self.llm.deadline_s)
+        usage = response.usage
+        self._record_usage(usage)
+        return {
+            "content": response.content,
+            "history": history,
+            "tokens": usage.total_tokens if usage else None,
+            "prompt_tokens": usage.prompt_tokens if usage else None
+        }
+
+    async def _adopt_speculation(self, speculation, transcript: str, session_id: str) -> Optional[str]:
+        """Content of a speculative call made for this transcript and this history, else None"""
+        if speculation.text != transcript.strip():
+            speculation.discard("changed")
+            return None
         try:
-            # Get or create conversation history
-            if session_id not in self.conversation_history:
-                system_prompt = await self._get_system_prompt()
-                self.conversation_history[session_id] = [
-                    {"role": "system", "content": system_prompt}
-                ]
+            result = await speculation.task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Speculative intent call failed: {e}")
+            speculation.discard("failed")
+            return None
+
+        # The user message was just appended - the speculation must have seen everything before it
+        history = self.conversation_history[session_id]
+        if history[:-1] != result["history"]:
+            speculation.discard("history")
+            return None
+        speculation.use()
+        return result["content"]
+
+    async def analyze_intent(self, transcript: str, session_id: str = "default",
+                             on_response_text: Optional[Callable[[str, Optional[str]], Any]] = None,
+                             speculation=None, state: Optional[ConversationState] = None,
+                             answer: Optional[IntentResponse] = None) -> IntentResponse:
+        """
+        Analyze transcript with conversation context and extract intent/entities.
+        on_response_text(text, intent) receives processed_response text as it streams in (may be async).
+        speculation is an early call started by IntentSpeculator; its result is used when it matches.
+        state (slot-filling progress) lets the router send single-slot answers to the fast model.
+        answer is a result already worked out locally (slot filling) - recorded like any other turn.
+        """
+        try:
+            # Dates/times are resolved locally and given to the model instead of prompt rules
+            resolved = self._resolve(session_id, transcript, state)
+            sections = self._prompt_sections(session_id, transcript, resolved, state)
+            history = self._get_history(session_id)
+            previous = self._last_result(history)
+            local = answer
+            if local is None and self.local_classifier:
+                local = self.local_classifier.classify(transcript, previous)
             
             # Add user message to history
-            self.conversation_history[session_id].append({
+            history.append({
                 "role": "user", 
-                "content": f"Patient message: {transcript}"
+                "content": self._user_message(transcript, resolved)
             })
             
-            # Call OpenAI with full conversation context
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history[session_id],
-                temperature=0.1,
-                max_tokens=500,
-                response_format={"type": "json_object"}
-            )
+            content = None
+            if local:
+                # Trivial turn - answered by the local rules, no OpenAI call
+                print(f"⚡ Local intent: {local.intent.value} ({local.confidence})")
+                content = json.dumps({
+                    "intent": local.intent.value,
+                    "entities": local.entities,
+                    "confidence": local.confidence,
+                    "processed_response": local.processed_response
+                })
+                if speculation:
+                    speculation.discard("local")
+                if on_response_text:
+                    await self._emit_response_text(on_response_text, local.processed_response, local.intent.value)
+            elif speculation:
+                content = await self._adopt_speculation(speculation, transcript, session_id)
+                if content is not None and on_response_text:
+                    # Whole reply at once - the speculative call was not streamed
+                    early = json.loads(content)
+                    await self._emit_response_text(on_response_text, early.get("processed_response", ""), early.get("intent"))
+
+            # Answer to a single pending slot - try the fast model with a slimmed prompt
+            if content is None:
+                route = self.router.route(previous, state)
+                if route:
+                    content = await self._fast_tier(route, previous, history[-1], on_response_text)
+
+            # Call OpenAI with full conversation context (unless the speculative call already answered)
+            if content is None:
+                started = time.perf_counter()
+                messages = await self._request_messages(history, sections)
+                try:
+                    if on_response_text and self.streaming:
+                        content = await self._stream_completion(messages, on_response_text)
+                    else:
+                        content = await self.llm.call(lambda timeout: self._request_completion(messages, timeout))
+                    self.router.record(STRONG, (time.perf_counter() - started) * 1000)
+                except LLMUnavailable as e:
+                    # Provider slow or down - answer locally instead of leaving the patient waiting
+                    print(f"⚠️ {e} - answering locally")
+                    content = await self._fallback_content(transcript, previous, resolved, on_response_text)
             
             # Parse the response
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
+            self._apply_resolved(result, resolved)
             print(f"📊 Raw OpenAI response: {result}")
 
-            # Add AI response to history
-            self.conversation_history[session_id].append({
+            # Add AI response to history - the list taken before the call, the session may have
+            # been evicted from the store while it was in flight (touch() is then a no-op)
+            history.append({
                 "role": "assistant", 
-                "content": json.dumps(result)
+                "content": compact_reply(result)
             })
 
-            # Keep history manageable (last 10 messages)
-            if len(self.conversation_history[session_id]) > 12:  # system + 10 turns
-                self.conversation_history[session_id] = [
-                    self.conversation_history[session_id][0]  # Keep system prompt
-                ] + self.conversation_history[session_id][-10:]  # Keep last 10 messages
+            # Keep history within the token budget - older turns are folded into a summary
+            history_compactor.compact(history)
+            self.conversation_history.touch(session_id)
 
             # Convert to IntentResponse
             intent_response = self._parse_intent_response(result, transcript)
             print(f"🎯 Final IntentResponse: {intent_response.dict()}")
         
             return intent_response
+
+        except asyncio.CancelledError:
+            # Turn superseded before the LLM answered - its text is re-sent with the next turn
+            if speculation:
+                speculation.discard("superseded")
+            history = self.conversation_history.get(session_id, [])
+            if history and history[-1]["role"] == "user":
+                history.pop()
+            raise
         
         except Exception as e:
             logger.error(f"Error in OpenAI intent analysis: {e}")
@@ -91,145 +252,180 @@ class OpenAIService:
                 processed_response="Sorry, I couldn't process that request."
             )
     
-    async def _get_available_doctors(self) -> List[dict]:
-        """Fetch available doctors from database"""
+    async def _fast_tier(self, route: Dict[str, Any], previous: Optional[Dict[str, Any]], user_message: Dict,
+                         on_response_text) -> Optional[str]:
+        """Fast-model answer for a slot-filling turn, or None to escalate to the strong model"""
+        messages = [{"role": "system", "content": prompt_builder.slot_prompt(
+            route["intent"], route["slot"], route["entities"], route["remaining"]
+        )}]
+        if previous:
+            messages.append({"role": "assistant", "content": compact_reply(previous)})
+        messages.append(user_message)
+
+        started = time.perf_counter()
         try:
-            if MONGODB_AVAILABLE:
-                # This requires your mongodb_service to have a method to get doctors
-                doctors = await mongodb_service.get_available_doctors()
-                return doctors
-            else:
-                # Fallback hardcoded list if DB fails
-                return [
-                    {"name": "Sarah Chen", "specialization": "Cardiology"},
-                    {"name": "Michael Rodriguez", "specialization": "Pediatrics"},
-                    {"name": "Emily Watson", "specialization": "Dermatology"}
-                ]
-        except Exception as e:
-            print(f"❌ Error fetching doctors: {e}")
-            return [
-                {"name": "Sarah Chen", "specialization": "Cardiology"},
-                {"name": "Michael Rodriguez", "specialization": "Pediatrics"},
-                {"name": "Emily Watson", "specialization": "Dermatology"},
-                {"name": "Kamal Smith", "specialization": "General Medicine"}  # ADDED KAMAL
-            ]
-    
-    async def _get_system_prompt(self) -> str:
-        """System prompt for the AI assistant with conversation awareness"""
-        today = datetime.now()  # Keep as datetime object
-        today_date = today.strftime("%Y-%m-%d")  # String version for display
-        today_day = today.strftime("%A")
-        current_year = today.year
-        current_month = today.month
-
-        available_doctors = await self._get_available_doctors()
-        doctors_list = "\n".join([f"- {doc['name']} ({doc.get('specialization', 'General')})" 
-        for doc in available_doctors])
-
-        return f"""
-    You are a medical appointment assistant for a GP clinic. You are having a conversation with a patient.
-
-    **AVAILABLE DOCTORS:**
-    {doctors_list}
-
-    **CONVERSATION RESPONSIBILITIES:**
-    1. Understand the patient's intent in the context of our conversation
-    2. Extract relevant entities intelligently
-    3. Provide appropriate responses that move the conversation forward
-    4. Remember what information we've already discussed
-
-    **SMART ENTITY EXTRACTION:**
-    - patient_name: Extract ONLY the name (e.g., "my name is John" → "John", "call me Sarah" → "Sarah")
-    - doctor_name: Extract doctor name with title (e.g., "I want to see Dr. Kamal Smith" → "Kamal Smith")
-    - appointment_id: Extract numbers/letters (e.g., "my ID is 123-ABC" → "123-ABC")
-    - date: Convert to YYYY-MM-DD format (today: {today_date})
-    - time: Convert to HH:MM format
-    - new_date: Extract when rescheduling (e.g., "change to next Tuesday" → "YYYY-MM-DD")
-    - new_time: Extract when rescheduling (e.g., "move to 2 PM" → "14:00")
-
-    **CORRECT DOCTOR NAME EXTRACTION:**
-    - Extract the FULL NAME without title
-    - Remove titles like Dr., Dr, Doctor, etc. but keep the full name
-    - Examples:
-    - "I want to see Dr. John Doe" → doctor_name: "John Doe"
-    - "Book with Dr. Smith" → doctor_name: "Smith" 
-    - "Appointment with Dr. Emily Johnson" → doctor_name: "Emily Johnson"
-    - "Dr. Maria Garcia Lopez" → doctor_name: "Maria Garcia Lopez"
-    - If only title is mentioned ("the doctor", "Dr."), ask for the specific doctor's name
-    - Extract names FLEXIBLY - they might be run together or misspelled by speech recognition
-    - Examples of speech recognition variations:
-        - "Dr. John Doe" might be heard as "Dr. Johndoe", "Dr. John Do", "Dr. John Doo"
-        - "Dr. Sarah Chen" might be heard as "Dr. Sarahchen", "Dr. Sara Chen"
-    - Use FUZZY MATCHING: If exact match fails, look for similar names
-    - If name seems incomplete, ask for clarification: "Did you mean Dr. John Doe?"
+            response = await self.fast_llm.call(
+                lambda timeout: self.backend.complete(messages, timeout=timeout, model=self.router.fast_model)
+            )
+        except LLMUnavailable:
+            self.router.escalated("unavailable")
+            return None
+        self.router.record(FAST, (time.perf_counter() - started) * 1000)
+        self._record_usage(response.usage, FAST)
+
+        result = self.router.accept(response.content, route["intent"], route["slot"])
+        if result is None:
+            return None
+        # Details collected earlier stay unless this answer changed them
+        result["entities"] = {**route["entities"], **{k: v for k, v in result["entities"].items() if v is not None}}
+        if on_response_text:
+            await self._emit_response_text(on_response_text, result["processed_response"], result["intent"])
+        return json.dumps(result)
+
+    async def _request_completion(self, messages: List[Dict], timeout: float) -> str:
+        """One non-streaming completion attempt"""
+        response = await self.backend.complete(messages, timeout=timeout)
+        self._record_usage(response.usage)
+        return response.content
+
+    async def _open_stream(self, messages: List[Dict], timeout: float):
+        """One streaming attempt, up to its first chunk - the part that is hedged and retried"""
+        stream = await self.backend.stream(messages, timeout=timeout)
+        try:
+            first_chunk = await stream.__anext__()
+        except BaseException:
+            await stream.aclose()
+            raise
+        return stream, first_chunk
+
+    async def _close_stream(self, opened):
+        await opened[0].aclose()
+
+    async def _stream_completion(self, messages: List[Dict], on_response_text: Callable[[str, Optional[str]], Any]) -> str:
+        """Stream the completion, passing processed_response text to the callback as it arrives"""
+        started = time.perf_counter()
+        stream, first_chunk = await self.llm.call(lambda timeout: self._open_stream(messages, timeout),
+                                                  discard=self._close_stream)
+        # Text may already be playing, so the rest of the stream is not retried - only bounded
+        remaining = self.llm.deadline_s - (time.perf_counter() - started)
+        try:
+            return await asyncio.wait_for(
+                self._read_stream(stream, first_chunk, on_response_text, started), max(remaining, 0.001)
+            )
+        except (asyncio.TimeoutError,) + RETRYABLE_ERRORS as e:
+            self.llm.breaker.record_failure()
+            metrics.increment("openai.stream_failures")
+            raise LLMUnavailable(f"openai stream interrupted: {type(e).__name__}") from e
+        finally:
+            await stream.aclose()
+
+    async def _read_stream(self, stream, first_chunk, on_response_text: Callable[[str, Optional[str]], Any],
+                           started: float) -> str:
+        first_text_seen = False
+        parser = StreamingJSONParser()
+        parts = []
+        intent = None
+        held_text = ""  # response text seen before the intent is known
+        async for chunk in self._chunks(first_chunk, stream):
+            if chunk.usage:
+                self._record_usage(chunk.usage)
+            delta = chunk.text
+            if not delta:
+                continue
+            parts.append(delta)
 
+            for kind, key, value in parser.feed(delta):
+                if kind == "field" and key == "intent" and isinstance(value, str):
+                    intent = value.lower()
+                    metrics.observe("openai.intent_ms", (time.perf_counter() - started) * 1000)
+                elif kind == "delta" and key == "processed_response":
+                    if intent is None:
+                        held_text += value
+                        continue
+                    if not first_text_seen:
+                        first_text_seen = True
+                        metrics.observe("openai.first_text_ms", (time.perf_counter() - started) * 1000)
+                    await self._emit_response_text(on_response_text, held_text + value, intent)
+                    held_text = ""
 
+        if held_text:
+            await self._emit_response_text(on_response_text, held_text, intent)
+
+        return "".join(parts)
+
+    async def _chunks(self, first_chunk, stream):
+        yield first_chunk
+        async for chunk in stream:
+            yield chunk
+
+    async def _fallback_content(self, transcript: str, previous: Optional[Dict[str, Any]],
+                                resolved: Dict[str, str], on_response_text) -> str:
+        """Reply when the LLM is unavailable: the best local rule, otherwise ask the patient to repeat"""
+        metrics.increment("openai.fallbacks")
+        candidates = local_intent_classifier.score(transcript, previous)
+        if candidates and candidates[0][1]["processed_response"]:
+            confidence, result = candidates[0]
+            result = dict(result, confidence=confidence)
+        else:
+            # Nothing is acted on (intent unknown) - the resolved date/time stays in the history
+            result = {
+                "intent": IntentType.UNKNOWN.value,
+                "entities": dict(resolved),
+                "confidence": 0.0,
+                "processed_response": FALLBACK_REPLY
+            }
+        if on_response_text:
+            await self._emit_response_text(on_response_text, result["processed_response"], result["intent"])
+        return json.dumps(result)
+
+    async def _emit_response_text(self, on_response_text, text: str, intent: Optional[str]):
+        try:
+            result = on_response_text(text, intent)
+            if inspect.isawaitable(result):
+                await result
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error in response text callback: {e}")
     
-    **DOCTOR VALIDATION RULES:**
-    1. FIRST check if mentioned doctor exists in the available doctors list above
-    2. If doctor NOT found, respond with: "I don't see Dr. [mentioned_name] in our system. We have: [list 2-3 available doctors]"
-    3. If doctor is found, proceed normally
-    4. If user says "any doctor", suggest the first available doctor from the list
-
-    **Examples:**
-    - User: "I want Dr. John" → "I don't see Dr. John. We have Dr. Smith (Cardiology) and Dr. Chen (Pediatrics)"
-    - User: "Any doctor" → "Dr. Smith has availability. Shall I book with them?"
-        
-    **CRITICAL DATE EXTRACTION RULES (Today is {today_date}, {today_day}):**
-    - "tomorrow" → { (today + timedelta(days=1)).strftime('%Y-%m-%d') }
-    - "today" → {today_date}
-    - "next Monday" → Calculate the upcoming Monday from today
-    - "this Friday" → The Friday of this current week
-    - "next Friday" → The Friday of next week (7 days from the same day next week)
-    - "Friday next week" → Specifically Friday of next week
-    - ALWAYS use YYYY-MM-DD format
-    - For relative dates: Calculate from today's date ({today_date})
-    - If date is ambiguous, ask for clarification
-
-    **QUERY APPOINTMENT FUNCTIONALITY:**
-    - If patient asks about existing appointment details: intent=query_appointment
-    - Extract appointment_id or patient_name for lookup
-    - Examples: 
-      "What's my appointment time?" → query_appointment
-      "When is my booking with ID 123456?" → query_appointment, appointment_id=123456
-      "Tell me about my appointment" → query_appointment
-      "What are my appointment details?" → query_appointment
-
-    **TIME EXTRACTION:**
-    - Convert to 24-hour HH:MM format
-    - "2 PM" → "14:00"
-    - "10:30 AM" → "10:30"
-    - "noon" → "12:00"
-    - "evening" → Ask for specific time
-
-    **RESPONSE FORMAT:**
-    Respond with JSON in this exact format:
-    {{
-        "intent": "book_appointment|reschedule_appointment|cancel_appointment|query_appointment|query_availability|greeting|thanks|unknown",
-        "entities": {{
-            "doctor_name": "extracted value or null",
-            "doctor_specialization": "extracted value or null", 
-            "date": "YYYY-MM-DD or null",
-            "time": "HH:MM or null", 
-            "reason": "extracted value or null",
-            "patient_name": "extracted value or null",
-            "appointment_id": "extracted value or null"
-        }},
-        "confidence": 0.0-1.0,
-        "processed_response": "Natural language response that moves conversation forward"
-    }}
-
-    **CONVERSATION EXAMPLES:**
-    - If patient says "my name is John" after you asked for name: intent=book_appointment, patient_name=John
-    - If patient says "thanks": intent=thanks, processed_response="You're welcome!"
-    - If patient provides incomplete info: ask for missing pieces naturally
-
-    **RESCHEDULING VALIDATION:**
-    - If patient provides appointment ID for rescheduling, acknowledge it
-    - But don't assume rescheduling is possible until we check status
-    - If appointment is cancelled, respond appropriately: "This appointment is cancelled and cannot be rescheduled"
-    """
+    async def _get_available_doctors(self) -> List[dict]:
+        """Available doctors (cached with the system prompt)"""
+        return await prompt_builder.doctors()
+
+    def _record_usage(self, usage, tier: str = STRONG):
+        """Prompt tokens per call and how many the provider served from its prefix cache"""
+        if not usage:
+            return
+        metrics.increment(f"llm.tier.{tier}.prompt_tokens", usage.prompt_tokens)
+        metrics.increment(f"llm.tier.{tier}.completion_tokens", usage.completion_tokens)
+        metrics.observe("openai.prompt_tokens", usage.prompt_tokens)
+        metrics.observe("openai.completion_tokens", usage.completion_tokens)
+        metrics.increment("openai.prompt_tokens_total", usage.prompt_tokens)
+        metrics.increment("openai.cached_tokens_total", usage.cached_tokens)
     
+    def _user_message(self, transcript: str, resolved: Dict[str, str]) -> str:
+        if not resolved:
+            return f"Patient message: {transcript}"
+        values = ", ".join(f"{key}={value}" for key, value in resolved.items())
+        return f"Patient message: {transcript}\n(Resolved: {values})"
+
+    def _apply_resolved(self, result: Dict[str, Any], resolved: Dict[str, str]):
+        """Deterministic date/time values win over the model's; malformed model values are fixed or dropped"""
+        entities = result.get("entities")
+        if not isinstance(entities, dict):
+            return
+        rescheduling = result.get("intent") == IntentType.RESCHEDULE_APPOINTMENT.value
+        for key in ("date", "time"):
+            for field in (key, f"new_{key}"):
+                value = entities.get(field)
+                if value and not VALUE_FORMATS[key].fullmatch(str(value)):
+                    # e.g. "2 PM" or "next Friday" instead of HH:MM / YYYY-MM-DD
+                    entities[field] = resolve_datetime(str(value), expecting_date=True).get(key)
+            if key in resolved:
+                entities[key] = resolved[key]
+                if rescheduling:
+                    entities[f"new_{key}"] = resolved[key]
+
     def _parse_intent_response(self, result: Dict[str, Any], transcript: str) -> IntentResponse:
         """Parse OpenAI response into IntentResponse model"""
         try:
@@ -273,8 +469,7 @@ class OpenAIService:
     
     def clear_conversation_history(self, session_id: str):
         """Clear conversation history for a session"""
-        if session_id in self.conversation_history:
-            del self.conversation_history[session_id]
+        self.conversation_history.release(session_id)
 
 # Create global instance
 openai_service = OpenAIService()
\ No newline at end of file
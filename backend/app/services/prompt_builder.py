@@ -0,0 +1,326 @@
+# app/services/prompt_builder.py
+import os
+import re
+import time
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .metrics import metrics
+
+try:
+    from app.services.mongodb_service import mongodb_service
+    MONGODB_AVAILABLE = True
+except ImportError:
+    MONGODB_AVAILABLE = False
+
+# Doctors added outside the admin route show up after this many seconds
+PROMPT_DOCTORS_TTL = float(os.getenv("PROMPT_DOCTORS_TTL", "600"))
+# Send only the prompt sections the current intent and pending slot need
+PROMPT_SECTIONING = os.getenv("PROMPT_SECTIONING", "true").lower() == "true"
+
+CHARS_PER_TOKEN = 4  # rough estimate - actual usage is recorded from OpenAI responses
+
+FALLBACK_DOCTORS = [
+    {"name": "Sarah Chen", "specialization": "Cardiology"},
+    {"name": "Michael Rodriguez", "specialization": "Pediatrics"},
+    {"name": "Emily Watson", "specialization": "Dermatology"}
+]
+
+# Each section is identical for every session and every day. The sections every turn gets
+# (CORE_SECTIONS, first) are the stored system prompt - a prefix the provider can cache for the
+# whole call. The sections picked per turn and the context (date, doctor roster) follow in a
+# second system message that is only part of the request, never of the stored history.
+PROMPT_SECTIONS = [
+    ("role", """
+    You are a medical appointment assistant for a GP clinic. You are having a conversation with a patient.
+    Today's date (and the available doctors, when relevant) are listed under CURRENT CONTEXT at the end.
+
+    **CONVERSATION RESPONSIBILITIES:**
+    1. Understand the patient's intent in the context of our conversation
+    2. Extract relevant entities intelligently
+    3. Provide appropriate responses that move the conversation forward
+    4. Remember what information we've already discussed
+"""),
+    ("entities", """
+    **SMART ENTITY EXTRACTION:**
+    - patient_name: Extract ONLY the name (e.g., "my name is John" → "John", "call me Sarah" → "Sarah")
+    - doctor_name: Extract doctor name with title (e.g., "I want to see Dr. Kamal Smith" → "Kamal Smith")
+    - appointment_id: Extract numbers/letters (e.g., "my ID is 123-ABC" → "123-ABC")
+    - date / time: YYYY-MM-DD and 24-hour HH:MM; dates and times in the patient message given as "(Resolved: date=..., time=...)" are correct - use those values
+    - new_date / new_time: the new date and time when rescheduling
+"""),
+    ("response_format", """
+    **RESPONSE FORMAT:**
+    Respond with JSON in this exact format:
+    {
+        "intent": "book_appointment|reschedule_appointment|cancel_appointment|query_appointment|query_availability|greeting|thanks|unknown",
+        "entities": {
+            "doctor_name": "extracted value or null",
+            "doctor_specialization": "extracted value or null",
+            "date": "YYYY-MM-DD or null",
+            "time": "HH:MM or null",
+            "reason": "extracted value or null",
+            "patient_name": "extracted value or null",
+            "appointment_id": "extracted value or null"
+        },
+        "confidence": 0.0-1.0,
+        "processed_response": "Natural language response that moves conversation forward"
+    }
+"""),
+    ("examples", """
+    **CONVERSATION EXAMPLES:**
+    - If patient says "my name is John" after you asked for name: intent=book_appointment, patient_name=John
+    - If patient says "thanks": intent=thanks, processed_response="You're welcome!"
+    - If patient provides incomplete info: ask for missing pieces naturally
+"""),
+    ("doctor_names", """
+    **CORRECT DOCTOR NAME EXTRACTION:**
+    - Extract the FULL NAME without title
+    - Remove titles like Dr., Dr, Doctor, etc. but keep the full name
+    - Examples:
+    - "I want to see Dr. John Doe" → doctor_name: "John Doe"
+    - "Book with Dr. Smith" → doctor_name: "Smith"
+    - "Appointment with Dr. Emily Johnson" → doctor_name: "Emily Johnson"
+    - "Dr. Maria Garcia Lopez" → doctor_name: "Maria Garcia Lopez"
+    - If only title is mentioned ("the doctor", "Dr."), ask for the specific doctor's name
+    - Extract names FLEXIBLY - they might be run together or misspelled by speech recognition
+    - Examples of speech recognition variations:
+        - "Dr. John Doe" might be heard as "Dr. Johndoe", "Dr. John Do", "Dr. John Doo"
+        - "Dr. Sarah Chen" might be heard as "Dr. Sarahchen", "Dr. Sara Chen"
+    - Use FUZZY MATCHING: If exact match fails, look for similar names
+    - If name seems incomplete, ask for clarification: "Did you mean Dr. John Doe?"
+"""),
+    ("doctor_validation", """
+    **DOCTOR VALIDATION RULES:**
+    1. FIRST check if mentioned doctor exists in the available doctors list
+    2. If doctor NOT found, respond with: "I don't see Dr. [mentioned_name] in our system. We have: [list 2-3 available doctors]"
+    3. If doctor is found, proceed normally
+    4. If user says "any doctor", suggest the first available doctor from the list
+
+    **Examples:**
+    - User: "I want Dr. John" → "I don't see Dr. John. We have Dr. Smith (Cardiology) and Dr. Chen (Pediatrics)"
+    - User: "Any doctor" → "Dr. Smith has availability. Shall I book with them?"
+"""),
+    ("dates", """
+    **DATES AND TIMES:**
+    - Dates and times without a "(Resolved: ...)" value: convert relative to today's date
+    - If a date or time is vague ("evening", "next week"), ask for a specific one
+"""),
+    ("query", """
+    **QUERY APPOINTMENT FUNCTIONALITY:**
+    - If patient asks about existing appointment details: intent=query_appointment
+    - Extract appointment_id or patient_name for lookup
+    - Examples:
+      "What's my appointment time?" → query_appointment
+      "When is my booking with ID 123456?" → query_appointment, appointment_id=123456
+      "Tell me about my appointment" → query_appointment
+      "What are my appointment details?" → query_appointment
+"""),
+    ("reschedule", """
+    **RESCHEDULING VALIDATION:**
+    - If patient provides appointment ID for rescheduling, acknowledge it
+    - But don't assume rescheduling is possible until we check status
+    - If appointment is cancelled, respond appropriately: "This appointment is cancelled and cannot be rescheduled"
+"""),
+]
+PROMPT_TEXT = dict(PROMPT_SECTIONS)
+# Sections every turn gets; the others only when the turn may need them (see sections_for)
+CORE_SECTIONS = ("role", "entities", "response_format", "examples")
+# Slots (pending, resolved or mentioned this turn) that pull a section in
+SECTION_SLOTS = {
+    "doctor_names": {"doctor_name"},
+    "doctor_validation": {"doctor_name"},
+    "dates": {"date", "time"},
+}
+# Intents that pull a section in
+SECTION_INTENTS = {
+    "query": {"query_appointment"},
+    "reschedule": {"reschedule_appointment"},
+}
+# The doctor roster in the context suffix is sent under this tag
+DOCTORS_SECTION = "doctors"
+ALL_SECTIONS = tuple(tag for tag, _ in PROMPT_SECTIONS) + (DOCTORS_SECTION,)
+
+# The whole prompt, as sent when we don't know yet what the patient wants
+STATIC_PROMPT = "".join(text for _, text in PROMPT_SECTIONS)
+# history[0] of every conversation - byte-identical for all sessions and days
+STABLE_PROMPT = "".join(text for tag, text in PROMPT_SECTIONS if tag in CORE_SECTIONS)
+
+# A doctor named in the patient message pulls the doctor rules in whatever slot we asked for
+DOCTOR_MENTION = re.compile(r"\b(dr|doctor)\b", re.IGNORECASE)
+
+# Slimmed prompt for the fast model tier: the patient is answering one question
+SLOT_PROMPT = """
+    You are a medical appointment assistant for a GP clinic. The patient wants to: {intent}.
+    You asked for their {slot_label}; their reply is the next message.
+    - Extract {slot} as {slot_format}, plus any other details they give
+    - Dates and times given as "(Resolved: date=..., time=...)" are correct - use them
+    - If the reply does not answer the question, set confidence below 0.5
+    - Details so far: {entities}
+    - Still needed after this: {remaining}
+    - processed_response: short, friendly; ask for the next detail still needed, or confirm all the details
+    - Today: {today}
+    Respond with JSON: {{"intent": "{intent}", "entities": {{...}}, "confidence": 0.0-1.0, "processed_response": "..."}}
+"""
+SLOT_FORMATS = {
+    "appointment_id": ("appointment ID", "the ID only, digits without spaces"),
+    "patient_name": ("full name", "the name only"),
+    "date": ("preferred date", "YYYY-MM-DD"),
+    "time": ("preferred time", "24-hour HH:MM"),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+class PromptBuilder:
+    """
+    Builds the OpenAI system prompt from tagged sections plus a small context suffix
+    (today's date, the doctor roster). STABLE_PROMPT (the core sections) opens every stored
+    history; sections_for() picks the other sections a turn needs from the intent in progress
+    and the slot we are waiting for, and turn_prompt() assembles them with the context, once
+    per selection, so the same selection is always byte-identical. The doctor list and the
+    assembled turn prompts are dropped when the date changes (midnight), when invalidate() is
+    called (a doctor was added) or after PROMPT_DOCTORS_TTL seconds.
+    """
+
+    def __init__(self, doctors_ttl: float = PROMPT_DOCTORS_TTL, sectioning: bool = PROMPT_SECTIONING):
+        self.doctors_ttl = doctors_ttl
+        self.sectioning = sectioning
+        self.prompts: Dict[Tuple[str, ...], str] = {}  # section selection -> assembled turn prompt
+        self.cached_doctors: Optional[List[dict]] = None
+        self.built_for: Optional[str] = None  # date the cached prompts were rendered for
+        self.built_at = 0.0
+        self.lock = asyncio.Lock()
+        self.prefix_tokens = estimate_tokens(STABLE_PROMPT)
+
+    def _fresh(self, today: str) -> bool:
+        return (self.cached_doctors is not None and self.built_for == today
+                and time.monotonic() - self.built_at < self.doctors_ttl)
+
+    def sections_for(self, pending, transcript: str = "", resolved: Optional[Dict[str, str]] = None) -> Tuple[str, ...]:
+        """
+        Sections for a turn. pending is (intent, entities, missing slots) of the request in
+        progress (intent_requirements.pending_requirements); without one we don't know what the
+        patient wants yet and every section is sent.
+        """
+        if not self.sectioning or not pending or not pending[2]:
+            metrics.increment("prompt.sections.full")
+            return ALL_SECTIONS
+        intent, _, missing = pending
+        # Slots this turn can touch: the one we asked for, resolved dates/times, a named doctor
+        slots = {missing[0]} | set(resolved or {})
+        if DOCTOR_MENTION.search(transcript):
+            slots.add("doctor_name")
+
+        selected = [tag for tag, _ in PROMPT_SECTIONS
+                    if tag in CORE_SECTIONS or slots & SECTION_SLOTS.get(tag, set())
+                    or intent in SECTION_INTENTS.get(tag, set())]
+        # The roster is needed to check a doctor or to offer them in the next question
+        if "doctor_name" in slots or "doctor_name" in missing[:2]:
+            selected.append(DOCTORS_SECTION)
+        metrics.increment("prompt.sections.partial")
+        return tuple(selected)
+
+    async def turn_prompt(self, sections: Optional[Tuple[str, ...]] = None) -> str:
+        """
+        Per-turn system message: the given sections (all by default) minus the core ones in
+        STABLE_PROMPT, then today's date (and the roster) - assembled once per selection
+        """
+        # Same selection, same key (and bytes) whatever order it was given in
+        key = tuple(tag for tag in ALL_SECTIONS if tag in sections) if sections else ALL_SECTIONS
+        today = datetime.now().strftime("%Y-%m-%d")
+        prompt = self.prompts.get(key)
+        if prompt is not None and self._fresh(today):
+            metrics.increment("prompt.cache.hits")
+            return prompt
+
+        async with self.lock:
+            # Another session may have rebuilt it while we waited
+            if not self._fresh(today):
+                metrics.increment("prompt.cache.misses")
+                started = time.perf_counter()
+                doctors = await self._fetch_doctors()
+                self.prompts = {}
+                self.cached_doctors = doctors
+                self.built_for = today
+                self.built_at = time.monotonic()
+                build_ms = (time.perf_counter() - started) * 1000
+                metrics.observe("prompt.build_ms", build_ms)
+                metrics.set_gauge("prompt.prefix_tokens", self.prefix_tokens)
+                print(f"🧾 Prompt context built in {build_ms:.1f} ms "
+                      f"({len(doctors)} doctors, ~{self.prefix_tokens} tokens in the stable prefix)")
+            prompt = self.prompts.get(key)
+            if prompt is None:
+                prompt = self._assemble(key, datetime.now(), self.cached_doctors)
+                self.prompts[key] = prompt
+                metrics.increment("prompt.variants")
+                if key == ALL_SECTIONS:
+                    metrics.set_gauge("prompt.tokens", self.prefix_tokens + estimate_tokens(prompt))
+            else:
+                metrics.increment("prompt.cache.hits")
+            return prompt
+
+    async def doctors(self) -> List[dict]:
+        """Doctor roster the current prompts were built with"""
+        await self.turn_prompt()
+        return self.cached_doctors
+
+    def invalidate(self, reason: str = "manual"):
+        """Drop the cached prompts and roster (e.g. after a doctor is added)"""
+        self.prompts = {}
+        self.cached_doctors = None
+        metrics.increment("prompt.invalidations")
+        print(f"🧾 System prompt cache invalidated ({reason})")
+
+    async def _fetch_doctors(self) -> List[dict]:
+        """Fetch available doctors from database"""
+        try:
+            if MONGODB_AVAILABLE:
+                return await mongodb_service.get_available_doctors()
+            # Fallback hardcoded list if DB fails
+            return list(FALLBACK_DOCTORS)
+        except Exception as e:
+            print(f"❌ Error fetching doctors: {e}")
+            return FALLBACK_DOCTORS + [{"name": "Kamal Smith", "specialization": "General Medicine"}]
+
+    def slot_prompt(self, intent: str, slot: str, entities: dict, remaining: List[str]) -> str:
+        """Short system prompt for a turn that answers a question about one slot"""
+        label, value_format = SLOT_FORMATS.get(slot, (slot.replace("_", " "), "text"))
+        known = ", ".join(f"{key}={value}" for key, value in entities.items() if value) or "none"
+        return SLOT_PROMPT.format(
+            intent=intent, slot=slot, slot_label=label, slot_format=value_format, entities=known,
+            remaining=", ".join(remaining) or "nothing", today=datetime.now().strftime("%Y-%m-%d (%A)")
+        )
+
+    def _assemble(self, sections: Tuple[str, ...], today: datetime, doctors: List[dict]) -> str:
+        static = "".join(text for tag, text in PROMPT_SECTIONS if tag in sections and tag not in CORE_SECTIONS)
+        return static + self._render_context(today, doctors if DOCTORS_SECTION in sections else None)
+
+    def _render_context(self, today: datetime, doctors: Optional[List[dict]]) -> str:
+        context = f"""
+    **CURRENT CONTEXT:**
+    - Today: {today.strftime('%Y-%m-%d')} ({today.strftime('%A')})
+    """
+        if doctors is None:
+            return context
+        doctors_list = "\n".join(f"    - {doc['name']} ({doc.get('specialization', 'General')})" for doc in doctors)
+        return context + f"""
+    **AVAILABLE DOCTORS:**
+{doctors_list}
+    """
+
+    def stats(self) -> dict:
+        full = self.prompts.get(ALL_SECTIONS)
+        return {
+            "cached": bool(self.prompts),
+            "built_for": self.built_for,
+            "variants": len(self.prompts),
+            "prompt_tokens_estimate": self.prefix_tokens + estimate_tokens(full) if full else None,
+            "prefix_tokens_estimate": self.prefix_tokens
+        }
+
+
+# Global instance
+prompt_builder = PromptBuilder()
\ No newline at end of file
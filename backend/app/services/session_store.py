@@ -0,0 +1,144 @@
+# app/services/session_store.py
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from .metrics import metrics
+
+# Limits per store (conversation histories, conversation states)
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+# Sessions untouched for this long are dropped even if the disconnect was missed
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+
+
+def new_session_id() -> str:
+    return str(uuid.uuid4())
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate resident bytes of plain data (str/dict/list) and pydantic models"""
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + estimate_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class SessionStore:
+    """
+    Per-session state with a hard cap.
+    Entries are kept in least-recently-used order; idle entries expire after ttl seconds and
+    the least recently used ones are evicted once max_sessions or max_bytes is exceeded.
+    Values that are mutated in place (a history list) must be re-measured with touch().
+    Supports the dict operations the services already use (in, [], get, del).
+    """
+
+    def __init__(self, name: str, max_sessions: int = SESSION_MAX_COUNT, max_bytes: int = SESSION_MAX_BYTES,
+                 ttl: float = SESSION_IDLE_TTL, sizeof: Callable[[Any], int] = estimate_size):
+        self.name = name
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.entries: "OrderedDict[str, list]" = OrderedDict()  # session_id -> [value, size, last_used]
+        self.bytes = 0
+
+    def __contains__(self, session_id: str) -> bool:
+        self._expire()
+        return session_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, session_id: str):
+        self._expire()
+        entry = self.entries[session_id]
+        entry[2] = time.monotonic()
+        self.entries.move_to_end(session_id)
+        return entry[0]
+
+    def get(self, session_id: str, default=None):
+        try:
+            return self[session_id]
+        except KeyError:
+            return default
+
+    def __setitem__(self, session_id: str, value):
+        if session_id in self.entries:
+            self.bytes -= self.entries.pop(session_id)[1]
+        size = self.sizeof(value)
+        self.entries[session_id] = [value, size, time.monotonic()]
+        self.bytes += size
+        self._expire()
+        self._enforce_limits(keep=session_id)
+        self._update_gauges()
+
+    def __delitem__(self, session_id: str):
+        self.bytes -= self.entries.pop(session_id)[1]
+        self._update_gauges()
+
+    def touch(self, session_id: str):
+        """Re-measure a value that was changed in place and mark it as used"""
+        entry = self.entries.get(session_id)
+        if entry is None:
+            return
+        size = self.sizeof(entry[0])
+        self.bytes += size - entry[1]
+        entry[1] = size
+        entry[2] = time.monotonic()
+        self.entries.move_to_end(session_id)
+        self._enforce_limits(keep=session_id)
+        self._update_gauges()
+
+    def release(self, session_id: str) -> bool:
+        """Session ended - drop its state now"""
+        if session_id not in self.entries:
+            return False
+        del self[session_id]
+        metrics.increment(f"sessions.{self.name}.released")
+        return True
+
+    def _expire(self):
+        # Least recently used first - stop at the first entry that is still fresh
+        now = time.monotonic()
+        expired = False
+        while self.entries:
+            session_id, entry = next(iter(self.entries.items()))
+            if now - entry[2] < self.ttl:
+                break
+            self._evict(session_id, "ttl")
+            expired = True
+        if expired:
+            self._update_gauges()
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        while self.entries and (len(self.entries) > self.max_sessions or self.bytes > self.max_bytes):
+            session_id = next(iter(self.entries))
+            if session_id == keep:
+                break  # a single session larger than the cap is still kept
+            self._evict(session_id, "lru" if len(self.entries) > self.max_sessions else "bytes")
+
+    def _evict(self, session_id: str, reason: str):
+        self.bytes -= self.entries.pop(session_id)[1]
+        metrics.increment(f"sessions.{self.name}.evicted.{reason}")
+        print(f"🧹 Evicted {self.name} state for session {session_id} ({reason})")
+
+    def _update_gauges(self):
+        metrics.set_gauge(f"sessions.{self.name}.live", len(self.entries))
+        metrics.set_gauge(f"sessions.{self.name}.bytes", self.bytes)
+
+    def stats(self) -> dict:
+        self._expire()
+        return {
+            "live": len(self.entries),
+            "bytes": self.bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes
+        }
\ No newline at end of file
@@ -0,0 +1,73 @@
+# app/services/slot_extractors.py
+import re
+from typing import Dict, Optional
+from .intent_classifier import extract_appointment_id
+from .datetime_resolver import resolve_answer, WEEKDAYS, MONTHS
+
+# Only an explicit introduction is taken as a name: "my name is john smith", "call me ann",
+# "it's mary jones". A bare reply ("mary jones", "chest pain", "next week") goes to the LLM -
+# transcripts arrive unformatted, so nothing else tells a name from any other short answer
+NAME_INTRO = re.compile(
+    r"^(?:(?:yes|yeah|sure|okay|ok|hi)[,.]?\s+)?"
+    r"(?:(?P<named>(?:my |the )?name(?:'s| is)|call me)|(?P<casual>it's|it is|this is))\s+",
+    re.IGNORECASE
+)
+NAME_WORD = re.compile(r"[A-Za-z][A-Za-z'\-]*")
+MAX_NAME_WORDS = 3
+# Words that are not part of a name - "it's not sure", "it is urgent", "it's for tuesday"
+NOT_NAMES = {
+    "yes", "yeah", "no", "not", "sure", "sorry", "okay", "ok", "fine", "good", "well", "just",
+    "here", "calling", "looking", "trying", "afraid", "actually", "what", "the", "a", "an",
+    "doctor", "dr", "appointment", "booking", "book", "cancel", "reschedule", "today", "tomorrow",
+    "morning", "afternoon", "evening", "please", "thanks", "thank", "you", "hello", "hi", "hey",
+    "and", "my", "is", "it", "at", "on", "for", "with", "about", "again", "id", "number",
+    "i", "me", "that", "this", "to", "of", "in", "one", "urgent", "emergency", "asap", "pain",
+    "next", "week", "month", "time", "same",
+} | set(WEEKDAYS) | set(MONTHS)
+
+
+def extract_patient_name(transcript: str) -> Optional[str]:
+    """
+    The name after an explicit introduction, title-cased. "It's ..." / "this is ..." must give
+    a full name (we ask for one), so "it is urgent" is not taken for a patient
+    """
+    text = transcript.strip().rstrip(".!?")
+    intro = NAME_INTRO.match(text)
+    if not intro:
+        return None
+    words = text[intro.end():].split()
+    min_words = 2 if intro.group("casual") else 1
+    if not min_words <= len(words) <= MAX_NAME_WORDS or not all(NAME_WORD.fullmatch(word) for word in words):
+        return None
+    if any(word.lower() in NOT_NAMES for word in words):
+        return None
+    return " ".join(word[0].upper() + word[1:] for word in words)
+
+
+def _appointment_id(transcript: str) -> Dict[str, str]:
+    appointment_id = extract_appointment_id(transcript)
+    return {"appointment_id": appointment_id} if appointment_id else {}
+
+
+def _patient_name(transcript: str) -> Dict[str, str]:
+    name = extract_patient_name(transcript)
+    return {"patient_name": name} if name else {}
+
+
+# Typed slots a reply can fill without the LLM. Doctor names are left to the LLM and the
+# roster checks; a date answer may carry the time too ("Friday at 10")
+SLOT_EXTRACTORS = {
+    "appointment_id": _appointment_id,
+    "patient_name": _patient_name,
+    "date": resolve_answer,
+    "time": resolve_answer,
+}
+
+
+def extract_slot(slot: str, transcript: str) -> Dict[str, str]:
+    """Entities from a reply to the question for slot, {} when it doesn't clearly answer it"""
+    extractor = SLOT_EXTRACTORS.get(slot)
+    if extractor is None:
+        return {}
+    entities = extractor(transcript)
+    return entities if entities.get(slot) else {}
@@ -0,0 +1,153 @@
+# app/services/speculation.py
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, Optional
+from .metrics import metrics
+
+# Opt-in: start the intent call before the endpoint commits the utterance
+SPECULATIVE_INTENT = os.getenv("SPECULATIVE_INTENT", "false").lower() == "true"
+# How long the transcript must stay unchanged before speculating
+SPECULATIVE_STABLE_MS = int(os.getenv("SPECULATIVE_STABLE_MS", "250"))
+
+CHARS_PER_TOKEN = 4  # rough prompt size estimate for calls cancelled before usage is known
+
+
+class Speculation:
+    """One early intent call for a candidate transcript"""
+
+    def __init__(self, text: str, task: asyncio.Task, owner: "IntentSpeculator"):
+        self.text = text
+        self.task = task
+        self.owner = owner
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.committed_at: Optional[float] = None
+        self.settled = False
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        self.finished_at = time.perf_counter()
+        if not task.cancelled() and not task.exception():
+            self.owner._learn_prompt_size(task.result())
+
+    def use(self) -> Awaitable[dict]:
+        """The final transcript matched - the caller awaits the speculative result"""
+        self.owner._record_hit(self)
+        return self.task
+
+    def discard(self, reason: str):
+        """Final transcript differs (or the history moved on) - cancel and count the waste"""
+        if self.settled:
+            return
+        self.settled = True
+        if self.task.done() and not self.task.cancelled() and not self.task.exception():
+            tokens = self.task.result().get("tokens") or 0
+        else:
+            self.task.cancel()
+            # Cancelled mid-call - the prompt has most likely been billed already
+            tokens = self.owner.prompt_tokens_estimate + len(self.text) // CHARS_PER_TOKEN
+        self.owner._record_miss(reason, tokens)
+
+
+class IntentSpeculator:
+    """
+    Per-session speculative intent analysis.
+    observe() is fed the pending transcript on every Deepgram result; once it has been stable
+    for SPECULATIVE_STABLE_MS an intent call starts in the background. When the endpoint commits,
+    take() returns the speculation if the committed text matches - otherwise it is cancelled.
+    Hit rate, latency saved and tokens wasted on discarded calls are exported as metrics.
+    """
+
+    def __init__(self, speculate: Callable[[str], Awaitable[dict]], stable_ms: int = SPECULATIVE_STABLE_MS):
+        self.speculate = speculate
+        self.stable_seconds = stable_ms / 1000
+        self.candidate: Optional[str] = None
+        self.timer: Optional[asyncio.Task] = None
+        self.current: Optional[Speculation] = None
+        self.prompt_tokens_estimate = 0  # updated from completed calls
+
+        # Per-session counters
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_tokens = 0
+        self.saved_ms = 0.0
+
+    def observe(self, text: str):
+        """Pending transcript changed (or repeated) - restart the stability timer if it changed"""
+        text = text.strip()
+        if not text or text == self.candidate:
+            return
+        self.candidate = text
+        if self.timer:
+            self.timer.cancel()
+        if self.current and self.current.text != text:
+            self.current.discard("changed")
+            self.current = None
+        self.timer = asyncio.create_task(self._start_when_stable(text))
+
+    async def _start_when_stable(self, text: str):
+        await asyncio.sleep(self.stable_seconds)
+        self.timer = None
+        if self.current and self.current.text == text:
+            return
+        self.started += 1
+        metrics.increment("speculation.started")
+        self.current = Speculation(text, asyncio.create_task(self.speculate(text)), self)
+        print(f"🔮 Speculating on: {text}")
+
+    def take(self, text: str) -> Optional[Speculation]:
+        """Utterance committed - hand over a matching speculation, drop anything else"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        self.candidate = None
+        speculation, self.current = self.current, None
+        if speculation is None:
+            return None
+        if speculation.text != text.strip():
+            speculation.discard("changed")
+            return None
+        speculation.committed_at = time.perf_counter()
+        return speculation
+
+    def _record_hit(self, speculation: Speculation):
+        speculation.settled = True
+        # Head start the call had when the turn would otherwise have started it
+        committed_at = speculation.committed_at or time.perf_counter()
+        saved_ms = (min(committed_at, speculation.finished_at or committed_at) - speculation.started_at) * 1000
+        self.hits += 1
+        self.saved_ms += saved_ms
+        metrics.increment("speculation.hits")
+        metrics.observe("speculation.saved_ms", saved_ms)
+        self._update_rate()
+
+    def _record_miss(self, reason: str, tokens: int):
+        self.misses += 1
+        self.wasted_tokens += tokens
+        metrics.increment("speculation.misses")
+        metrics.increment(f"speculation.misses.{reason}")
+        metrics.increment("speculation.wasted_tokens", tokens)
+        self._update_rate()
+
+    def _learn_prompt_size(self, result: dict):
+        self.prompt_tokens_estimate = result.get("prompt_tokens") or self.prompt_tokens_estimate
+
+    def _update_rate(self):
+        # Across all sessions
+        hits = metrics.counters.get("speculation.hits", 0)
+        settled = hits + metrics.counters.get("speculation.misses", 0)
+        metrics.set_gauge("speculation.hit_rate", round(hits / settled, 3) if settled else 0.0)
+
+    def close(self):
+        """Session over - cancel the timer and any speculation nobody will use"""
+        if self.timer:
+            self.timer.cancel()
+            self.timer = None
+        if self.current:
+            self.current.discard("abandoned")
+            self.current = None
+        if self.started:
+            print(f"🔮 Speculation: {self.hits} hits / {self.misses} misses, "
+                  f"{self.saved_ms:.0f} ms saved, ~{self.wasted_tokens} tokens wasted")
\ No newline at end of file
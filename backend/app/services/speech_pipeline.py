@@ -0,0 +1,224 @@
+# app/services/speech_pipeline.py
+import os
+import re
+import time
+import asyncio
+from typing import List, Optional
+from .websocket_utils import safe_send_json
+from .metrics import metrics
+
+# Maximum number of sentences being synthesized at the same time for one session
+TTS_MAX_IN_FLIGHT = int(os.getenv("TTS_MAX_IN_FLIGHT", "2"))
+
+# Words ending in a period that do not end a sentence ("Dr. Sarah Chen")
+ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "prof", "st", "vs", "e.g", "i.e", "etc"}
+
+# Sentence punctuation (optionally followed by closing quotes/brackets) and whitespace
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\')\]]*\s+')
+
+
+class SentenceSplitter:
+    """Splits streamed text into sentences as soon as they are complete"""
+
+    def __init__(self, min_chars: int = 12):
+        self.buffer = ""
+        self.min_chars = min_chars  # very short fragments ("Hi.") are merged with the next sentence
+
+    def feed(self, text: str) -> List[str]:
+        """Add text and return the sentences it completed"""
+        self.buffer += text
+        sentences = []
+        start = 0
+
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            candidate = self.buffer[start:match.end()].strip()
+            words = candidate.split()
+            last_word = words[-1].lower().rstrip('.!?"\')]') if words else ""
+
+            if last_word in ABBREVIATIONS or len(last_word) == 1 and last_word.isalpha():
+                continue  # "Dr." or an initial - the sentence goes on
+            if len(candidate) < self.min_chars:
+                continue
+
+            sentences.append(candidate)
+            start = match.end()
+
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the text is complete"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+def audio_duration_ms(byte_count: int, output_format: str) -> float:
+    """Playback length of MP3 audio in an ElevenLabs mp3_<sample rate>_<kbps> format (CBR)"""
+    try:
+        kbps = int(output_format.rsplit("_", 1)[1])
+    except (IndexError, ValueError):
+        kbps = 128
+    return byte_count * 8 / kbps
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a complete reply into sentences"""
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+class SpeechPipeline:
+    """
+    Speaks one reply sentence by sentence.
+    Each sentence is queued for TTS as soon as it is complete, with at most
+    `slots` syntheses in flight, and audio is sent to the client strictly in order.
+    """
+
+    def __init__(self, websocket, tts, slots: Optional[asyncio.Semaphore] = None, started_at: Optional[float] = None):
+        self.websocket = websocket
+        self.tts = tts
+        self.slots = slots or asyncio.Semaphore(TTS_MAX_IN_FLIGHT)
+        self.started_at = started_at or time.perf_counter()
+        self.splitter = SentenceSplitter()
+        self.spoken_text = ""  # everything fed so far
+
+        # One chunk queue per sentence, in playback order (None marks the end of the reply)
+        self.sentences: asyncio.Queue = asyncio.Queue()
+        self.synthesis_tasks: List[asyncio.Task] = []
+        self.sender_task: Optional[asyncio.Task] = None
+
+        self.sentence_count = 0
+        self.started = False  # speech_start sent - only once there is audio, so every start gets its end
+        self.seq = 0
+        self.total_bytes = 0
+        self.time_to_first_audio_ms = None
+
+    def feed(self, text: str):
+        """Add reply text; complete sentences are queued for synthesis immediately"""
+        if not text:
+            return
+        self.spoken_text += text
+        for sentence in self.splitter.feed(text):
+            self._submit(sentence)
+
+    def _submit(self, sentence: str):
+        chunks: asyncio.Queue = asyncio.Queue()
+        self.synthesis_tasks.append(asyncio.create_task(self._synthesize(sentence, chunks)))
+        self.sentences.put_nowait(chunks)
+        if self.sender_task is None:
+            self.sender_task = asyncio.create_task(self._send_in_order())
+
+    async def _synthesize(self, sentence: str, chunks: asyncio.Queue):
+        """Synthesize one sentence into its chunk queue"""
+        try:
+            async with self.slots:
+                print(f"🎵 Synthesizing sentence: {sentence}")
+                buffered = []
+                # The blocking ElevenLabs client runs on the TTS executor, never on the event loop
+                async for chunk in self.tts.synthesize(sentence):
+                    if not chunk:
+                        continue
+                    if self.tts.streaming:
+                        await chunks.put(chunk)
+                    else:
+                        buffered.append(chunk)
+
+                if buffered:
+                    await chunks.put(b''.join(buffered))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error synthesizing sentence: {e}")
+        finally:
+            chunks.put_nowait(None)
+
+    async def _send_in_order(self):
+        """Forward audio to the client sentence by sentence, chunk by chunk"""
+        while True:
+            chunks = await self.sentences.get()
+            if chunks is None:
+                break
+
+            sentence_index = self.sentence_count
+            self.sentence_count += 1
+            while True:
+                chunk = await chunks.get()
+                if chunk is None:
+                    break
+                if self.websocket.client_state.name != 'CONNECTED':
+                    continue  # keep draining so synthesis tasks can finish
+
+                if not self.started:
+                    self.started = True
+                    await safe_send_json(self.websocket, {
+                        "type": "speech_start",
+                        "message": "AI is responding...",
+                        "streaming": self.tts.streaming
+                    })
+                if self.time_to_first_audio_ms is None:
+                    self.time_to_first_audio_ms = (time.perf_counter() - self.started_at) * 1000
+
+                # Header first so the client knows the order of the binary frame that follows
+                await safe_send_json(self.websocket, {
+                    "type": "speech_chunk",
+                    "seq": self.seq,
+                    "sentence": sentence_index,
+                    "bytes": len(chunk)
+                })
+                try:
+                    await self.websocket.send_bytes(chunk)
+                except Exception as e:
+                    print(f"Error sending audio bytes: {e}")
+                    continue
+                self.seq += 1
+                self.total_bytes += len(chunk)
+
+    def stats(self) -> dict:
+        return {
+            "sentences": self.sentence_count,
+            "chunks": self.seq,
+            "bytes": self.total_bytes,
+            "audio_ms": round(audio_duration_ms(self.total_bytes, getattr(self.tts, "output_format", "")), 1),
+            "time_to_first_audio_ms": round(self.time_to_first_audio_ms, 1) if self.time_to_first_audio_ms is not None else None,
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 1)
+        }
+
+    async def close(self) -> Optional[dict]:
+        """
+        Flush the last sentence, wait for playback to be sent, and send speech_end.
+        Returns the stats (chunks is 0 when every sentence failed - no speech_start/speech_end
+        was sent then), or None if there was nothing to say.
+        """
+        for sentence in self.splitter.flush():
+            self._submit(sentence)
+
+        if self.sender_task is None:
+            return None  # nothing was spoken
+
+        self.sentences.put_nowait(None)
+        await self.sender_task
+
+        stats = self.stats()
+        if self.time_to_first_audio_ms is not None:
+            metrics.observe("tts.time_to_first_audio_ms", self.time_to_first_audio_ms)
+        metrics.increment("tts.turns")
+        metrics.increment("tts.sentences", self.sentence_count)
+        metrics.increment("tts.bytes_sent", self.total_bytes)
+
+        if self.started:
+            await safe_send_json(self.websocket, {
+                "type": "speech_end",
+                "message": "AI finished speaking",
+                **stats
+            })
+        print(f"🎵 Sent audio: {self.total_bytes} bytes in {self.seq} chunks / {self.sentence_count} sentences "
+              f"(first audio after {stats['time_to_first_audio_ms']} ms)")
+        return stats
+
+    async def cancel(self):
+        """Stop all synthesis and playback for this reply"""
+        tasks = self.synthesis_tasks + ([self.sender_task] if self.sender_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
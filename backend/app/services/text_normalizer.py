@@ -0,0 +1,182 @@
+# app/services/text_normalizer.py
+import re
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Number words -> values (compounds like "twenty five" are built from these)
+UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9
+}
+TEENS = {
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19
+}
+TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90
+}
+NUMBER_WORDS = {**UNITS, **TEENS, **TENS}
+
+# Abbreviated titles (trailing period kept as punctuation)
+HONORIFICS = {"dr": "Dr", "mr": "Mr", "mrs": "Mrs", "ms": "Ms", "prof": "Prof"}
+# Words followed by a name, and how many name words may follow
+NAME_TITLES = {"doctor": 2, "professor": 2, "miss": 2, **{title: 2 for title in HONORIFICS}}
+NAME_PHRASES = {("name", "is"): 3, ("call", "me"): 3}
+# Words that end a name ("doctor chen tomorrow", "my name is john and ...")
+NAME_STOP_WORDS = {
+    "a", "an", "the", "and", "or", "but", "so", "to", "for", "at", "on", "in", "of", "with", "from",
+    "by", "about", "is", "am", "are", "was", "i", "i'm", "i'd", "my", "me", "please", "thanks",
+    "today", "tomorrow", "tonight", "next", "this", "that", "um", "uh", "like", "yes", "no",
+    "appointment", "office", "clinic", "because", "who", "what", "when", "how"
+}
+# Suffixes after an apostrophe that stay lowercase ("Chen's", but "O'Brien")
+APOSTROPHE_SUFFIXES = {"s", "ll", "re", "ve", "d", "t", "m"}
+
+SENTENCE_END = (".", "?", "!")
+PUNCTUATION_CHARS = frozenset(".,?!;:\"')]")
+TRAILING_PUNCTUATION = re.compile(r"[.,?!;:\"')\]]+$")
+
+# Normalizer state between tokens: (sentence_start, name_words_left, previous_word)
+State = Tuple[bool, int, str]
+INITIAL_STATE: State = (True, 0, "")
+
+
+def _capitalize_name(word: str) -> str:
+    parts = word.split("'")
+    return "'".join(
+        part if index and part in APOSTROPHE_SUFFIXES else part[:1].upper() + part[1:]
+        for index, part in enumerate(parts)
+    )
+
+
+class TranscriptNormalizer:
+    """
+    Single-pass transcript normalizer: number words to digits ("one two three" -> "123",
+    "twenty five" -> "25"), sentence case, "I", honorifics and names after titles or
+    "my name is". Keep one instance per session: each interim result usually extends the
+    previous one, so output for the unchanged token prefix is reused and only the new
+    suffix is processed.
+    """
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.output: List[str] = []
+        # checkpoints[i] = (output length, state) before token i, None inside a number run
+        self.checkpoints: List[Optional[Tuple[int, State]]] = [(0, INITIAL_STATE)]
+        self.tokens_processed = 0
+        self.tokens_reused = 0
+
+    def normalize(self, text: str) -> str:
+        if not text:
+            return text
+        tokens = text.split()
+
+        # Longest unchanged prefix that ends on a checkpoint
+        common = 0
+        limit = min(len(tokens), len(self.tokens))
+        while common < limit and tokens[common] == self.tokens[common]:
+            common += 1
+        while self.checkpoints[common] is None:
+            common -= 1
+
+        output_length, state = self.checkpoints[common]
+        output = self.output[:output_length]
+        checkpoints = self.checkpoints[:common + 1]
+        self.tokens_reused += common
+        self.tokens_processed += len(tokens) - common
+
+        sentence_start, name_words, previous = state
+        run: List[str] = []  # number pieces of the current run
+        digits = ""          # consecutive single digits, joined
+        tens = None          # "twenty" waiting for a unit
+        run_suffix = ""
+
+        def close_run():
+            nonlocal digits, tens, run_suffix, sentence_start
+            if tens is not None:
+                run.append(str(tens))
+            if digits:
+                run.append(digits)
+            if run:
+                run[-1] += run_suffix
+                output.extend(run)
+                sentence_start = run_suffix.endswith(SENTENCE_END)
+            run.clear()
+            digits, tens, run_suffix = "", None, ""
+
+        for index in range(common, len(tokens)):
+            token = tokens[index]
+            if token[-1] in PUNCTUATION_CHARS:
+                match = TRAILING_PUNCTUATION.search(token)
+                suffix = match.group()
+                core = token[:len(token) - len(suffix)]
+            else:
+                suffix, core = "", token
+            word = core.lower()
+
+            if run_suffix:
+                close_run()  # punctuation after a number word ends its run
+
+            value = NUMBER_WORDS.get(word)
+            if value is not None:
+                # Number word - extend the current run
+                if word in UNITS and tens is not None and value:
+                    run.append(str(tens + value))
+                    tens = None
+                else:
+                    if tens is not None:
+                        run.append(str(tens))
+                        tens = None
+                    if word in UNITS:
+                        digits += str(value)
+                    else:
+                        if digits:
+                            run.append(digits)
+                            digits = ""
+                        if word in TENS:
+                            tens = value
+                        else:
+                            run.append(str(value))
+                run_suffix = suffix
+                previous = word
+                name_words = 0
+                checkpoints.append(None)
+                continue
+
+            close_run()
+
+            # Ordinary word
+            if word in HONORIFICS:
+                core = HONORIFICS[word]
+            elif word == "i" or word.startswith("i'"):
+                core = "I" + core[1:]
+            elif name_words and word not in NAME_STOP_WORDS and word.replace("'", "").isalpha():
+                core = _capitalize_name(core)
+                name_words -= 1
+            else:
+                name_words = 0
+
+            if sentence_start:
+                core = core[:1].upper() + core[1:]
+            output.append(core + suffix)
+
+            name_words = NAME_TITLES.get(word) or NAME_PHRASES.get((previous, word)) or name_words
+            previous = word
+            sentence_start = suffix.endswith(SENTENCE_END) and word not in HONORIFICS  # "Dr." ends no sentence
+            if sentence_start:
+                name_words = 0
+            checkpoints.append((len(output), (sentence_start, name_words, previous)))
+
+        close_run()
+
+        self.tokens = tokens
+        self.output = output
+        self.checkpoints = checkpoints
+        return " ".join(output)
+
+
+@lru_cache(maxsize=1024)
+def normalize_transcript(text: str) -> str:
+    """Normalize a complete transcript (memoized - finals are normalized again when committed)"""
+    return TranscriptNormalizer().normalize(text)
\ No newline at end of file
@@ -1,73 +1,105 @@
 # app/services/transcript_buffer.py
+import os
 import time
+from collections import deque
+from typing import List, Optional
+
+# Recently committed sentences remembered for duplicate detection
+TRANSCRIPT_DEDUPE_WINDOW = int(os.getenv("TRANSCRIPT_DEDUPE_WINDOW", "16"))
+# Two results starting within this many seconds cover the same audio
+TIME_EPSILON = 0.01
+
+
+class Segment:
+    """One Deepgram result: text for the audio window [start, end)"""
+    __slots__ = ("text", "start", "end", "words")
+
+    def __init__(self, text: str, start: Optional[float], end: Optional[float]):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.words = len(text.split())
 
 
 class TranscriptBuffer:
-    def __init__(self):
-        self.buffer = ""
+    """
+    Collects Deepgram final results until the endpoint detector commits the utterance.
+    Finals are kept as segments keyed by their audio window (start/duration): a final for a
+    window already buffered replaces it (revised final) and finals for audio that was already
+    committed are dropped. Interim text only replaces the previous interim. Each update costs
+    O(words in the new result); the text is only joined on commit.
+    """
+
+    def __init__(self, dedupe_window: int = TRANSCRIPT_DEDUPE_WINDOW):
+        self.segments: List[Segment] = []   # final segments of the pending utterance, in audio order
+        self.interim = ""  # latest interim text, replaced by each update
+        self.word_count = 0
+        self.committed_until: Optional[float] = None  # audio time covered by committed sentences
+        self.recent = deque(maxlen=dedupe_window)       # (text, start) of recently committed sentences
         self.last_activity_time = time.time()
-        self.silence_threshold = 3.0  # seconds of silence before processing
-        self.processed_sentences = set()  # Track processed sentences to avoid duplicates
-    
-    def add_transcript(self, transcript, is_final=False):
-        """Add transcript to buffer and return complete sentence if ready"""
-        if not transcript.strip():
-            return None
-            
-        # Update activity time
+
+    @property
+    def has_text(self) -> bool:
+        return bool(self.segments)
+
+    @property
+    def buffer(self) -> str:
+        """Pending final text"""
+        return " ".join(segment.text for segment in self.segments)
+
+    def add_transcript(self, transcript, is_final=False, start=None, duration=None):
+        """Add a Deepgram result - final text is buffered, interim text only replaces the last interim"""
+        text = transcript.strip()
+        if not text:
+            return
         self.last_activity_time = time.time()
-        
-        # Add to buffer
-        if self.buffer:
-            self.buffer += " " + transcript.strip()
-        else:
-            self.buffer = transcript.strip()
-        
-        print(f"📝 Buffer updated: '{self.buffer}' (is_final: {is_final})")
-        
-        # Check if we should process this sentence
-        if self._should_process_sentence(is_final):
-            sentence = self.buffer.strip()
-            # Avoid processing the same sentence multiple times
-            if sentence not in self.processed_sentences and len(sentence) > 10:
-                self.processed_sentences.add(sentence)
-                self.buffer = ""  # Clear buffer after processing
-                return sentence
-        
-        return None
-    
-    def _should_process_sentence(self, is_final):
-        """Improved logic to determine when to process a sentence"""
-        if not self.buffer:
-            return False
-            
-        buffer_words = self.buffer.split()
-        buffer_length = len(self.buffer)
-        
-        # Strong indicators of a complete sentence
-        if self.buffer.strip().endswith(('.', '?', '!', '。', '？', '！')):
-            return is_final and len(buffer_words) >= 2
-        
-        # For sentences without punctuation, be more conservative
-        if is_final:
-            # Check for incomplete patterns
-            incomplete_endings = ['my', 'the', 'a', 'an', 'to', 'for', 'with', 'and', 'or', 'i', 'want', 'need','is','id is','because']
-            last_word = self.buffer.strip().lower().split()[-1] if buffer_words else ""
-            
-            # More conservative: require longer sentences and avoid obvious incomplete endings
-            if (len(buffer_words) >= 3 and 
-                buffer_length >= 15 and 
-                last_word not in incomplete_endings):
-                return True
-        
-        return False
-    
+
+        if not is_final:
+            # Interim for audio that is already final (arrived late) - nothing new
+            if start is None or not self._covered(start):
+                self.interim = text
+            return
+
+        self.interim = ""
+        if start is not None:
+            if self._covered(start):
+                return  # replayed final for audio that was already committed
+            # Revised final - drop buffered segments for the same or later audio
+            while self.segments and self.segments[-1].start is not None and self.segments[-1].start >= start - TIME_EPSILON:
+                self.word_count -= self.segments.pop().words
+
+        segment = Segment(text, start, start + (duration or 0.0) if start is not None else None)
+        self.segments.append(segment)
+        self.word_count += segment.words
+        print(f"📝 Buffer updated: +'{text}' ({self.word_count} words pending)")
+
+    def _covered(self, start: float) -> bool:
+        return self.committed_until is not None and start < self.committed_until - TIME_EPSILON
+
+    def _commit(self) -> Optional[str]:
+        sentence = self.buffer.strip()
+        first_start = self.segments[0].start if self.segments else None
+        last_end = self.segments[-1].end if self.segments else None
+        self.segments = []
+        self.word_count = 0
+        if not sentence:
+            return None
+
+        if last_end is not None:
+            self.committed_until = max(self.committed_until or 0.0, last_end)
+        # Same words over the same audio - untimed results fall back to text only
+        key = (sentence, round(first_start, 2) if first_start is not None else None)
+        if key in self.recent:
+            return None
+        self.recent.append(key)
+        return sentence
+
+    def take_sentence(self):
+        """Return the buffered utterance and clear the buffer (None if empty or already processed)"""
+        return self._commit()
+
     def get_final_buffer(self):
         """Get any remaining content when connection closes"""
-        if self.buffer and len(self.buffer.split()) >= 3:
-            sentence = self.buffer.strip()
-            if sentence not in self.processed_sentences:
-                self.processed_sentences.add(sentence)
-                self.buffer = ""
-                return sentence
+        if self.word_count >= 3:
+            return self._commit()
         return None
\ No newline at end of file
@@ -0,0 +1,151 @@
+# app/services/transcript_channel.py
+import os
+import json
+import time
+import asyncio
+from typing import Dict, Optional
+from .websocket_utils import safe_send_json
+from .metrics import metrics
+
+# Interim transcript updates sent to the browser per second (0 = no limit)
+TRANSCRIPT_MAX_RATE = float(os.getenv("TRANSCRIPT_MAX_RATE", "10"))
+
+
+def _size(payload: dict) -> int:
+    return len(json.dumps(payload).encode("utf-8"))
+
+
+class TranscriptChannel:
+    """
+    Outbound transcript stream for one session.
+    Interim results are coalesced to at most TRANSCRIPT_MAX_RATE messages per second and sent
+    as transcript_delta `seq`: take the text of message `base`, keep its first `keep` characters
+    and append `text`. Deltas are computed against the newest text the client acked
+    (transcript_ack), never against one it may not have, so a lost or skipped delta is repaired
+    by the next one; without acks every delta carries the whole line. Finals are always sent at
+    once as a full transcript message and start a new line (the next deltas use them as base).
+    """
+
+    def __init__(self, websocket, max_rate: float = TRANSCRIPT_MAX_RATE):
+        self.websocket = websocket
+        self.min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.seq = 0                     # number of the last message sent
+        self.base_seq = 0                # newest state the client has for sure (acked, or a final)
+        self.base_text = ""
+        self.unacked: Dict[int, str] = {}  # seq -> interim text sent but not acked yet
+        self.sent_text = ""              # newest interim sent
+        self.pending: Optional[str] = None  # newest interim not sent yet
+        self.flush_task: Optional[asyncio.Task] = None
+        self.last_sent_at = 0.0
+
+        # Per-session counters
+        self.messages_in = 0
+        self.messages_sent = 0
+        self.bytes_full = 0  # what one full message per result would have cost
+        self.bytes_sent = 0
+
+    async def interim(self, text: str):
+        """Queue an interim result; sent now or at the end of the current rate window"""
+        self.messages_in += 1
+        self.bytes_full += _size(self._full_message(text, is_final=False))
+        self.pending = text
+
+        if self.flush_task:
+            return  # the scheduled flush will send the newest text
+        wait = self.min_interval - (time.monotonic() - self.last_sent_at)
+        if wait <= 0:
+            await self._send_interim()
+        else:
+            self.flush_task = asyncio.create_task(self._flush_later(wait))
+
+    async def _flush_later(self, wait: float):
+        await asyncio.sleep(wait)
+        self.flush_task = None
+        await self._send_interim()
+
+    async def _send_interim(self):
+        text, self.pending = self.pending, None
+        if text is None or text == self.sent_text:
+            return
+
+        keep = 0
+        limit = min(len(text), len(self.base_text))
+        while keep < limit and text[keep] == self.base_text[keep]:
+            keep += 1
+
+        payload = {
+            "type": "transcript_delta",
+            "seq": self.seq + 1,
+            "base": self.base_seq,
+            "keep": keep,
+            "text": text[keep:],
+            "is_final": False,
+            "is_interim": True
+        }
+        self.last_sent_at = time.monotonic()
+        if await safe_send_json(self.websocket, payload):
+            self.seq += 1
+            self.unacked[self.seq] = text
+            self.sent_text = text
+            self._count_sent(payload)
+
+    def ack(self, seq: int):
+        """The client applied delta `seq` - later deltas are computed against its text"""
+        text = self.unacked.get(seq)
+        if text is None:
+            return  # stale ack, or a line already closed by a final
+        self.base_seq, self.base_text = seq, text
+        self.unacked = {key: value for key, value in self.unacked.items() if key > seq}
+
+    async def final(self, text: str):
+        """Send a final result immediately; any interim still waiting is superseded"""
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        self.pending = None
+
+        payload = {**self._full_message(text, is_final=True), "seq": self.seq + 1}
+        self.messages_in += 1
+        self.bytes_full += _size(payload)
+        if await safe_send_json(self.websocket, payload):
+            self._count_sent(payload)
+        # The next segment starts a new interim line, based on this message
+        self.seq += 1
+        self.base_seq, self.base_text = self.seq, ""
+        self.unacked.clear()
+        self.sent_text = ""
+
+    def _full_message(self, text: str, is_final: bool) -> dict:
+        return {
+            "type": "transcript",
+            "transcript": text,
+            "is_final": is_final,
+            "is_interim": not is_final
+        }
+
+    def _count_sent(self, payload: dict):
+        self.messages_sent += 1
+        self.bytes_sent += _size(payload)
+
+    def stats(self) -> dict:
+        return {
+            "results": self.messages_in,
+            "messages_sent": self.messages_sent,
+            "messages_saved": self.messages_in - self.messages_sent,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_full - self.bytes_sent
+        }
+
+    def close(self) -> dict:
+        """Session over - drop any unsent interim and report the savings"""
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        stats = self.stats()
+        metrics.increment("transcripts.messages_sent", stats["messages_sent"])
+        metrics.increment("transcripts.messages_saved", stats["messages_saved"])
+        metrics.increment("transcripts.bytes_sent", stats["bytes_sent"])
+        metrics.increment("transcripts.bytes_saved", stats["bytes_saved"])
+        print(f"📝 Transcripts: {stats['results']} results in {stats['messages_sent']} messages, "
+              f"{stats['bytes_saved']} bytes saved")
+        return stats
\ No newline at end of file
@@ -0,0 +1,195 @@
+# app/services/tts_cache.py
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional
+from .metrics import metrics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# In-memory tier size (bytes of audio)
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# On-disk tier for the warm phrases only ("" keeps the cache in memory only)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(BACKEND_DIR, "tts_cache"))
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+
+# Replies spoken word for word again and again - synthesized once at startup
+DEFAULT_WARM_PHRASES = [
+    "Hello! How can I help you today?",
+    "You're welcome! Is there anything else I can help you with?",
+    "Sorry, I couldn't process that request.",
+    "Sure, may I please have your full name?",
+    "What date would you like to book for?",
+    "What time works best for you?",
+    "Which doctor would you like to see?",
+    "Could you please provide your appointment ID?",
+    "What is the new date you'd prefer?",
+    "What is the new time you'd prefer?",
+    "Could you please provide that information?",
+]
+# "|"-separated override of the warm-up list
+TTS_CACHE_WARM_PHRASES = [
+    phrase.strip() for phrase in os.getenv("TTS_CACHE_WARM_PHRASES", "").split("|") if phrase.strip()
+] or DEFAULT_WARM_PHRASES
+
+
+def cache_key(text: str, voice_id: str, model: str, voice_settings, output_format: str) -> str:
+    """Content address of a synthesized sentence - anything that changes the audio is part of the key"""
+    if hasattr(voice_settings, "dict"):
+        voice_settings = voice_settings.dict()
+    payload = json.dumps([text.strip(), voice_id, model, voice_settings, output_format], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Two-tier cache of synthesized audio: an LRU in memory bounded by total bytes, and one file
+    per entry on disk so warmed phrases survive restarts. Only the keys in persistent (the warm
+    phrases) are written to disk - sentences with patient details stay in memory and age out.
+    Thread-safe - entries are stored from the TTS worker threads. On the event loop use
+    lookup(): only the memory tier is checked inline, files are read on a worker thread.
+    """
+
+    def __init__(self, max_bytes: int = TTS_CACHE_MAX_BYTES, directory: Optional[str] = TTS_CACHE_DIR,
+                 persistent: Iterable[str] = ()):
+        self.max_bytes = max_bytes
+        self.directory = directory or None
+        self.persistent = set(persistent)
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._prune()
+            except OSError as e:
+                print(f"⚠️ TTS cache directory unavailable, memory only: {e}")
+                self.directory = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.audio")
+
+    def _prune(self):
+        """Remove files that are not warm phrases (older voice settings, dropped phrases)"""
+        removed = 0
+        for name in os.listdir(self.directory):
+            key, extension = os.path.splitext(name)
+            if extension in (".audio", ".tmp") and key not in self.persistent:
+                os.remove(os.path.join(self.directory, name))
+                removed += 1
+        if removed:
+            print(f"🧹 Removed {removed} TTS cache files that are not warm phrases")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Memory tier, then disk - blocking, for worker threads"""
+        audio = self._from_memory(key)
+        if audio is None:
+            audio = self._from_disk(key)
+        return self._count_lookup(audio)
+
+    async def lookup(self, key: str) -> Optional[bytes]:
+        """get() for the event loop - a disk read runs on a worker thread"""
+        audio = self._from_memory(key)
+        if audio is None and self.directory:
+            audio = await asyncio.to_thread(self._from_disk, key)
+        return self._count_lookup(audio)
+
+    def _from_memory(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            audio = self.entries.get(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+        return audio
+
+    def _from_disk(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+        except OSError:
+            return None
+        self._remember(key, audio)
+        return audio
+
+    def _count_lookup(self, audio: Optional[bytes]) -> Optional[bytes]:
+        with self.lock:
+            if audio is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_served += len(audio)
+            hit_rate = self.hits / (self.hits + self.misses)
+        metrics.set_gauge("tts.cache.hit_rate", round(hit_rate, 3))
+        metrics.increment("tts.cache.hits" if audio is not None else "tts.cache.misses")
+        if audio is not None:
+            metrics.increment("tts.cache.bytes_served", len(audio))
+        return audio
+
+    def contains(self, key: str) -> bool:
+        with self.lock:
+            if key in self.entries:
+                return True
+        return bool(self.directory) and os.path.exists(self._path(key))
+
+    def put(self, key: str, audio: bytes, persist: bool = False):
+        """Store in memory; on disk as well for warm phrases (persist, or a key in persistent)"""
+        if not audio:
+            return
+        self._remember(key, audio)
+        if persist:
+            self.persistent.add(key)
+        if self.directory and key in self.persistent:
+            # Write then rename so a crash never leaves a truncated entry
+            path = self._path(key)
+            try:
+                with open(path + ".tmp", "wb") as f:
+                    f.write(audio)
+                os.replace(path + ".tmp", path)
+            except OSError as e:
+                print(f"⚠️ Could not write TTS cache entry: {e}")
+
+    def _remember(self, key: str, audio: bytes):
+        """Insert into the memory tier and evict least recently used entries over the byte budget"""
+        if len(audio) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = audio
+            self.size += len(audio)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+            metrics.set_gauge("tts.cache.memory_bytes", self.size)
+
+    def record(self, key: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass chunks through and store the whole sentence once the stream completes - not a cut-off one"""
+        collected = []
+        for chunk in chunks:
+            if chunk:
+                collected.append(chunk)
+            yield chunk
+        self.put(key, b"".join(collected))
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "memory_bytes": self.size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "bytes_served": self.bytes_served
+            }
\ No newline at end of file
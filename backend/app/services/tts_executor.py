@@ -0,0 +1,102 @@
+# app/services/tts_executor.py
+import os
+import time
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Iterable
+from .metrics import metrics
+
+# Syntheses running at the same time across all sessions; the rest wait for a slot
+TTS_EXECUTOR_WORKERS = max(1, int(os.getenv("TTS_EXECUTOR_WORKERS", "4")))
+
+
+class TTSExecutor:
+    """
+    Dedicated, bounded thread pool for the synchronous ElevenLabs client.
+    The blocking HTTP calls and chunk iteration run on worker threads, so a synthesis never
+    stalls the event loop (audio relay and transcripts of every other session).
+    Time spent waiting for a free worker is reported as tts.executor.queue_wait_ms.
+    """
+
+    def __init__(self, workers: int = TTS_EXECUTOR_WORKERS):
+        self.workers = workers
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+        self.slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.in_flight = 0
+
+    @asynccontextmanager
+    async def _slot(self):
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        metrics.set_gauge("tts.executor.waiting", self.waiting)
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+            metrics.set_gauge("tts.executor.waiting", self.waiting)
+        metrics.observe("tts.executor.queue_wait_ms", (time.perf_counter() - queued_at) * 1000)
+
+        self.in_flight += 1
+        metrics.set_gauge("tts.executor.in_flight", self.in_flight)
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("tts.executor.in_flight", self.in_flight)
+            self.slots.release()
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run a blocking call on a TTS worker"""
+        async with self._slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+
+    async def stream(self, factory: Callable[[], Iterable[bytes]]) -> AsyncIterator[bytes]:
+        """
+        Iterate a blocking chunk iterator (built by factory) on one TTS worker and yield the
+        chunks on the event loop. Stopping early (cancel/break) closes the iterator on the worker.
+        """
+        async with self._slot():
+            loop = asyncio.get_running_loop()
+            chunks: asyncio.Queue = asyncio.Queue()
+            stop = threading.Event()
+
+            def produce():
+                iterator = None
+                try:
+                    iterator = factory()
+                    for chunk in iterator:
+                        if stop.is_set():
+                            break
+                        loop.call_soon_threadsafe(chunks.put_nowait, ("chunk", chunk))
+                    loop.call_soon_threadsafe(chunks.put_nowait, ("done", None))
+                except Exception as e:
+                    loop.call_soon_threadsafe(chunks.put_nowait, ("error", e))
+                finally:
+                    close = getattr(iterator, "close", None)
+                    if close:
+                        close()
+
+            worker = loop.run_in_executor(self.pool, produce)
+            try:
+                while True:
+                    kind, value = await chunks.get()
+                    if kind == "done":
+                        break
+                    if kind == "error":
+                        raise value
+                    yield value
+            finally:
+                stop.set()
+                # Keep the slot until the worker thread has really let go of the request
+                await asyncio.wait({worker})
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+tts_executor = TTSExecutor()
\ No newline at end of file
@@ -0,0 +1,195 @@
+# app/services/turn_controller.py
+import os
+import time
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+from .speech_pipeline import TTS_MAX_IN_FLIGHT
+from .websocket_utils import safe_send_json
+from .metrics import metrics
+from .session_store import new_session_id
+
+TurnHandler = Callable[[str], Awaitable]
+
+# Slack on top of the reply's audio duration before playback counts as over without a client ack
+PLAYBACK_GRACE_MS = int(os.getenv("PLAYBACK_GRACE_MS", "500"))
+
+
+class TurnController:
+    """
+    Per-session turn scheduler.
+    Committed sentences run one turn at a time and in order, so two quick sentences never
+    hit analyze_intent concurrently. A sentence committed while another is still queued is
+    merged into it (one LLM call instead of two). The controller keeps every task reference,
+    cancels the running turn on barge-in and cancels everything on disconnect.
+    Audio is sent faster than real time, so the turn is over well before the client has played
+    the reply: the session stays SPEAKING until the client reports playback_ended or the audio
+    duration has elapsed, and speech during that time still barges in.
+    """
+
+    # Turn phases
+    IDLE = "idle"
+    THINKING = "thinking"  # waiting for the LLM
+    ACTING = "acting"      # database step - never cancelled half way
+    SPEAKING = "speaking"  # reply audio being synthesized/sent/played
+
+    def __init__(self, websocket, session_id: Optional[str] = None):
+        self.websocket = websocket
+        self.session_id = session_id or new_session_id()
+        # Limits concurrent sentence syntheses for this session
+        self.tts_slots = asyncio.Semaphore(TTS_MAX_IN_FLIGHT)
+
+        self.queued_text: Optional[str] = None      # committed, waiting for the running turn
+        self.queued_handler: Optional[TurnHandler] = None
+        self.carry_over: Optional[str] = None       # sentence whose turn was cancelled before the LLM answered
+        self.worker_task: Optional[asyncio.Task] = None
+        self.current_task: Optional[asyncio.Task] = None
+        self.current_text: Optional[str] = None
+        self.closing = False
+
+        self._phase = self.IDLE
+        self.playback_turn_id: Optional[int] = None  # turn whose reply the client is still playing
+        self.playback_until = 0.0                     # monotonic deadline when no ack arrives
+        self.interrupted = False  # barge-in during the database step - skip speaking the reply
+        self.turn_id = 0
+        self.counters: Dict[str, int] = {
+            "turns": 0, "merged": 0, "superseded": 0, "cancelled": 0, "barge_ins": 0, "playback_acks": 0
+        }
+
+    @property
+    def busy(self) -> bool:
+        return self.current_task is not None and not self.current_task.done()
+
+    @property
+    def playing(self) -> bool:
+        """The client is still playing a reply that was sent in full"""
+        if self.playback_turn_id is not None and time.monotonic() >= self.playback_until:
+            self.playback_turn_id = None
+        return self.playback_turn_id is not None
+
+    @property
+    def phase(self) -> str:
+        if self._phase == self.IDLE and self.playing:
+            return self.SPEAKING
+        return self._phase
+
+    def _count(self, name: str):
+        self.counters[name] += 1
+        metrics.increment(f"turns.{name}")
+
+    def note_merged(self):
+        """A sentence joined the pending utterance inside the commit window"""
+        self._count("merged")
+
+    def submit(self, sentence: str, handler: TurnHandler):
+        """Queue a committed sentence; handler(text) runs the turn"""
+        if self.closing:
+            return
+
+        if self.carry_over:
+            sentence = f"{self.carry_over} {sentence}"
+            self.carry_over = None
+            self._count("merged")
+
+        if self.queued_text is not None:
+            self.queued_text = f"{self.queued_text} {sentence}"
+            self._count("merged")
+        else:
+            self.queued_text = sentence
+        self.queued_handler = handler
+
+        if self.worker_task is None or self.worker_task.done():
+            self.worker_task = asyncio.create_task(self._run_turns())
+
+    async def _run_turns(self):
+        """Run queued turns one after another"""
+        while self.queued_text is not None and not self.closing:
+            text, handler = self.queued_text, self.queued_handler
+            self.queued_text = None
+            self.queued_handler = None
+
+            self.turn_id += 1
+            self._phase = self.IDLE
+            self.interrupted = False
+            self.current_text = text
+            self._count("turns")
+
+            self.current_task = asyncio.create_task(handler(text))
+            # wait() instead of await - a barge-in cancelling the turn must not stop the worker
+            await asyncio.wait({self.current_task})
+            if not self.current_task.cancelled() and self.current_task.exception():
+                print(f"❌ Turn {self.turn_id} failed: {self.current_task.exception()}")
+
+        self._phase = self.IDLE
+
+    def set_phase(self, phase: str):
+        self._phase = phase
+
+    def start_playback(self, remaining_ms: float):
+        """The current turn's reply was sent in full; the client plays it for about remaining_ms more"""
+        self.playback_turn_id = self.turn_id
+        self.playback_until = time.monotonic() + (max(0.0, remaining_ms) + PLAYBACK_GRACE_MS) / 1000
+
+    def playback_ended(self):
+        """Client ack - the reply finished playing"""
+        if self.playback_turn_id is not None:
+            self.playback_turn_id = None
+            self._count("playback_acks")
+
+    async def barge_in(self) -> bool:
+        """New speech while the AI is thinking or speaking - drop the stale reply"""
+        running = self.busy and self._phase != self.IDLE
+        if not running and not self.playing:
+            return False
+
+        self._count("barge_ins")
+        phase = self.phase
+        turn_id = self.turn_id if running else self.playback_turn_id
+        print(f"✋ Barge-in during {phase} (turn {turn_id})")
+        # Whatever the client is still playing stops with this turn
+        self.playback_turn_id = None
+
+        if running and phase == self.ACTING:
+            # Let the database step finish, but do not speak its reply
+            self.interrupted = True
+        elif running:
+            if phase == self.THINKING:
+                # The LLM never answered - send this sentence again together with the next one
+                if self.queued_text is not None:
+                    self.queued_text = f"{self.current_text} {self.queued_text}"
+                    self._count("merged")
+                else:
+                    self.carry_over = self.current_text
+            self.current_task.cancel()
+            await asyncio.wait({self.current_task})
+            self._count("superseded")
+
+        await safe_send_json(self.websocket, {
+            "type": "stop_playback",
+            "turn_id": turn_id
+        })
+        return True
+
+    async def drain(self):
+        """Wait for every queued turn to finish"""
+        if self.worker_task and not self.worker_task.done():
+            await asyncio.wait({self.worker_task})
+
+    async def close(self):
+        """Session ended - cancel the running turn and drop queued ones"""
+        self.closing = True
+        for pending in (self.queued_text, self.carry_over):
+            if pending:
+                self._count("cancelled")
+        self.queued_text = None
+        self.carry_over = None
+
+        tasks = [task for task in (self.current_task, self.worker_task) if task and not task.done()]
+        if self.busy:
+            self._count("cancelled")
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+        self._phase = self.IDLE
+        self.playback_turn_id = None
+        print(f"📊 Turns for session {self.session_id}: {self.counters}")
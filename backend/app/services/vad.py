@@ -0,0 +1,132 @@
+# app/services/vad.py
+import os
+import numpy as np
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # linear16
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * BYTES_PER_SAMPLE
+
+# Absolute floor below which nothing counts as speech (dBFS)
+VAD_ENERGY_FLOOR_DB = float(os.getenv("VAD_ENERGY_FLOOR_DB", "-50"))
+# How far above the tracked noise floor a frame must be to count as speech
+VAD_NOISE_MARGIN_DB = float(os.getenv("VAD_NOISE_MARGIN_DB", "10"))
+# Frames crossing zero more often than this are treated as noise unless clearly loud
+VAD_MAX_ZCR = float(os.getenv("VAD_MAX_ZCR", "0.35"))
+# Keep forwarding after speech stops - must cover Deepgram's endpointing + utterance_end_ms
+VAD_HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "1300"))
+# Audio sent ahead of detected speech so word onsets are not clipped
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "200"))
+
+
+class VoiceActivityDetector:
+    """
+    Energy + zero-crossing-rate VAD with hangover for the 16 kHz linear16 client stream.
+    process() returns only the audio worth sending to Deepgram.
+    """
+
+    def __init__(self, hangover_ms: int = VAD_HANGOVER_MS, preroll_ms: int = VAD_PREROLL_MS):
+        self.hangover_frames = max(0, hangover_ms // FRAME_MS)
+        self.preroll_frames = max(0, preroll_ms // FRAME_MS)
+        self.noise_floor_db = VAD_ENERGY_FLOOR_DB - VAD_NOISE_MARGIN_DB
+        self.remainder = b""          # partial frame carried to the next chunk
+        self.hangover_left = 0        # frames still forwarded after the last speech frame
+        self.preroll = np.zeros((0, FRAME_SAMPLES), dtype=np.int16)  # recent frames that were not sent
+        self.in_speech = False
+
+        # Per-session counters
+        self.bytes_received = 0
+        self.bytes_forwarded = 0
+
+    def process(self, audio: bytes) -> bytes:
+        """Feed client audio; returns the frames to forward (b'' during silence)"""
+        self.bytes_received += len(audio)
+        data = self.remainder + audio
+        frame_count = len(data) // FRAME_BYTES
+        self.remainder = data[frame_count * FRAME_BYTES:]
+        if frame_count == 0:
+            return b""
+
+        frames = np.frombuffer(data[:frame_count * FRAME_BYTES], dtype=np.int16).reshape(frame_count, FRAME_SAMPLES)
+        speech = self._speech_frames(frames)
+
+        # Hangover: a frame is forwarded if any of the previous `hangover_frames` frames was speech
+        forward = self._dilate(speech, self.hangover_frames, backwards=False)
+        if self.hangover_left:
+            forward[:self.hangover_left] = True
+        # Pre-roll: also forward the frames just before speech starts
+        forward |= self._dilate(speech, self.preroll_frames, backwards=True)
+
+        speech_indices = np.flatnonzero(speech)
+        if speech_indices.size:
+            self.hangover_left = max(0, self.hangover_frames - (frame_count - 1 - int(speech_indices[-1])))
+        else:
+            self.hangover_left = max(0, self.hangover_left - frame_count)
+
+        output = frames[forward]
+        # Speech starting near the top of this chunk - prepend the part of the pre-roll that lies
+        # in the tail held back from the last chunk (the rest is already in this chunk)
+        if forward[0] and not self.in_speech and self.preroll.shape[0] and speech_indices.size:
+            needed = self.preroll_frames - int(speech_indices[0])
+            if needed > 0:
+                output = np.concatenate([self.preroll[-needed:], output])
+        self.in_speech = bool(forward[-1])
+
+        # Remember the newest unsent frames as pre-roll for the next speech onset
+        if self.preroll_frames and not self.in_speech:
+            held_back = frames[~forward]
+            if forward.any():
+                self.preroll = held_back[-self.preroll_frames:]
+            else:
+                self.preroll = np.concatenate([self.preroll, held_back])[-self.preroll_frames:]
+        else:
+            self.preroll = frames[:0]
+
+        forwarded = output.tobytes()
+        self.bytes_forwarded += len(forwarded)
+        return forwarded
+
+    def _speech_frames(self, frames: np.ndarray) -> np.ndarray:
+        samples = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(samples * samples, axis=1)) + 1e-9
+        energy_db = 20 * np.log10(rms)
+        signs = np.signbit(samples)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        threshold = max(VAD_ENERGY_FLOOR_DB, self.noise_floor_db + VAD_NOISE_MARGIN_DB)
+        speech = (energy_db > threshold) & ((zcr < VAD_MAX_ZCR) | (energy_db > threshold + 10))
+
+        # Track the noise floor from non-speech frames (slow rise, fast fall)
+        quiet = energy_db[~speech]
+        if quiet.size:
+            level = float(np.median(quiet))
+            weight = 0.05 if level > self.noise_floor_db else 0.5
+            self.noise_floor_db += weight * (level - self.noise_floor_db)
+        return speech
+
+    @staticmethod
+    def _dilate(mask: np.ndarray, width: int, backwards: bool) -> np.ndarray:
+        if width == 0 or not mask.any():
+            return mask.copy()
+        kernel = np.ones(width + 1, dtype=np.int32)
+        if backwards:
+            return np.convolve(mask[::-1].astype(np.int32), kernel)[:mask.size][::-1] > 0
+        return np.convolve(mask.astype(np.int32), kernel)[:mask.size] > 0
+
+    @property
+    def seconds_received(self) -> float:
+        return self.bytes_received / (SAMPLE_RATE * BYTES_PER_SAMPLE)
+
+    @property
+    def seconds_forwarded(self) -> float:
+        return self.bytes_forwarded / (SAMPLE_RATE * BYTES_PER_SAMPLE)
+
+    def stats(self) -> dict:
+        received = self.seconds_received
+        forwarded = self.seconds_forwarded
+        return {
+            "audio_seconds_received": round(received, 2),
+            "audio_seconds_forwarded": round(forwarded, 2),
+            "savings": round(1 - forwarded / received, 3) if received else 0.0
+        }
@@ -0,0 +1,91 @@
+# benchmark_datetime_resolver.py
+"""
+Measures what moving date/time handling out of the prompt saves, and what the
+deterministic resolver costs per transcript.
+
+Compares the system prompt with the previous date and time extraction sections
+(kept below) against the current one, and times resolve() over a mix of transcripts.
+
+    python benchmark_datetime_resolver.py
+"""
+import os
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.datetime_resolver import DateTimeResolver
+from app.services.history_manager import count_tokens, TIKTOKEN_AVAILABLE
+from app.services.prompt_builder import prompt_builder, STATIC_PROMPT, PROMPT_TEXT, FALLBACK_DOCTORS
+
+# Prompt sections the model used to convert dates and times itself
+LEGACY_ENTITY_LINES = """
+    - date: Convert to YYYY-MM-DD format (relative to today's date)
+    - time: Convert to HH:MM format
+    - new_date: Extract when rescheduling (e.g., "change to next Tuesday" → "YYYY-MM-DD")
+    - new_time: Extract when rescheduling (e.g., "move to 2 PM" → "14:00")
+"""
+LEGACY_DATE_RULES = """
+    **CRITICAL DATE EXTRACTION RULES (today's date is given under CURRENT CONTEXT):**
+    - "tomorrow" → the day after today
+    - "today" → today's date
+    - "next Monday" → Calculate the upcoming Monday from today
+    - "this Friday" → The Friday of this current week
+    - "next Friday" → The Friday of next week (7 days from the same day next week)
+    - "Friday next week" → Specifically Friday of next week
+    - ALWAYS use YYYY-MM-DD format
+    - For relative dates: Calculate from today's date
+    - If date is ambiguous, ask for clarification
+"""
+LEGACY_TIME_RULES = """
+    **TIME EXTRACTION:**
+    - Convert to 24-hour HH:MM format
+    - "2 PM" → "14:00"
+    - "10:30 AM" → "10:30"
+    - "noon" → "12:00"
+    - "evening" → Ask for specific time
+"""
+LEGACY_CONTEXT_LINE = "    - Tomorrow: YYYY-MM-DD\n"
+
+# The entity lines for dates and times, and the DATES AND TIMES section
+NEW_SECTIONS = "".join(line for line in PROMPT_TEXT["entities"].splitlines(keepends=True)
+                       if line.lstrip().startswith(("- date", "- new_date")))
+NEW_SECTIONS += PROMPT_TEXT["dates"]
+
+TRANSCRIPTS = [
+    "I'd like to book an appointment",
+    "tomorrow at 2 pm",
+    "next friday at ten thirty",
+    "my appointment id is one two three four five six",
+    "can I move it to Thursday the 22nd at half past three",
+    "doctor Sarah Chen please",
+    "ten thirty",
+    "October 25th in the morning",
+]
+ITERATIONS = 5000
+
+
+def main():
+    legacy = LEGACY_ENTITY_LINES + LEGACY_DATE_RULES + LEGACY_TIME_RULES + LEGACY_CONTEXT_LINE
+    new_prompt = STATIC_PROMPT + prompt_builder._render_context(datetime.now(), FALLBACK_DOCTORS)
+    removed, added = count_tokens(legacy), count_tokens(NEW_SECTIONS)
+    print(f"Token counts: {'tiktoken' if TIKTOKEN_AVAILABLE else 'local estimate'}")
+    print(f"Date/time prompt sections: {removed} -> {added} tokens")
+    print(f"System prompt: {count_tokens(new_prompt) + removed - added} -> {count_tokens(new_prompt)} tokens "
+          f"({removed - added} fewer per OpenAI call)")
+
+    resolver = DateTimeResolver()
+    today = date(2026, 10, 16)
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for text in TRANSCRIPTS:
+            resolver.resolve(text, today)
+    per_call_us = (time.perf_counter() - started) / (ITERATIONS * len(TRANSCRIPTS)) * 1e6
+    print(f"\nresolve(): {per_call_us:.1f} µs per transcript ({len(TRANSCRIPTS)} transcripts x {ITERATIONS})")
+    for text in TRANSCRIPTS:
+        print(f"  {text!r:<60} {resolver.resolve(text, today)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+# benchmark_endpointing.py
+"""
+Replay recorded Deepgram message streams through the endpoint detectors and report
+turn-commit latency (median / p95) and the false-commit rate.
+
+Record real sessions by starting the server with DEEPGRAM_RECORD_DIR=recordings, then:
+    python benchmark_endpointing.py recordings
+Without a directory a synthetic set of sessions is generated (--write DIR saves them).
+"""
+import os
+import sys
+import glob
+import json
+import random
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.endpointing import (
+    create_endpoint_detector, parse_result, EndpointDecision, ENDPOINT_DETECTORS
+)
+
+# A word gap this long (seconds) means the patient finished their turn
+TURN_GAP = 2.5
+LATENCY = 0.15  # synthetic network delay between audio and Deepgram message
+
+
+def load_recordings(directory):
+    sessions = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+        with open(path) as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+        sessions.append([(entry["t"], entry["message"]) for entry in messages])
+    return sessions
+
+
+# --- Synthetic sessions ---------------------------------------------------
+
+TURN_TEMPLATES = [
+    (["yes"],),
+    (["yeah that's right"],),
+    (["thank you"],),
+    (["one two three four five six"],),
+    (["one two three", "four five six"],),          # pause in the middle of an ID
+    (["I want to book an appointment with doctor Sarah Chen"],),
+    (["my name is", "John Smith"],),                # pause after "my name is"
+    (["I'd like to see", "doctor Emily Watson tomorrow at two pm"],),
+    (["can I reschedule my appointment to next Friday at ten"],),
+    (["what time is my appointment"],),
+    (["I need to cancel because", "I have to travel for work next week"],),
+]
+
+
+def _result_message(words, is_final, speech_final, segment_start, segment_end):
+    return {
+        "type": "Results",
+        "is_final": is_final,
+        "speech_final": speech_final,
+        "start": round(segment_start, 3),
+        "duration": round(segment_end - segment_start, 3),
+        "channel": {"alternatives": [{
+            "transcript": " ".join(word["word"] for word in words),
+            "words": words
+        }]}
+    }
+
+
+def synthesize_session(rng, turns=25):
+    """Deepgram-like message stream (interim results, speech_final, UtteranceEnd) for random turns"""
+    events = []
+    audio_time = 1.0
+
+    for _ in range(turns):
+        runs = rng.choice(TURN_TEMPLATES)[0]
+        for run_index, run in enumerate(runs):
+            words = []
+            for token in run.split():
+                start = audio_time
+                audio_time += rng.uniform(0.22, 0.42)
+                words.append({"word": token.lower(), "start": round(start, 3), "end": round(audio_time, 3)})
+                audio_time += rng.uniform(0.02, 0.08)
+
+            last_turn_run = run_index == len(runs) - 1
+            gap = rng.uniform(4.0, 8.0) if last_turn_run else rng.uniform(0.5, 1.6)
+
+            events.append((words[0]["start"] + LATENCY, {"type": "SpeechStarted", "timestamp": words[0]["start"]}))
+
+            # Interim results roughly every half second of audio
+            segment_start = words[0]["start"]
+            for index, word in enumerate(words[:-1]):
+                if index % 2 == 1:
+                    events.append((word["end"] + LATENCY, _result_message(words[:index + 1], False, False, segment_start, word["end"])))
+
+            last_end = words[-1]["end"]
+            # endpointing=300 - speech_final once 300 ms of silence follow the last word
+            events.append((last_end + 0.3 + LATENCY, _result_message(words, True, True, segment_start, last_end + 0.3)))
+            if gap >= 1.0:
+                events.append((last_end + 1.0 + LATENCY, {"type": "UtteranceEnd", "channel": [0, 1], "last_word_end": last_end}))
+
+            audio_time = last_end + gap
+
+    events.sort(key=lambda event: event[0])
+    return [(round(t, 3), message) for t, message in events]
+
+
+# --- Replay -----------------------------------------------------------------
+
+def replay(messages, detector):
+    """Feed a session to a detector on a virtual clock; returns [(commit_time, last_committed_word_end)]"""
+    commits = []
+    pending_at = None
+    last_final_end = None
+    uncommitted = False
+
+    def fire():
+        nonlocal uncommitted
+        if uncommitted:
+            commits.append((pending_at, last_final_end))
+        uncommitted = False
+        detector.reset()
+
+    for t, data in messages:
+        if pending_at is not None and pending_at <= t:
+            fire()
+            pending_at = None
+
+        result = parse_result(data)
+        if result and result["is_final"] and result["transcript"]:
+            uncommitted = True
+            if result["words"]:
+                last_final_end = result["words"][-1]["end"]
+
+        decision = detector.observe(data, t)
+        if decision.action != EndpointDecision.WAIT:
+            pending_at = None
+        if decision.action == EndpointDecision.COMMIT:
+            pending_at = t + decision.delay
+
+    if pending_at is not None:
+        fire()
+    return commits
+
+
+def session_turns(messages):
+    """Turn end times (audio seconds) inferred from word timings, and the audio->message delay"""
+    word_ends = {}
+    offsets = []
+    for t, data in messages:
+        result = parse_result(data)
+        if not result or not result["is_final"]:
+            continue
+        offsets.append(t - (result["start"] + result["duration"]))
+        for word in result["words"]:
+            word_ends[word["start"]] = word["end"]
+
+    words = sorted(word_ends.items())
+    turn_ends = []
+    for index, (start, end) in enumerate(words):
+        next_start = words[index + 1][0] if index + 1 < len(words) else None
+        if next_start is None or next_start - end >= TURN_GAP:
+            turn_ends.append(end)
+    offset = statistics.median(offsets) if offsets else 0.0
+    return turn_ends, offset
+
+
+def evaluate(sessions, detector_name):
+    latencies = []
+    commits_total = 0
+    false_commits = 0
+    turns_total = 0
+
+    for messages in sessions:
+        turn_ends, offset = session_turns(messages)
+        turns_total += len(turn_ends)
+        for commit_time, committed_end in replay(messages, create_endpoint_detector(detector_name)):
+            commits_total += 1
+            turn_end = next((end for end in turn_ends if end >= committed_end - 1e-6), None)
+            if turn_end is None or turn_end > committed_end + 1e-6:
+                false_commits += 1  # committed while the patient was still mid-turn
+                continue
+            latencies.append((commit_time - (turn_end + offset)) * 1000)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))] if latencies else 0.0
+    return {
+        "turns": turns_total,
+        "commits": commits_total,
+        "median_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": p95,
+        "false_commit_rate": false_commits / commits_total if commits_total else 0.0
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    write_dir = None
+    if "--write" in args:
+        write_dir = args[args.index("--write") + 1]
+        args = [a for a in args if a not in ("--write", write_dir)]
+
+    if args:
+        sessions = load_recordings(args[0])
+        print(f"📂 Loaded {len(sessions)} recorded sessions from {args[0]}")
+    else:
+        rng = random.Random(7)
+        sessions = [synthesize_session(rng) for _ in range(40)]
+        print(f"🧪 Generated {len(sessions)} synthetic sessions")
+
+    if write_dir:
+        os.makedirs(write_dir, exist_ok=True)
+        for index, messages in enumerate(sessions):
+            with open(os.path.join(write_dir, f"synthetic_{index:03d}.jsonl"), "w") as f:
+                for t, message in messages:
+                    f.write(json.dumps({"t": t, "message": message}) + "\n")
+        print(f"💾 Wrote sessions to {write_dir}")
+
+    print(f"\n{'detector':<10} {'turns':>6} {'commits':>8} {'median ms':>10} {'p95 ms':>8} {'false commits':>14}")
+    for name in ENDPOINT_DETECTORS:
+        result = evaluate(sessions, name)
+        print(f"{name:<10} {result['turns']:>6} {result['commits']:>8} {result['median_ms']:>10.0f} "
+              f"{result['p95_ms']:>8.0f} {result['false_commit_rate']:>13.1%}")
+
+
+if __name__ == "__main__":
+    main()
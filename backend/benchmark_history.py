@@ -0,0 +1,134 @@
+# benchmark_history.py
+"""
+Replays scripted conversations through the history policy and reports the prompt
+tokens sent per OpenAI call (system prompt + conversation so far).
+
+Compares the previous policy (pretty-printed replies, last 10 messages kept) with the
+token-budget HistoryCompactor (compact replies, older turns folded into a summary),
+and checks whether the details given at the start of the call are still in context.
+
+    python benchmark_history.py
+"""
+import os
+import sys
+import json
+import statistics
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.history_manager import (
+    HistoryCompactor, compact_reply, count_tokens, message_tokens, TIKTOKEN_AVAILABLE
+)
+from app.services.prompt_builder import prompt_builder, STATIC_PROMPT, FALLBACK_DOCTORS
+
+ENTITY_KEYS = ["doctor_name", "doctor_specialization", "date", "time", "reason", "patient_name", "appointment_id"]
+
+
+def reply(intent, response, **entities):
+    """An assistant result in the format the model returns (all entity keys present)"""
+    return {
+        "intent": intent,
+        "entities": {key: entities.get(key) for key in ENTITY_KEYS},
+        "confidence": 0.9,
+        "processed_response": response
+    }
+
+
+BOOKING = [
+    ("hello", reply("greeting", "Hello! How can I help you with your appointment today?")),
+    ("I'd like to book an appointment", reply("book_appointment", "Sure, may I have your full name?")),
+    ("my name is John Smith", reply("book_appointment", "Thanks John. Which doctor would you like to see?",
+                                    patient_name="John Smith")),
+    ("doctor Sarah Chen", reply("book_appointment", "Dr. Sarah Chen, great. What date works for you?",
+                                patient_name="John Smith", doctor_name="Sarah Chen")),
+    ("what days is she in", reply("query_availability", "Dr. Chen is available Monday to Friday.",
+                                  doctor_name="Sarah Chen")),
+    ("next Tuesday", reply("book_appointment", "Next Tuesday. What time would you prefer?",
+                           patient_name="John Smith", doctor_name="Sarah Chen", date="2026-10-20")),
+    ("sometime in the morning", reply("book_appointment", "Could you give me a specific time in the morning?",
+                                      patient_name="John Smith", doctor_name="Sarah Chen", date="2026-10-20")),
+    ("ten thirty", reply("book_appointment", "And what is the reason for your visit?",
+                         patient_name="John Smith", doctor_name="Sarah Chen", date="2026-10-20", time="10:30")),
+    ("chest pain when I exercise", reply("book_appointment",
+                                         "I'll book Dr. Sarah Chen on 2026-10-20 at 10:30 for chest pain.",
+                                         patient_name="John Smith", doctor_name="Sarah Chen", date="2026-10-20",
+                                         time="10:30", reason="chest pain when exercising")),
+    ("actually can we make it eleven", reply("book_appointment", "Sure, I'll book 11:00 instead.",
+                                             patient_name="John Smith", doctor_name="Sarah Chen",
+                                             date="2026-10-20", time="11:00", reason="chest pain when exercising")),
+    ("thanks", reply("thanks", "You're welcome! Is there anything else I can help you with?")),
+]
+
+FOLLOW_UPS = [
+    ("when is my appointment", reply("query_appointment", "Could you please provide your appointment ID?")),
+    ("four five six seven eight nine", reply("query_appointment", "Let me look that up.",
+                                             appointment_id="456789")),
+    ("can I move it to Thursday", reply("reschedule_appointment", "What time on Thursday?",
+                                        appointment_id="456789", date="2026-10-22")),
+    ("same time", reply("reschedule_appointment", "I'll move it to Thursday at 11:00.",
+                        appointment_id="456789", date="2026-10-22", time="11:00")),
+    ("and cancel my other appointment", reply("cancel_appointment", "Which appointment ID should I cancel?")),
+    ("one two three four five six", reply("cancel_appointment", "I'll cancel appointment 123456.",
+                                          appointment_id="123456")),
+    ("which doctors do pediatrics", reply("query_availability", "Dr. Michael Rodriguez is our pediatrician.",
+                                          doctor_specialization="Pediatrics")),
+    ("ok thanks that's all", reply("thanks", "You're welcome. Goodbye and take care!")),
+]
+
+# Short call, typical call, and a long call that keeps going after booking
+CONVERSATIONS = [
+    BOOKING[:4] + BOOKING[-1:],
+    BOOKING,
+    BOOKING + FOLLOW_UPS + FOLLOW_UPS,
+]
+
+
+def old_policy(history, result):
+    history.append({"role": "assistant", "content": json.dumps(result)})
+    if len(history) > 12:
+        history[:] = [history[0]] + history[-10:]
+
+
+def new_policy(compactor):
+    def apply(history, result):
+        history.append({"role": "assistant", "content": compact_reply(result)})
+        compactor.compact(history)
+    return apply
+
+
+def replay(conversation, system_prompt, policy):
+    """Prompt tokens for each call, and whether the patient's name was in the last prompt"""
+    history = [{"role": "system", "content": system_prompt}]
+    per_call = []
+    for user_text, result in conversation:
+        history.append({"role": "user", "content": f"Patient message: {user_text}"})
+        per_call.append(sum(message_tokens(message) for message in history))
+        last_prompt = "".join(message["content"] for message in history[1:])
+        policy(history, result)
+    return per_call, "John Smith" in last_prompt
+
+
+def main():
+    system_prompt = STATIC_PROMPT + prompt_builder._render_context(datetime.now(), FALLBACK_DOCTORS)
+    print(f"Token counts: {'tiktoken' if TIKTOKEN_AVAILABLE else 'local estimate'}; "
+          f"system prompt {count_tokens(system_prompt)} tokens")
+    system_tokens = message_tokens({"content": system_prompt})
+    print(f"{'turns':<14}{'calls':>6}  {'policy':<12}{'mean':>7}{'max':>7}{'last':>7}{'history':>9}  name kept")
+
+    totals = {"before": [], "after": []}
+    for conversation in CONVERSATIONS:
+        for label, policy in (("before", old_policy), ("after", new_policy(HistoryCompactor()))):
+            per_call, name_kept = replay(conversation, system_prompt, policy)
+            totals[label].extend(per_call)
+            print(f"{len(conversation):<14}{len(per_call):>6}  {label:<12}{statistics.mean(per_call):>7.0f}"
+                  f"{max(per_call):>7}{per_call[-1]:>7}{statistics.mean(per_call) - system_tokens:>9.0f}"
+                  f"  {'yes' if name_kept else 'no'}")
+
+    before, after = statistics.mean(totals["before"]), statistics.mean(totals["after"])
+    print(f"\nAverage prompt tokens per call: {before:.0f} -> {after:.0f} ({1 - after / before:.0%} fewer), "
+          f"conversation part {before - system_tokens:.0f} -> {after - system_tokens:.0f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+# benchmark_model_routing.py
+"""
+Replays scripted conversations through OpenAIService.analyze_intent with and without
+two-tier model routing, on the offline scripted backend (no network). The fast model is
+simulated FAST_SPEEDUP times faster than the strong one.
+
+Reports per-tier calls, latency and prompt tokens, the escalation rate, and the average
+turn latency and prompt tokens per LLM turn for each configuration.
+
+    python benchmark_model_routing.py
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+os.environ["LLM_BACKEND"] = "scripted"
+
+from app.services.llm_backend import ScriptedBackend
+from app.services.metrics import metrics
+from app.services.model_router import ModelRouter, LLM_FAST_MODEL, FAST, STRONG
+from app.services.openai_service import OpenAIService
+
+FAST_SPEEDUP = 2.5
+
+CONVERSATIONS = [
+    ["I'd like to book an appointment", "my name is John Smith", "doctor Sarah Chen",
+     "next Tuesday", "at half past ten", "thanks"],
+    ["I need to reschedule my appointment", "it's 456789", "Thursday", "at 3 pm"],
+    ["I want to cancel an appointment", "one two three four five six"],
+    ["when is my appointment", "I'd rather book a new one actually", "my name is Mary Jones",
+     "doctor Emily Watson", "tomorrow", "11 am"],
+]
+
+
+def tier_counters():
+    return {
+        tier: {
+            "calls": metrics.counters.get(f"llm.tier.{tier}.calls", 0),
+            "prompt_tokens": metrics.counters.get(f"llm.tier.{tier}.prompt_tokens", 0),
+        }
+        for tier in (FAST, STRONG)
+    }
+
+
+async def replay(service, label):
+    before = tier_counters()
+    escalations_before = metrics.counters.get("llm.escalations", 0)
+    for name in (f"llm.tier.{FAST}.latency_ms", f"llm.tier.{STRONG}.latency_ms"):
+        metrics.samples.pop(name, None)
+
+    latencies = []
+    for index, conversation in enumerate(CONVERSATIONS):
+        session_id = f"{label}-{index}"
+        for text in conversation:
+            started = time.perf_counter()
+            await service.analyze_intent(text, session_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+        service.clear_conversation_history(session_id)
+
+    after = tier_counters()
+    calls = {tier: after[tier]["calls"] - before[tier]["calls"] for tier in after}
+    tokens = {tier: after[tier]["prompt_tokens"] - before[tier]["prompt_tokens"] for tier in after}
+    escalations = metrics.counters.get("llm.escalations", 0) - escalations_before
+    llm_turns = sum(calls.values()) - escalations
+    report = [f"\n{label}: {len(latencies)} turns, {llm_turns} answered by an LLM"]
+    for tier in (FAST, STRONG):
+        if calls[tier]:
+            summary = metrics.summary(f"llm.tier.{tier}.latency_ms")
+            report.append(f"  {tier:<7}{calls[tier]:>4} calls  mean {summary['mean']:>6.0f} ms  "
+                          f"p95 {summary['p95']:>6.0f} ms  {tokens[tier] / calls[tier]:>6.0f} prompt tokens/call")
+    if calls[FAST]:
+        report.append(f"  escalated {escalations}/{calls[FAST]} fast-tier answers ({escalations / calls[FAST]:.0%})")
+    report.append(f"  turn latency mean {statistics.mean(latencies):.0f} ms, "
+                  f"prompt tokens per LLM turn {sum(tokens.values()) / llm_turns:.0f}")
+    return statistics.mean(latencies), sum(tokens.values()) / llm_turns, report
+
+
+async def main():
+    logging.disable(logging.INFO)
+    backend = ScriptedBackend(latency_ms=400, tokens_per_second=80, model_speed={LLM_FAST_MODEL: FAST_SPEEDUP})
+    print(f"Scripted backend: strong 400 ms + 80 tokens/s, fast model {LLM_FAST_MODEL} x{FAST_SPEEDUP}")
+
+    results = {}
+    stdout = sys.stdout
+    for label, router in (("single model", ModelRouter(enabled=False)), ("two-tier", ModelRouter(enabled=True))):
+        service = OpenAIService(backend=backend)
+        service.streaming = False
+        service.router = router
+        sys.stdout = open(os.devnull, "w")  # analyze_intent logs every step
+        try:
+            latency, tokens, report = await replay(service, label)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print("\n".join(report))
+        results[label] = latency, tokens
+
+    (before_ms, before_tokens), (after_ms, after_tokens) = results["single model"], results["two-tier"]
+    print(f"\nTwo-tier routing: turn latency {before_ms:.0f} -> {after_ms:.0f} ms, "
+          f"prompt tokens per LLM turn {before_tokens:.0f} -> {after_tokens:.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
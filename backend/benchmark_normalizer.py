@@ -0,0 +1,170 @@
+# benchmark_normalizer.py
+"""
+Microbenchmark for transcript normalization: per-message cost over a stream of
+Deepgram-style interim results (each extends the previous one) and finals.
+
+Compares the previous two-pass implementation (kept below as the baseline),
+the single-pass TranscriptNormalizer from scratch, and the incremental per-session
+TranscriptNormalizer that only processes the new suffix.
+
+    python benchmark_normalizer.py
+"""
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.text_normalizer import TranscriptNormalizer
+
+UTTERANCES = [
+    "hi i would like to book an appointment with doctor sarah chen tomorrow at two thirty",
+    "my name is john o'brien and my appointment id is one two three four five six",
+    "can i reschedule my appointment to next friday at ten fifteen please",
+    "i need to cancel my appointment with dr smith because i have to travel for work",
+    "what time is my appointment with doctor emily watson on the twenty fifth",
+]
+ROUNDS = 200
+
+
+# --- Baseline: the previous implementation ----------------------------------
+
+def convert_spoken_numbers_to_digits(text):
+    """Convert spoken numbers like 'one two three' to digits '123'"""
+    number_words = {
+        'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
+        'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9',
+        'ten': '10', 'eleven': '11', 'twelve': '12', 'thirteen': '13', 
+        'fourteen': '14', 'fifteen': '15', 'sixteen': '16', 'seventeen': '17',
+        'eighteen': '18', 'nineteen': '19', 'twenty': '20', 'thirty': '30',
+        'forty': '40', 'fifty': '50', 'sixty': '60', 'seventy': '70',
+        'eighty': '80', 'ninety': '90'
+    }
+    
+    # Split text into words
+    words = text.split()
+    result = []
+    i = 0
+    
+    while i < len(words):
+        word = words[i].lower()
+        
+        # Check if current word is a number word
+        if word in number_words:
+            # Check if next words are also number words (for multi-digit numbers)
+            number_sequence = [number_words[word]]
+            j = i + 1
+            
+            while j < len(words) and words[j].lower() in number_words:
+                number_sequence.append(number_words[words[j].lower()])
+                j += 1
+            
+            # If we have a sequence of single digits, combine them
+            if all(len(num) == 1 for num in number_sequence):
+                result.append(''.join(number_sequence))
+            else:
+                # For larger numbers, keep them separate
+                result.extend(number_sequence)
+            
+            i = j  # Skip the processed words
+        else:
+            result.append(words[i])
+            i += 1
+    
+    return ' '.join(result)
+
+
+def proper_capitalization(text):
+    """Convert text to proper capitalization with name and proper noun support"""
+    if not text:
+        return text
+    
+    # First, capitalize the first letter of the entire text
+    text = text[0].upper() + text[1:]
+    
+    # Capitalize names and proper nouns (words after specific patterns)
+    words = text.split()
+    
+    # Patterns that typically precede names/proper nouns
+    name_indicators = ['my name is', 'i am', 'call me', 'this is', 'it is', 'name is', 
+                      'doctor', 'dr.', 'mr.', 'mrs.', 'ms.', 'miss', 'professor', 'prof.']
+    
+    for i in range(len(words) - 1):
+        current_phrase = ' '.join(words[i:i+2]).lower()
+        current_word = words[i].lower()
+        
+        # If we detect a name indicator, capitalize the next word
+        if current_phrase in name_indicators or current_word in name_indicators:
+            if i + 2 < len(words):
+                words[i + 2] = words[i + 2].capitalize()
+            elif i + 1 < len(words):
+                words[i + 1] = words[i + 1].capitalize()
+        
+        # Capitalize words after apostrophes (like O'Brian)
+        if "'" in words[i] and i + 1 < len(words):
+            words[i + 1] = words[i + 1].capitalize()
+    
+    # Capitalize after periods, question marks, and exclamation points
+    for punctuation in ['.', '?', '!']:
+        parts = ' '.join(words).split(punctuation + ' ')
+        text = (punctuation + ' ').join([part.capitalize() for part in parts])
+        words = text.split()  # Update words after punctuation processing
+    
+    # Capitalize 'I' and common proper nouns
+    text = ' '.join(words)
+    text = text.replace(' i ', ' I ')
+    text = text.replace(" i'", " I'")
+    
+    # Capitalize common titles and names
+    text = text.replace('dr. ', 'Dr. ')
+    text = text.replace('mr. ', 'Mr. ')
+    text = text.replace('mrs. ', 'Mrs. ')
+    text = text.replace('ms. ', 'Ms. ')
+    
+    return text
+
+
+def legacy_normalize(text):
+    return proper_capitalization(convert_spoken_numbers_to_digits(text))
+
+
+# --- Benchmark ----------------------------------------------------------------
+
+def interim_stream():
+    """Every prefix of every utterance, word by word, like Deepgram interim results"""
+    messages = []
+    for utterance in UTTERANCES:
+        words = utterance.split()
+        messages.extend(" ".join(words[:count]) for count in range(1, len(words) + 1))
+    return messages
+
+
+def run(name, normalize_factory, messages):
+    timings = []
+    for _ in range(ROUNDS):
+        normalize = normalize_factory()
+        for message in messages:
+            started = time.perf_counter()
+            normalize(message)
+            timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    print(f"{name:<28} {statistics.mean(timings):>9.2f} {timings[len(timings) // 2]:>9.2f} "
+          f"{timings[int(0.99 * (len(timings) - 1))]:>9.2f}")
+
+
+def main():
+    messages = interim_stream()
+    print(f"🧪 {len(messages)} interim messages x {ROUNDS} rounds\n")
+    print(f"{'normalizer':<28} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    run("legacy two-pass", lambda: legacy_normalize, messages)
+    run("single-pass (no memo)", lambda: lambda text: TranscriptNormalizer().normalize(text), messages)
+    run("single-pass incremental", lambda: TranscriptNormalizer().normalize, messages)
+
+    print("\nSample output:")
+    for utterance in UTTERANCES:
+        print(f"  {TranscriptNormalizer().normalize(utterance)}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,164 @@
+# benchmark_pipeline_load.py
+"""
+Drives process_complete_sentence end to end for many concurrent sessions with no
+network and no API keys: the scripted LLM backend (LLM_BACKEND=scripted) stands in for
+OpenAI, local stubs stand in for the ElevenLabs client and mongodb_service.
+
+Reports per-turn latency (first draft text, final intent message, first audio byte,
+whole turn) and throughput, and checks that every session got the same replies and that
+the booking turn was confirmed.
+Simulated LLM latency and speed come from SCRIPTED_LATENCY_MS / SCRIPTED_TOKENS_PER_SECOND.
+
+    python benchmark_pipeline_load.py [sessions]
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+os.environ["LLM_BACKEND"] = "scripted"
+os.environ.pop("OPENAI_API_KEY", None)
+os.environ["TTS_CACHE_ENABLED"] = "false"
+# The stub sleeps instead of using the network - don't let 4 workers be the bottleneck
+os.environ.setdefault("TTS_EXECUTOR_WORKERS", "64")
+
+from app.services import audio_processing, prompt_builder as prompt_builder_module
+from app.services.audio_processing import process_complete_sentence
+from app.services.elevenlabs_service import elevenlabs_service
+from app.services.openai_service import openai_service
+from app.services.prompt_builder import prompt_builder, FALLBACK_DOCTORS
+from app.services.turn_controller import TurnController
+
+CONVERSATION = [
+    "hello",
+    "I'd like to book an appointment",
+    "my name is John Smith",
+    "doctor Sarah Chen",
+    "next Tuesday",
+    "at half past ten",
+    "thanks",
+]
+# The turn that completes the booking, and what its reply has to contain
+BOOKING_TURN = CONVERSATION.index("at half past ten")
+APPOINTMENT_ID = "654321"
+TTS_FIRST_CHUNK_S = 0.08
+
+
+class StubTextToSpeech:
+    """Synchronous like the real client: first chunk after TTS_FIRST_CHUNK_S"""
+
+    def _chunks(self, **kwargs):
+        time.sleep(TTS_FIRST_CHUNK_S)
+        yield b"\xff" * 512
+
+    def convert(self, **kwargs):
+        return self._chunks(**kwargs)
+
+    def convert_as_stream(self, **kwargs):
+        return self._chunks(**kwargs)
+
+
+class StubClient:
+    text_to_speech = StubTextToSpeech()
+
+
+class StubMongo:
+    """The mongodb_service calls the booking path makes - no database round trip"""
+
+    async def get_available_doctors(self):
+        return list(FALLBACK_DOCTORS)
+
+    async def insert_appointment(self, appointment_data):
+        return APPOINTMENT_ID
+
+
+class ClientState:
+    name = "CONNECTED"
+
+
+class RecordingWebSocket:
+    """Client side of one session: records when each kind of message arrives"""
+
+    def __init__(self):
+        self.client_state = ClientState()
+        self.events = []
+
+    async def send_json(self, data):
+        self.events.append((time.perf_counter(), data.get("type"), data))
+
+    async def send_bytes(self, data):
+        self.events.append((time.perf_counter(), "audio", None))
+
+    def first(self, kind, since):
+        return next(((at - since) * 1000 for at, event_kind, _ in self.events
+                     if event_kind == kind and at >= since), None)
+
+
+async def run_session(index, samples, replies):
+    websocket = RecordingWebSocket()
+    controller = TurnController(websocket)
+    for text in CONVERSATION:
+        started = time.perf_counter()
+        await process_complete_sentence(websocket, text, controller)
+        samples["turn"].append((time.perf_counter() - started) * 1000)
+        for kind in ("response_delta", "intent", "audio"):
+            value = websocket.first(kind, started)
+            if value is not None:
+                samples[kind].append(value)
+    replies[index] = [data["processed_response"] for _, kind, data in websocket.events if kind == "intent"]
+    openai_service.clear_conversation_history(controller.session_id)
+
+
+def describe(values):
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+    return f"{len(values):>6}  {pick(50):>8.0f}{pick(95):>8.0f}{pick(99):>8.0f}{values[-1]:>8.0f}"
+
+
+async def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logging.disable(logging.INFO)
+    elevenlabs_service.client = StubClient()
+    elevenlabs_service.streaming = True
+    audio_processing.ELEVENLABS_AVAILABLE = True  # no key, so the service starts disabled
+    mongo = StubMongo()
+    audio_processing.mongodb_service = prompt_builder_module.mongodb_service = mongo
+    audio_processing.MONGODB_AVAILABLE = prompt_builder_module.MONGODB_AVAILABLE = True
+    prompt_builder.invalidate("stub roster")
+    backend = openai_service.backend
+    print(f"LLM backend: {backend.name} ({backend.latency_ms:.0f} ms to first token, "
+          f"{backend.tokens_per_second:.0f} tokens/s); {sessions} sessions x {len(CONVERSATION)} turns")
+
+    samples = {"response_delta": [], "intent": [], "audio": [], "turn": []}
+    replies = {}
+    started = time.perf_counter()
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")  # the pipeline logs every step
+    try:
+        await asyncio.gather(*(run_session(i, samples, replies) for i in range(sessions)))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'ms after commit':<18}{'count':>6}  {'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}")
+    for kind, label in (("response_delta", "first draft text"), ("intent", "intent message"),
+                        ("audio", "first audio"), ("turn", "whole turn")):
+        print(f"{label:<18}{describe(samples[kind])}")
+    turns = sessions * len(CONVERSATION)
+    print(f"\n{turns} turns in {elapsed:.1f}s ({turns / elapsed:.0f} turns/s)")
+
+    distinct = {tuple(reply) for reply in replies.values()}
+    print(f"Replies identical across sessions: {'yes' if len(distinct) == 1 else 'no'}")
+    for text, reply in zip(CONVERSATION, replies[0]):
+        print(f"  {text!r:<36} -> {reply}")
+    booked = [reply[BOOKING_TURN] if len(reply) > BOOKING_TURN else "" for reply in replies.values()]
+    confirmed = all(reply.startswith("Thank you") and APPOINTMENT_ID in reply for reply in booked)
+    print(f"Booking confirmed in every session: {'yes' if confirmed else 'no'}")
+    return 0 if len(distinct) == 1 and confirmed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
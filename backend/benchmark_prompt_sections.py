@@ -0,0 +1,147 @@
+# benchmark_prompt_sections.py
+"""
+Replays scripted conversations through OpenAIService.analyze_intent on the offline scripted
+backend (no network) with the whole system prompt on every turn and with state-aware
+prompt sections (PROMPT_SECTIONING), and reports the system prompt and total prompt tokens
+per LLM call. Model routing is off so every LLM turn uses the full-context call.
+
+Also checks what provider prefix caching needs: the stored system prompt is byte-identical
+for every session, a given selection of sections gives a byte-identical turn prompt, and
+each call starts with the messages of the previous call of its session (cacheable prefix).
+
+    python benchmark_prompt_sections.py
+"""
+import os
+import sys
+import asyncio
+import hashlib
+import logging
+import statistics
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+os.environ["LLM_BACKEND"] = "scripted"
+
+from app.services.history_manager import count_tokens
+from app.services.llm_backend import ScriptedBackend
+from app.services.metrics import metrics
+from app.services.model_router import ModelRouter, STRONG
+from app.services.openai_service import OpenAIService
+from app.services.prompt_builder import prompt_builder, FALLBACK_DOCTORS, ALL_SECTIONS, STABLE_PROMPT
+
+CONVERSATIONS = [
+    ["I'd like to book an appointment", "my name is John Smith", "doctor Sarah Chen",
+     "next Tuesday", "at half past ten", "thanks"],
+    ["I need to reschedule my appointment", "it's 456789", "Thursday", "at 3 pm"],
+    ["I want to cancel an appointment", "one two three four five six", "yes please"],
+    ["when is my appointment", "my ID is 778812", "thank you"],
+    ["can I see a doctor tomorrow", "Emily Watson", "my name is Mary Jones", "11 am"],
+    ["I'd like to move my booking", "the ID is 123456", "next Friday", "the afternoon", "4 pm"],
+]
+
+
+class RecordingBackend(ScriptedBackend):
+    """Scripted replies; keeps the messages of every request"""
+
+    def __init__(self):
+        super().__init__(latency_ms=0, jitter_ms=0, tokens_per_second=0)
+        self.requests = []
+
+    def _reply(self, messages):
+        self.requests.append([dict(message) for message in messages])
+        return super()._reply(messages)
+
+
+async def fallback_doctors():
+    # MongoDB is not connected here - use the roster the prompt falls back to
+    return list(FALLBACK_DOCTORS)
+
+
+def shared_prefix_tokens(previous, messages):
+    """Tokens in the leading messages identical to the previous request of the session"""
+    shared = 0
+    for before, now in zip(previous or [], messages):
+        if before != now:
+            break
+        shared += count_tokens(now["content"])
+    return shared
+
+
+async def replay(service, label):
+    calls_before = metrics.counters.get(f"llm.tier.{STRONG}.calls", 0)
+    tokens_before = metrics.counters.get(f"llm.tier.{STRONG}.prompt_tokens", 0)
+    system_tokens = []
+    prefix_share = []
+    stable = set()              # hashes of the stored system prompt
+    variants = defaultdict(set)  # sections -> hashes of the turn prompts sent with them
+    omitted = defaultdict(int)
+
+    for index, conversation in enumerate(CONVERSATIONS):
+        session_id = f"{label}-{index}"
+        previous = None
+        for text in conversation:
+            requests = len(service.backend.requests)
+            await service.analyze_intent(text, session_id)
+            if len(service.backend.requests) == requests:
+                continue  # answered locally
+            messages = service.backend.requests[-1]
+            stable.add(hashlib.sha256(messages[0]["content"].encode()).hexdigest())
+            turn_prompt = messages[-2]["content"]
+            sections = next(key for key, value in prompt_builder.prompts.items() if value == turn_prompt)
+            variants[sections].add(hashlib.sha256(turn_prompt.encode()).hexdigest())
+            system_tokens.append(count_tokens(messages[0]["content"]) + count_tokens(turn_prompt))
+            if previous:
+                prefix_share.append(shared_prefix_tokens(previous, messages)
+                                    / sum(count_tokens(message["content"]) for message in messages))
+            previous = messages
+            for tag in ALL_SECTIONS:
+                if tag not in sections:
+                    omitted[tag] += 1
+        service.clear_conversation_history(session_id)
+
+    calls = metrics.counters.get(f"llm.tier.{STRONG}.calls", 0) - calls_before
+    prompt_tokens = metrics.counters.get(f"llm.tier.{STRONG}.prompt_tokens", 0) - tokens_before
+    report = [f"\n{label}: {calls} LLM turns, {len(variants)} prompt variant(s)",
+              f"  system prompt tokens per call: mean {statistics.mean(system_tokens):.0f}, "
+              f"min {min(system_tokens)}, max {max(system_tokens)}",
+              f"  prompt tokens per call (system + conversation): {prompt_tokens / calls:.0f}",
+              f"  shared with the session's previous call (cacheable prefix): mean {statistics.mean(prefix_share):.0%}"]
+    if omitted:
+        report.append("  sections left out: " + ", ".join(f"{tag} x{count}" for tag, count in sorted(omitted.items())))
+    identical = stable == {hashlib.sha256(STABLE_PROMPT.encode()).hexdigest()} \
+        and all(len(hashes) == 1 for hashes in variants.values())
+    report.append(f"  stable system prompt, same sections -> byte-identical turn prompt: {'yes' if identical else 'NO'}")
+    return statistics.mean(system_tokens), prompt_tokens / calls, identical, report
+
+
+async def main():
+    logging.disable(logging.INFO)
+    prompt_builder._fetch_doctors = fallback_doctors
+
+    results = {}
+    stdout = sys.stdout
+    for label, sectioning in (("whole prompt", False), ("sectioned", True)):
+        service = OpenAIService(backend=RecordingBackend())
+        service.streaming = False
+        service.router = ModelRouter(enabled=False)
+        prompt_builder.sectioning = sectioning
+        sys.stdout = open(os.devnull, "w")  # analyze_intent logs every step
+        try:
+            prompt_builder.invalidate("benchmark")
+            system, total, identical, report = await replay(service, label)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print("\n".join(report))
+        results[label] = system, total, identical
+
+    (system_before, total_before, _), (system_after, total_after, identical) = \
+        results["whole prompt"], results["sectioned"]
+    print(f"\nPer LLM turn: system prompt {system_before:.0f} -> {system_after:.0f} tokens, "
+          f"whole prompt {total_before:.0f} -> {total_after:.0f} tokens "
+          f"({1 - total_after / total_before:.0%} fewer)")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
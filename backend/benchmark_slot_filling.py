@@ -0,0 +1,138 @@
+# benchmark_slot_filling.py
+"""
+Replays scripted conversations through process_complete_sentence with and without local
+slot filling (ConversationService.answer_locally), on the offline scripted LLM backend with no
+network: speech and the database step are switched off, the fast model tier is simulated
+FAST_SPEEDUP times faster than the strong one.
+
+Reports where turns were answered (slot filling, local intent rules, fast or strong model),
+the share resolved without an LLM call, and the latency to the intent message - overall and
+for the turns slot filling answered.
+
+    python benchmark_slot_filling.py
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+os.environ["LLM_BACKEND"] = "scripted"
+os.environ.pop("OPENAI_API_KEY", None)
+
+from app.services import audio_processing
+from app.services.audio_processing import process_complete_sentence
+from app.services.conversation_service import conversation_service
+from app.services.llm_backend import ScriptedBackend
+from app.services.metrics import metrics
+from app.services.model_router import LLM_FAST_MODEL, FAST, STRONG
+from app.services.openai_service import openai_service
+from app.services.turn_controller import TurnController
+
+FAST_SPEEDUP = 2.5
+
+CONVERSATIONS = [
+    ["I'd like to book an appointment", "my name is john smith", "doctor Sarah Chen",
+     "next Tuesday", "at half past ten", "thanks"],
+    ["I need to reschedule my appointment", "it's 456789", "Thursday", "at 3 pm"],
+    ["I want to cancel an appointment", "one two three four five six"],
+    ["when is my appointment", "my ID is 778812", "thank you"],
+    ["can I book with doctor Emily Watson", "mary jones", "tomorrow", "11 am"],
+    ["I'd like to move my booking", "the ID is 123456", "next Friday would be good", "4 pm"],
+    ["I want to book an appointment", "my name is tom hardy", "doctor Michael Rodriguez",
+     "is Friday at 2 pm free", "ok Friday then", "2 pm", "bye"],
+]
+
+SOURCES = {
+    "slot filling": "slots.local.hits",
+    "local intent rules": "intent.local.hits",
+    "fast model": f"llm.tier.{FAST}.accepted",
+    "strong model": f"llm.tier.{STRONG}.calls",
+}
+
+
+class ClientState:
+    name = "CONNECTED"
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.client_state = ClientState()
+        self.intent_at = None
+
+    async def send_json(self, data):
+        if data.get("type") == "intent":
+            self.intent_at = time.perf_counter()
+
+    async def send_bytes(self, data):
+        pass
+
+
+def counts():
+    return {source: metrics.counters.get(name, 0) for source, name in SOURCES.items()}
+
+
+async def replay():
+    """Intent-message latency per turn, which source answered it, and totals per source"""
+    before = counts()
+    turns = []
+    for conversation in CONVERSATIONS:
+        websocket = RecordingWebSocket()
+        controller = TurnController(websocket)
+        for text in conversation:
+            turn_before = counts()
+            started = time.perf_counter()
+            await process_complete_sentence(websocket, text, controller)
+            turn_after = counts()
+            source = next((s for s in SOURCES if turn_after[s] > turn_before[s] and s != "strong model"), None)
+            if turn_after["strong model"] > turn_before["strong model"]:
+                source = "strong model"  # escalated fast answers count as strong turns
+            turns.append((text, source, (websocket.intent_at - started) * 1000))
+        openai_service.clear_conversation_history(controller.session_id)
+        conversation_service.release(controller.session_id)
+    after = counts()
+    return turns, {source: after[source] - before[source] for source in SOURCES}
+
+
+async def main():
+    logging.disable(logging.INFO)
+    # No speech and no database here - only the path to the intent message is timed
+    audio_processing.ELEVENLABS_AVAILABLE = False
+    audio_processing.MONGODB_AVAILABLE = False
+    openai_service.backend = ScriptedBackend(latency_ms=400, tokens_per_second=80,
+                                             model_speed={LLM_FAST_MODEL: FAST_SPEEDUP})
+    openai_service.streaming = False
+    print(f"Scripted backend: strong 400 ms + 80 tokens/s, fast model {LLM_FAST_MODEL} x{FAST_SPEEDUP}")
+
+    results = {}
+    stdout = sys.stdout
+    for label, enabled in (("without slot filling", False), ("with slot filling", True)):
+        conversation_service.enabled = enabled
+        sys.stdout = open(os.devnull, "w")  # the pipeline logs every step
+        try:
+            results[label] = await replay()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+
+        turns, sources = results[label]
+        local = sum(1 for _, source, _ in turns if source in ("slot filling", "local intent rules"))
+        print(f"\n{label}: {len(turns)} turns, {local} ({local / len(turns):.0%}) without an LLM call")
+        print("  " + ", ".join(f"{source} {count}" for source, count in sources.items() if count))
+        print(f"  intent message after: mean {statistics.mean(ms for _, _, ms in turns):.0f} ms")
+
+    without, with_filling = results["without slot filling"][0], results["with slot filling"][0]
+    filled = [i for i, (_, source, _) in enumerate(with_filling) if source == "slot filling"]
+    print(f"\nTurns answered by slot filling ({len(filled)}/{len(with_filling)}):")
+    for i in filled:
+        text, source, ms = with_filling[i]
+        print(f"  {text!r:<30} {without[i][1]:<18} {without[i][2]:>6.0f} ms -> {ms:>4.1f} ms")
+    saved = sum(without[i][2] - with_filling[i][2] for i in filled)
+    print(f"Latency saved: {saved / len(filled):.0f} ms per filled turn, "
+          f"{saved / len(with_filling):.0f} ms per turn on average")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+# benchmark_transcript_buffer.py
+"""
+Benchmark TranscriptBuffer on a 30-minute synthetic session: interim results every
+~250 ms, finals per audio window, commits at every turn, and long monologues where
+many finals accumulate before a commit.
+
+Reports per-update cost and the memory held for duplicate detection, for the previous
+string-based buffer (kept below as the baseline) and the segment-based one.
+
+    python benchmark_transcript_buffer.py
+"""
+import io
+import os
+import sys
+import time
+import random
+import statistics
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.transcript_buffer import TranscriptBuffer
+
+SESSION_SECONDS = 30 * 60
+WORDS = ("i want to book an appointment with doctor sarah chen tomorrow at ten my name is john "
+         "smith and my appointment id is one two three four five six please").split()
+
+
+# --- Baseline: the previous string buffer --------------------------------------
+
+class LegacyTranscriptBuffer:
+    def __init__(self):
+        self.buffer = ""
+        self.interim = ""
+        self.processed_sentences = set()
+
+    def add_transcript(self, transcript, is_final=False, start=None, duration=None):
+        if not transcript.strip():
+            return
+        if not is_final:
+            self.interim = transcript.strip()
+            return
+        self.interim = ""
+        if self.buffer:
+            self.buffer += " " + transcript.strip()
+        else:
+            self.buffer = transcript.strip()
+        print(f"📝 Buffer updated: '{self.buffer}' (is_final: {is_final})")
+        len(self.buffer.split())  # word count on every add
+
+    def take_sentence(self):
+        sentence = self.buffer.strip()
+        self.buffer = ""
+        if not sentence or sentence in self.processed_sentences:
+            return None
+        self.processed_sentences.add(sentence)
+        return sentence
+
+
+# --- Synthetic session ------------------------------------------------------------
+
+def synthesize_session(rng):
+    """[(kind, text, is_final, start, duration)] for 30 minutes of audio"""
+    events = []
+    audio = 0.0
+    while audio < SESSION_SECONDS:
+        # A turn: a few windows, or a long monologue of many windows
+        windows = rng.randint(1, 4) if rng.random() < 0.95 else rng.randint(20, 60)
+        for _ in range(windows):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(3, 12))]
+            duration = round(len(words) * 0.3, 2)
+            start = round(audio, 2)
+            for count in range(1, len(words)):
+                events.append(("result", " ".join(words[:count]), False, start, round(count * 0.3, 2)))
+            events.append(("result", " ".join(words), True, start, duration))
+            audio += duration
+        events.append(("commit", None, None, None, None))
+        audio += rng.uniform(1.0, 4.0)
+    return events
+
+
+def run(name, buffer):
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for kind, text, is_final, start, duration in EVENTS:
+            started = time.perf_counter()
+            if kind == "result":
+                buffer.add_transcript(text, is_final, start, duration)
+            else:
+                buffer.take_sentence()
+            timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    dedupe = getattr(buffer, "processed_sentences", None) or getattr(buffer, "recent", ())
+    dedupe_bytes = sum(sys.getsizeof(entry if isinstance(entry, str) else entry[0]) for entry in dedupe)
+    print(f"{name:<10} {statistics.mean(timings):>8.2f} {timings[len(timings) // 2]:>8.2f} "
+          f"{timings[int(0.99 * (len(timings) - 1))]:>8.2f} {timings[-1]:>9.1f} {len(dedupe):>9} {dedupe_bytes:>12}")
+
+
+rng = random.Random(30)
+EVENTS = synthesize_session(rng)
+
+
+def main():
+    results = sum(1 for event in EVENTS if event[0] == "result")
+    commits = len(EVENTS) - results
+    print(f"🧪 30-minute session: {results} results, {commits} commits\n")
+    print(f"{'buffer':<10} {'mean us':>8} {'p50 us':>8} {'p99 us':>8} {'max us':>9} {'dedupe n':>9} {'dedupe bytes':>12}")
+    run("legacy", LegacyTranscriptBuffer())
+    run("segments", TranscriptBuffer())
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
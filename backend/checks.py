@@ -0,0 +1,38 @@
+# checks.py
+"""
+Shared by the script-style test_*.py files: check() prints one ✅/❌ line per behaviour and
+returns the outcome, report() prints the tally and gives the exit code. Property tests that
+run many generated cases call require() inside the loop and report the property with one check().
+"""
+from typing import List, Optional
+
+
+class CheckFailed(AssertionError):
+    """A require() inside a generated case did not hold"""
+
+
+def check(name: str, condition: bool, detail: str = "") -> bool:
+    """One behaviour: ✅/❌ and its name, plus detail when it failed"""
+    print(f"{'✅' if condition else '❌'} {name}{f' ({detail})' if detail and not condition else ''}")
+    return bool(condition)
+
+
+def require(condition: bool, detail: str):
+    """Stop the current property at the first case that breaks it"""
+    if not condition:
+        raise CheckFailed(detail)
+
+
+def failure(run) -> Optional[str]:
+    """Run a property (no arguments), returning why it failed or None"""
+    try:
+        run()
+    except CheckFailed as e:
+        return str(e)
+    return None
+
+
+def report(results: List[bool]) -> int:
+    """Print the tally, return the exit code"""
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    return 0 if all(results) else 1
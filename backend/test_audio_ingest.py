@@ -0,0 +1,163 @@
+# test_audio_ingest.py
+"""
+Behaviour tests for AudioIngest against a recording stand-in for the Deepgram socket: client
+chunks coalesced into fixed-size frames in order, both overflow policies (including a chunk
+larger than the whole buffer), KeepAlive during silence and the drain on close.
+
+    python test_audio_ingest.py
+"""
+import os
+import sys
+import json
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services import audio_ingest
+from app.services.audio_ingest import AudioIngest, BYTES_PER_MS
+from checks import check, report
+
+FRAME_MS = 40
+FRAME_BYTES = FRAME_MS * BYTES_PER_MS
+CLIENT_CHUNK = 8192  # what the frontend sends
+
+
+class RecordingDeepgram:
+    """Deepgram socket: audio frames and control messages in the order they were sent"""
+
+    def __init__(self):
+        self.sent = []
+        self.open = asyncio.Event()
+        self.open.set()
+
+    async def send(self, message):
+        await self.open.wait()  # cleared: a stalled socket
+        self.sent.append(message)
+
+    @property
+    def frames(self):
+        return [message for message in self.sent if isinstance(message, bytes)]
+
+    @property
+    def controls(self):
+        return [json.loads(message)["type"] for message in self.sent if isinstance(message, str)]
+
+
+class SilenceVAD:
+    """Gates every frame out, as the VAD does during a long pause"""
+
+    def process(self, frame):
+        return b""
+
+
+def audio(size, offset=0):
+    """Distinct bytes so reordering or loss shows up"""
+    return bytes((offset + i) % 251 for i in range(size))
+
+
+async def finish(ingest, writer):
+    ingest.close()
+    await asyncio.wait_for(writer, timeout=1)
+
+
+async def main():
+    results = []
+
+    # Frame coalescing: odd-sized client chunks leave as fixed-size frames, in order
+    deepgram = RecordingDeepgram()
+    ingest = AudioIngest(deepgram, frame_ms=FRAME_MS, overflow_policy="drop_oldest")
+    writer = asyncio.create_task(ingest.run())
+    stream = audio(3 * CLIENT_CHUNK + 1000)
+    for start, size in ((0, CLIENT_CHUNK), (CLIENT_CHUNK, 700), (CLIENT_CHUNK + 700, len(stream))):
+        await ingest.put(stream[start:start + size])
+        await asyncio.sleep(0)
+    await finish(ingest, writer)
+    frames = deepgram.frames
+    results.append(check("Client chunks are sent as fixed-size frames",
+                         all(len(frame) == FRAME_BYTES for frame in frames[:-1]) and len(frames[-1]) <= FRAME_BYTES,
+                         str(sorted({len(frame) for frame in frames}))))
+    results.append(check("The frames carry the client audio unchanged and in order", b"".join(frames) == stream))
+    results.append(check("Closing flushes the partial last frame, then sends CloseStream",
+                         deepgram.controls == ["CloseStream"] and deepgram.sent[-1] == json.dumps({"type": "CloseStream"})))
+
+    # drop_oldest: a stalled socket loses the oldest audio, put() never waits
+    deepgram = RecordingDeepgram()
+    ingest = AudioIngest(deepgram, frame_ms=FRAME_MS, max_buffer_ms=100, overflow_policy="drop_oldest")
+    stream = audio(5 * 1000)
+    for start in range(0, len(stream), 1000):
+        await asyncio.wait_for(ingest.put(stream[start:start + 1000]), timeout=1)
+    results.append(check("drop_oldest keeps the newest audio up to the capacity",
+                         bytes(ingest.buffer) == stream[-ingest.capacity:]
+                         and ingest.bytes_dropped == len(stream) - ingest.capacity, str(ingest.stats())))
+    chunk = audio(CLIENT_CHUNK, offset=7)
+    await asyncio.wait_for(ingest.put(chunk), timeout=1)
+    results.append(check("drop_oldest keeps the tail of a chunk larger than the whole buffer",
+                         bytes(ingest.buffer) == chunk[-ingest.capacity:], str(len(ingest.buffer))))
+
+    # block: put() waits for the writer instead of dropping
+    deepgram = RecordingDeepgram()
+    deepgram.open.clear()
+    ingest = AudioIngest(deepgram, frame_ms=FRAME_MS, max_buffer_ms=100, overflow_policy="block")
+    writer = asyncio.create_task(ingest.run())
+    stream = audio(3 * ingest.capacity)
+    pending = asyncio.create_task(ingest.put(stream))
+    await asyncio.sleep(0.05)
+    results.append(check("block stops reading from the client while the socket is stalled",
+                         not pending.done() and len(ingest.buffer) <= ingest.capacity, str(ingest.stats())))
+    deepgram.open.set()
+    await asyncio.wait_for(pending, timeout=1)
+    await finish(ingest, writer)
+    results.append(check("block delivers everything once the socket catches up, dropping nothing",
+                         b"".join(deepgram.frames) == stream and ingest.bytes_dropped == 0, str(ingest.stats())))
+
+    # block: a client chunk larger than the buffer (AUDIO_INGEST_MAX_MS under 256 ms) used to hang
+    deepgram = RecordingDeepgram()
+    ingest = AudioIngest(deepgram, frame_ms=FRAME_MS, max_buffer_ms=100, overflow_policy="block")
+    writer = asyncio.create_task(ingest.run())
+    stream = audio(2 * CLIENT_CHUNK)
+    try:
+        for start in range(0, len(stream), CLIENT_CHUNK):
+            await asyncio.wait_for(ingest.put(stream[start:start + CLIENT_CHUNK]), timeout=1)
+        completed = True
+    except asyncio.TimeoutError:
+        completed = False
+    await finish(ingest, writer)
+    results.append(check(f"block accepts a {CLIENT_CHUNK}-byte chunk into a {ingest.capacity}-byte buffer",
+                         completed and b"".join(deepgram.frames) == stream, str(ingest.stats())))
+
+    # KeepAlive: silence (no audio, or audio the VAD gates out) keeps the socket open
+    audio_ingest.DEEPGRAM_KEEPALIVE_INTERVAL = 0.05
+    for label, vad, chunks in (("no client audio", None, []), ("frames gated out by the VAD", SilenceVAD(), [audio(FRAME_BYTES)] * 8)):
+        deepgram = RecordingDeepgram()
+        ingest = AudioIngest(deepgram, vad=vad, frame_ms=FRAME_MS)
+        writer = asyncio.create_task(ingest.run())
+        for chunk in chunks:
+            await ingest.put(chunk)
+            await asyncio.sleep(0.03)
+        await asyncio.sleep(0.2)
+        await finish(ingest, writer)
+        results.append(check(f"KeepAlive is sent during silence ({label})",
+                             ingest.keepalives_sent >= 2 and deepgram.controls.count("KeepAlive") == ingest.keepalives_sent
+                             and not deepgram.frames, str(deepgram.controls)))
+
+    deepgram = RecordingDeepgram()
+    ingest = AudioIngest(deepgram, frame_ms=FRAME_MS)
+    writer = asyncio.create_task(ingest.run())
+    for _ in range(10):
+        await ingest.put(audio(FRAME_BYTES))
+        await asyncio.sleep(0.02)
+    await finish(ingest, writer)
+    results.append(check("No KeepAlive while audio is flowing", ingest.keepalives_sent == 0, str(deepgram.controls)))
+
+    try:
+        AudioIngest(RecordingDeepgram(), overflow_policy="drop_newest")
+        rejected = False
+    except ValueError:
+        rejected = True
+    results.append(check("An unknown overflow policy is rejected", rejected))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,115 @@
+# test_booking_flow.py
+"""
+End-to-end booking through process_complete_sentence with the offline scripted LLM and a stubbed
+mongodb_service: the model returns only the slot each turn gives, and the database step still
+books with every slot collected on the way (then the next request starts clean).
+
+    python test_booking_flow.py
+"""
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services import audio_processing, prompt_builder as prompt_builder_module
+from app.services.audio_processing import process_complete_sentence
+from app.services.conversation_service import conversation_service
+from app.services.datetime_resolver import resolve_datetime
+from app.services.llm_backend import ScriptedBackend
+from app.services.openai_service import openai_service
+from app.services.prompt_builder import prompt_builder, FALLBACK_DOCTORS
+from app.services.turn_controller import TurnController
+from checks import check, report
+
+
+def reply(entities, response):
+    return {"intent": "book_appointment", "entities": entities, "confidence": 0.9, "processed_response": response}
+
+
+# The local resolver's date wins over the model's
+DATE = resolve_datetime("the twentieth of november")["date"]
+
+# Each turn's reply carries only what that turn said - as the strong model often does
+SCRIPT = [
+    (r"book an appointment with doctor sarah chen", reply({"doctor_name": "Sarah Chen"}, "May I have your name?")),
+    (r"my name is john smith", reply({"patient_name": "John Smith"}, "What date would you like?")),
+    (r"the twentieth of november", reply({"date": DATE}, "What time works for you?")),
+    (r"ten in the morning", reply({"time": "10:00"}, "Let me book that for you.")),
+]
+TURNS = [pattern for pattern, _ in SCRIPT]
+
+
+class FakeMongo:
+    """The mongodb_service calls the booking path makes"""
+
+    def __init__(self):
+        self.inserted = []
+
+    async def get_available_doctors(self):
+        return list(FALLBACK_DOCTORS)
+
+    async def insert_appointment(self, appointment_data):
+        self.inserted.append(appointment_data)
+        return "654321"
+
+
+class ClientState:
+    name = "CONNECTED"
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.client_state = ClientState()
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        pass
+
+
+async def main():
+    results = []
+    mongo = FakeMongo()
+    audio_processing.mongodb_service = mongo
+    audio_processing.MONGODB_AVAILABLE = True
+    audio_processing.ELEVENLABS_AVAILABLE = False
+    prompt_builder_module.mongodb_service = mongo
+    prompt_builder_module.MONGODB_AVAILABLE = True
+    prompt_builder.invalidate("test roster")
+    openai_service.backend = ScriptedBackend(latency_ms=0, tokens_per_second=0, script=SCRIPT)
+    openai_service.streaming = False
+    openai_service.local_classifier = None
+    openai_service.router.enabled = False  # the fast tier carries entities over itself
+    conversation_service.enabled = False  # every turn goes through the strong model
+
+    websocket = RecordingWebSocket()
+    controller = TurnController(websocket)
+    for text in TURNS:
+        await process_complete_sentence(websocket, text, controller)
+    intents = [message for message in websocket.sent if message["type"] == "intent"]
+
+    results.append(check("Every turn produced an intent message", len(intents) == len(TURNS), str(len(intents))))
+    results.append(check("The booking is written with the slots from all four turns",
+                         len(mongo.inserted) == 1 and {key: mongo.inserted[0][key] for key in
+                                                       ("patient_name", "doctor_name", "date", "time")}
+                         == {"patient_name": "John Smith", "doctor_name": "Sarah Chen",
+                             "date": DATE, "time": "10:00"}, str(mongo.inserted)))
+    results.append(check("The last reply confirms the booking with its ID",
+                         intents[-1]["processed_response"].startswith("Thank you, John Smith!")
+                         and "654321" in intents[-1]["processed_response"], intents[-1]["processed_response"]))
+    results.append(check("The intent message carries the whole request",
+                         set(intents[-1]["entities"]) >= {"patient_name", "doctor_name", "date", "time"},
+                         str(intents[-1]["entities"])))
+    state = conversation_service.get_state(controller.session_id)
+    results.append(check("The fulfilled request leaves a clean state for the next one",
+                         state.current_intent is None and state.collected_entities == {}, str(state)))
+
+    await controller.close()
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -34,8 +34,8 @@ async def test_conversation_flow():
     print("2. User says: 'Dr. Kavin'")
     intent_response_2 = IntentResponse(
         intent=IntentType.BOOK_APPOINTMENT,  # Same intent!
-        entities={},  # No entities extracted from just "Dr. Kavin"
-        confidence=0.3,  # Low confidence because it's not a full sentence
+        entities={"doctor_name": "Kavin"},  # OpenAI extracts the doctor (raw transcripts are not used as values)
+        confidence=0.9,
         raw_transcript="Dr. Kavin",  # This is the key - the raw answer
         processed_response=""
     )
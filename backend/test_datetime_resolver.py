@@ -0,0 +1,216 @@
+# test_datetime_resolver.py
+"""
+Table-driven tests for the deterministic date/time resolver.
+Each case is (transcript, expected result) resolved against a fixed "today" of
+Friday 2026-10-16; an empty result means nothing should be resolved. Any mismatch fails.
+EXPECTING_DATE_CASES are resolved as the answer to a date question.
+
+    python test_datetime_resolver.py
+"""
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.datetime_resolver import DateTimeResolver
+
+TODAY = date(2026, 10, 16)  # a Friday
+
+
+def d(value):
+    return {"date": value}
+
+
+def t(value):
+    return {"time": value}
+
+
+def dt(date_value, time_value):
+    return {"date": date_value, "time": time_value}
+
+
+CASES = [
+    # Relative days
+    ("today", d("2026-10-16")),
+    ("tomorrow", d("2026-10-17")),
+    ("can I come in tomorrow", d("2026-10-17")),
+    ("the day after tomorrow", d("2026-10-18")),
+    ("tonight", d("2026-10-16")),
+    ("in three days", d("2026-10-19")),
+    ("in 10 days", d("2026-10-26")),
+    ("in one day", d("2026-10-17")),
+    ("in a week", d("2026-10-23")),
+    ("in two weeks", d("2026-10-30")),
+    ("in 3 weeks", d("2026-11-06")),
+
+    # Weekdays - weeks start on Monday
+    ("next monday", d("2026-10-19")),
+    ("next tuesday", d("2026-10-20")),
+    ("next wednesday", d("2026-10-21")),
+    ("next thursday", d("2026-10-22")),
+    ("next friday", d("2026-10-23")),
+    ("next saturday", d("2026-10-24")),
+    ("next sunday", d("2026-10-25")),
+    ("this friday", d("2026-10-16")),
+    ("this saturday", d("2026-10-17")),
+    ("this sunday", d("2026-10-18")),
+    ("this monday", d("2026-10-19")),
+    ("this thursday", d("2026-10-22")),
+    ("monday", d("2026-10-19")),
+    ("Friday", d("2026-10-23")),
+    ("saturday", d("2026-10-17")),
+    ("on sunday", d("2026-10-18")),
+    ("on sat", d("2026-10-17")),
+    ("next wed", d("2026-10-21")),
+    ("thurs", d("2026-10-22")),
+    ("friday next week", d("2026-10-23")),
+    ("monday next week", d("2026-10-19")),
+    ("wednesday this week", d("2026-10-21")),
+    ("saturday this week", d("2026-10-17")),
+    ("next week friday", d("2026-10-23")),
+    ("next week on thursday", d("2026-10-22")),
+    ("coming tuesday", d("2026-10-20")),
+    ("this coming monday", d("2026-10-19")),
+
+    # Days of the month - with "on"/"for" or "of the month" (bare ones: EXPECTING_DATE_CASES)
+    ("on the twenty first", d("2026-10-21")),
+    ("on the 20th please", d("2026-10-20")),
+    ("for the 3rd", d("2026-11-03")),
+    ("the 25th of the month", d("2026-10-25")),
+
+    # Month and day
+    ("october 25", d("2026-10-25")),
+    ("October 25th", d("2026-10-25")),
+    ("oct the 20th", d("2026-10-20")),
+    ("november third", d("2026-11-03")),
+    ("25th of october", d("2026-10-25")),
+    ("the 5th of december", d("2026-12-05")),
+    ("3 november", d("2026-11-03")),
+    ("january 10", d("2027-01-10")),
+    ("march 3rd", d("2027-03-03")),
+    ("may 5th", d("2027-05-05")),
+    ("5th of may 2027", d("2027-05-05")),
+    ("february 29 2028", d("2028-02-29")),
+    ("the thirtieth of november", d("2026-11-30")),
+    ("december twenty fifth", d("2026-12-25")),
+    ("2026-11-02", d("2026-11-02")),
+
+    # Clock times
+    ("2 pm", t("14:00")),
+    ("2pm", t("14:00")),
+    ("2 p.m.", t("14:00")),
+    ("2 PM", t("14:00")),
+    ("2:30 pm", t("14:30")),
+    ("2:30pm", t("14:30")),
+    ("11 am", t("11:00")),
+    ("12 pm", t("12:00")),
+    ("12 am", t("00:00")),
+    ("10:15 a.m.", t("10:15")),
+    ("14:45", t("14:45")),
+    ("09:30", t("09:30")),
+    ("two pm", t("14:00")),
+    ("two thirty pm", t("14:30")),
+    ("ten fifteen am", t("10:15")),
+    ("seven oh five pm", t("19:05")),
+    ("three o'clock", t("15:00")),
+    ("nine o'clock", t("09:00")),
+    ("10 o'clock in the morning", t("10:00")),
+    ("noon", t("12:00")),
+    ("around midday", t("12:00")),
+
+    # "at" anchors and periods of the day
+    ("at 3", t("15:00")),
+    ("at 9", t("09:00")),
+    ("at 12", t("12:00")),
+    ("at 6", t("18:00")),
+    ("at 7", t("07:00")),
+    ("at 10 30", t("10:30")),
+    ("at ten thirty", t("10:30")),
+    ("at 8 in the evening", t("20:00")),
+    ("3 in the afternoon", t("15:00")),
+    ("10 in the morning", t("10:00")),
+    ("at 9 at night", t("21:00")),
+
+    # Spoken times
+    ("half past two", t("14:30")),
+    ("half past ten", t("10:30")),
+    ("quarter past nine", t("09:15")),
+    ("quarter to four", t("15:45")),
+    ("quarter to one", t("12:45")),
+    ("ten thirty", t("10:30")),
+    ("um about 2 30", t("14:30")),
+    ("eleven forty five", t("11:45")),
+    ("ten thirty please", t("10:30")),
+
+    # Date and time together
+    ("tomorrow at 2 pm", dt("2026-10-17", "14:00")),
+    ("next friday at ten thirty", dt("2026-10-23", "10:30")),
+    ("monday at 9", dt("2026-10-19", "09:00")),
+    ("book me for the 25th at half past three", dt("2026-10-25", "15:30")),
+    ("day after tomorrow at 11am", dt("2026-10-18", "11:00")),
+    ("at 7 tonight", dt("2026-10-16", "19:00")),
+    ("I'd like to see Dr. Chen on October 20th at 2:30 PM", dt("2026-10-20", "14:30")),
+    ("can I come in on thursday morning", d("2026-10-22")),
+
+    # Corrections - the last mention wins
+    ("not monday, tuesday at 4", dt("2026-10-20", "16:00")),
+    ("move it from wednesday to friday", d("2026-10-23")),
+    ("at 2 no sorry at 3", t("15:00")),
+
+    # Nothing to resolve
+    ("one two three four five six", {}),
+    ("my appointment id is 123456", {}),
+    ("I have 3 kids", {}),
+    ("I sat in the sun", {}),
+    ("I'd like to book an appointment", {}),
+    ("doctor chen", {}),
+    ("yes", {}),
+    ("I'm 45 years old", {}),
+    ("the 3 of us", {}),
+    ("in the morning", {}),
+    ("next week", {}),
+    ("at the clinic", {}),
+    ("I'd like a second opinion", {}),
+    ("my first appointment", {}),
+    ("I want the second doctor", {}),
+    ("the first one please", {}),
+    ("the 25th", {}),
+    ("on the second floor", {}),
+    ("for the first time", {}),
+    ("may I book with doctor Watson", {}),
+    ("november 31", {}),
+    ("at 25", {}),
+]
+
+# We asked for a date (pending date slot): a bare day of the month is the answer
+EXPECTING_DATE_CASES = [
+    ("the 25th", d("2026-10-25")),
+    ("the 16th", d("2026-10-16")),
+    ("the 3rd", d("2026-11-03")),
+    ("the thirty first", d("2026-10-31")),
+    ("the 31st", d("2026-10-31")),
+    ("the first", d("2026-11-01")),
+    ("I'd like the 20th at 10", dt("2026-10-20", "10:00")),
+    ("wait a second", {}),
+]
+
+
+def main():
+    resolver = DateTimeResolver()
+    failures = []
+    for cases, expecting_date in ((CASES, False), (EXPECTING_DATE_CASES, True)):
+        for text, expected in cases:
+            result = resolver.resolve(text, TODAY, expecting_date)
+            if result != expected:
+                failures.append((text, expected, result))
+
+    for text, expected, result in failures:
+        print(f"❌ {text!r}: expected {expected}, got {result}")
+    total = len(CASES) + len(EXPECTING_DATE_CASES)
+    print(f"{total - len(failures)}/{total} cases resolved correctly")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# test_deepgram_pool.py
+"""
+Exercise DeepgramPool against a local fake Deepgram WebSocket server:
+pre-warming, hits/misses, refill on checkout, KeepAlive health checks,
+replacement of dead sockets and no reuse after CloseStream.
+
+    python test_deepgram_pool.py
+"""
+import os
+import sys
+import json
+import asyncio
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.deepgram_pool import DeepgramPool
+from checks import check, report
+
+
+class FakeDeepgram:
+    """Accepts sockets, counts KeepAlives and closes a socket on CloseStream"""
+
+    def __init__(self):
+        self.connections = []
+        self.keepalives = 0
+        self.close_streams = 0
+
+    async def handler(self, ws, path=None):
+        self.connections.append(ws)
+        async for message in ws:
+            if isinstance(message, bytes):
+                continue
+            data = json.loads(message)
+            if data.get("type") == "KeepAlive":
+                self.keepalives += 1
+            elif data.get("type") == "CloseStream":
+                self.close_streams += 1
+                await ws.send(json.dumps({"type": "Metadata"}))
+                await ws.close()
+
+    @property
+    def open_connections(self):
+        return sum(1 for ws in self.connections if ws.open)
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+
+async def main():
+    fake = FakeDeepgram()
+    results = []
+    async with websockets.serve(fake.handler, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        pool = DeepgramPool(f"ws://127.0.0.1:{port}", size=2, keepalive_interval=0.2)
+        pool.start()
+
+        results.append(check("Pool pre-opens 2 sockets", await wait_for(lambda: len(pool.idle) == 2)))
+
+        # Checkout is a hit and the pool refills behind it
+        async with pool.connection() as ws:
+            results.append(check("Checkout is served from the pool", pool.hits == 1 and pool.misses == 0))
+            results.append(check("Pool refills after a checkout", await wait_for(lambda: len(pool.idle) == 2)))
+            await ws.send(b"\x00" * 640)
+            await ws.send(json.dumps({"type": "CloseStream"}))
+            await wait_for(lambda: not ws.open)
+        results.append(check("A socket that sent CloseStream is not reused",
+                             all(entry[0] is not ws for entry in pool.idle)))
+        results.append(check("The server saw CloseStream", fake.close_streams == 1))
+
+        # Idle sockets are kept alive
+        keepalives = fake.keepalives
+        results.append(check("Idle sockets receive KeepAlive",
+                             await wait_for(lambda: fake.keepalives >= keepalives + 2)))
+
+        # A socket dropped by the server is replaced
+        victim = fake.connections[-1]
+        await victim.close()
+        results.append(check("A dead socket is replaced by the health check",
+                             await wait_for(lambda: len(pool.idle) == 2 and all(entry[0].open for entry in pool.idle))))
+
+        # Drain the pool faster than it refills - the extra checkout is a miss
+        sockets = [await pool.acquire() for _ in range(3)]
+        results.append(check("An empty pool falls back to a direct connect", pool.misses >= 1, f"misses={pool.misses}"))
+        for ws in sockets:
+            await pool.release(ws)
+
+        await pool.close()
+        results.append(check("close() shuts every socket", await wait_for(lambda: fake.open_connections == 0)))
+        print(f"📊 {pool.stats()}")
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
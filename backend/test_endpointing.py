@@ -0,0 +1,139 @@
+# test_endpointing.py
+"""
+Table tests for utterance_delay (appointment IDs, mid-sentence endings, short answers) and
+behaviour tests for AdaptiveEndpointDetector on Deepgram messages: interims, finals with and
+without speech_final (trailing silence from word timings), UtteranceEnd and SpeechStarted.
+
+    python test_endpointing.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.endpointing import (
+    utterance_delay, AdaptiveEndpointDetector, EndpointDecision, EndpointDetector,
+    SHORT_DELAY, DEFAULT_DELAY, LONG_DELAY, SILENCE_TIMEOUT, UTTERANCE_END_SECONDS
+)
+from checks import check, report
+
+DELAYS = [
+    # Appointment IDs, digit by digit or grouped
+    ("one two three four five six", SHORT_DELAY, "appointment_id"),
+    ("123 456", SHORT_DELAY, "appointment_id"),
+    ("654321", SHORT_DELAY, "appointment_id"),
+    ("oh four two", LONG_DELAY, "partial_id"),
+    ("one two three four five", LONG_DELAY, "partial_id"),
+    ("12345", LONG_DELAY, "partial_id"),
+    # The patient stopped mid-sentence
+    ("I want to book an appointment with", LONG_DELAY, "incomplete"),
+    ("my name is", LONG_DELAY, "incomplete"),
+    ("can I see doctor", LONG_DELAY, "incomplete"),
+    ("my appointment ID is", LONG_DELAY, "incomplete"),
+    ("um", LONG_DELAY, "incomplete"),
+    # Short answers
+    ("yes", SHORT_DELAY, "short_answer"),
+    ("No thanks.", SHORT_DELAY, "short_answer"),
+    ("thank you so much", SHORT_DELAY, "short_answer"),
+    ("yeah that works", SHORT_DELAY, "short_answer"),
+    ("That's right!", SHORT_DELAY, "short_answer"),
+    # Everything else
+    ("I'd like to book an appointment with doctor Chen", DEFAULT_DELAY, "sentence"),
+    ("next Tuesday at ten", DEFAULT_DELAY, "sentence"),
+    ("yes I would like to reschedule my appointment please", DEFAULT_DELAY, "sentence"),
+    ("", LONG_DELAY, "empty"),
+    ("...", LONG_DELAY, "empty"),
+]
+
+
+def results_message(transcript, is_final=True, speech_final=False, start=0.0, duration=1.0, last_word_end=None):
+    """A Deepgram Results message; last_word_end sets the end time of the last word"""
+    words = []
+    if transcript and last_word_end is not None:
+        words = [{"word": word, "end": last_word_end} for word in transcript.split()]
+    return {
+        "type": "Results",
+        "channel": {"alternatives": [{"transcript": transcript, "words": words}]},
+        "is_final": is_final,
+        "speech_final": speech_final,
+        "start": start,
+        "duration": duration,
+    }
+
+
+def decision_is(decision, action, delay=None, reason=None):
+    return (decision.action == action
+            and (delay is None or abs(decision.delay - delay) < 1e-9)
+            and (reason is None or decision.reason == reason))
+
+
+def main():
+    results = []
+
+    for text, delay, kind in DELAYS:
+        got = utterance_delay(text)
+        results.append(check(f"{text!r} waits {delay}s ({kind})", got == (delay, kind), str(got)))
+
+    detector = AdaptiveEndpointDetector()
+    results.append(check("An interim before any final leaves nothing to commit",
+                         decision_is(detector.observe(results_message("I want", is_final=False), 0), EndpointDecision.WAIT)))
+    results.append(check("UtteranceEnd with nothing buffered is ignored",
+                         decision_is(detector.observe({"type": "UtteranceEnd"}, 0), EndpointDecision.WAIT)))
+    results.append(check("Messages that are not results are ignored",
+                         decision_is(detector.observe({"type": "Metadata"}, 0), EndpointDecision.WAIT)))
+
+    decision = detector.observe(results_message("I want to book an appointment"), 0)
+    results.append(check("A final segment without speech_final waits for the silence timeout",
+                         decision_is(decision, EndpointDecision.COMMIT, SILENCE_TIMEOUT, "final_segment"), repr(decision)))
+    decision = detector.observe(results_message("with doctor", is_final=False), 0)
+    results.append(check("An interim after a final pushes the commit out again",
+                         decision_is(decision, EndpointDecision.COMMIT, SILENCE_TIMEOUT, "interim"), repr(decision)))
+    decision = detector.observe({"type": "SpeechStarted"}, 0)
+    results.append(check("SpeechStarted pushes the commit out again",
+                         decision_is(decision, EndpointDecision.COMMIT, SILENCE_TIMEOUT, "speech_started"), repr(decision)))
+
+    # speech_final: the delay is what the utterance needs minus the silence Deepgram already heard
+    decision = detector.observe(results_message("with doctor Chen", speech_final=True, start=2.0, duration=1.5,
+                                                last_word_end=3.2), 0)
+    results.append(check("speech_final commits after the sentence delay minus the trailing silence",
+                         decision_is(decision, EndpointDecision.COMMIT, DEFAULT_DELAY - 0.3, "speech_final:sentence"),
+                         repr(decision)))
+    results.append(check("The segments of one utterance are joined",
+                         detector.text == "I want to book an appointment with doctor Chen", detector.text))
+
+    detector.reset()
+    decision = detector.observe(results_message("my name is", speech_final=True, start=0.0, duration=1.0,
+                                                last_word_end=0.9), 0)
+    results.append(check("speech_final after an incomplete ending waits the long delay",
+                         decision_is(decision, EndpointDecision.COMMIT, LONG_DELAY - 0.1, "speech_final:incomplete"),
+                         repr(decision)))
+    decision = detector.observe({"type": "UtteranceEnd"}, 0)
+    results.append(check("UtteranceEnd counts the utterance_end_ms Deepgram already waited",
+                         decision_is(decision, EndpointDecision.COMMIT, max(0.0, LONG_DELAY - UTTERANCE_END_SECONDS),
+                                     "utterance_end:incomplete"), repr(decision)))
+
+    detector.reset()
+    decision = detector.observe(results_message("yes", speech_final=True, start=0.0, duration=2.0,
+                                                last_word_end=0.5), 0)
+    results.append(check("The delay never goes below zero",
+                         decision_is(decision, EndpointDecision.COMMIT, 0.0, "speech_final:short_answer"), repr(decision)))
+    decision = detector.observe(results_message("", speech_final=True), 0)
+    results.append(check("An empty speech_final still commits what is buffered",
+                         decision.action == EndpointDecision.COMMIT and detector.text == "yes", repr(decision)))
+
+    detector.reset()
+    results.append(check("reset() forgets the committed utterance",
+                         detector.text == "" and decision_is(detector.observe({"type": "UtteranceEnd"}, 0), EndpointDecision.WAIT)))
+
+    try:
+        EndpointDetector()
+        abstract = False
+    except TypeError:
+        abstract = True
+    results.append(check("EndpointDetector cannot be used without observe() and reset()", abstract))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
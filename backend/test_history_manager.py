@@ -0,0 +1,117 @@
+# test_history_manager.py
+"""
+Behaviour tests for HistoryCompactor: once over the token budget old turns are folded into
+one summary with the newest messages kept verbatim, and the summary of folded turns keeps the patient's name while the
+entities are scoped to the request in progress (cleared when it is fulfilled or another
+request starts).
+
+    python test_history_manager.py
+"""
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.history_manager import HistoryCompactor, compact_reply, SUMMARY_PREFIX
+from checks import check, report
+
+SYSTEM = {"role": "system", "content": "You are a medical appointment assistant."}
+
+
+def turn(history, text, intent, response, **entities):
+    history.append({"role": "user", "content": f"Patient message: {text}"})
+    history.append({"role": "assistant", "content": compact_reply({
+        "intent": intent, "entities": entities, "confidence": 0.9, "processed_response": response
+    })})
+
+
+def summary_of(history):
+    if len(history) < 2 or not history[1]["content"].startswith(SUMMARY_PREFIX):
+        return None
+    return json.loads(history[1]["content"][len(SUMMARY_PREFIX):])
+
+
+def main():
+    results = []
+
+    # Within budget nothing changes
+    compactor = HistoryCompactor(budget=1000, keep_messages=2)
+    history = [dict(SYSTEM)]
+    turn(history, "hello", "greeting", "Hello! How can I help?")
+    before = list(history)
+    compactor.compact(history)
+    results.append(check("History within the budget is left alone", history == before))
+
+    # A booking, then other requests, with a small budget
+    compactor = HistoryCompactor(budget=60, keep_messages=2)
+    history = [dict(SYSTEM)]
+    turn(history, "I'd like to book an appointment", "book_appointment", "May I have your name?")
+    turn(history, "my name is John Smith", "book_appointment", "Which doctor?", patient_name="John Smith")
+    turn(history, "doctor Sarah Chen", "book_appointment", "What date?",
+         patient_name="John Smith", doctor_name="Sarah Chen")
+    tokens_before = compactor.conversation_tokens(history)
+    compactor.compact(history)
+    summary = summary_of(history)
+    results.append(check("Old turns are folded into one summary after the system prompt",
+                         history[0] == SYSTEM and summary is not None and len(history) == 4
+                         and history[-1]["content"].startswith('{"intent":"book_appointment"'), str(history)))
+    results.append(check("The latest keep_messages messages stay verbatim",
+                         history[-2]["content"] == "Patient message: doctor Sarah Chen"))
+    results.append(check("Folding shrinks the conversation part of the prompt",
+                         compactor.conversation_tokens(history) < tokens_before,
+                         f"{tokens_before} -> {compactor.conversation_tokens(history)}"))
+    results.append(check("The request in progress keeps its details",
+                         summary["intent"] == "book_appointment" and summary["entities"] == {"patient_name": "John Smith"}
+                         and summary["turns"] == 2, str(summary)))
+
+    turn(history, "next Tuesday at ten", "book_appointment", "Booked.", patient_name="John Smith",
+         doctor_name="Sarah Chen", date="2026-10-20", time="10:00")
+    turn(history, "thanks", "thanks", "You're welcome!")
+    turn(history, "when is my other appointment", "query_appointment", "Your appointment ID?")
+    compactor.compact(history)
+    summary = summary_of(history)
+    results.append(check("A fulfilled request is recorded and its entities cleared",
+                         summary["completed"] == ["book_appointment"] and summary["intent"] is None
+                         and summary["entities"] == {}, str(summary)))
+    results.append(check("The patient's name survives the finished request",
+                         summary["patient_name"] == "John Smith", str(summary)))
+
+    # A new request while another is in progress: its details do not carry over
+    turn(history, "actually I want to reschedule", "reschedule_appointment", "Which appointment?")
+    turn(history, "it's 456789", "reschedule_appointment", "To which date?", appointment_id="456789")
+    turn(history, "Thursday", "reschedule_appointment", "What time?", appointment_id="456789", date="2026-10-22")
+    turn(history, "no wait, cancel it instead", "cancel_appointment", "Which appointment ID?")
+    turn(history, "sorry one moment", "unknown", "Take your time.")
+    compactor.compact(history)
+    summary = summary_of(history)
+    results.append(check("Changing the request drops the previous request's entities",
+                         summary["intent"] == "cancel_appointment" and summary["entities"] == {}, str(summary)))
+
+    turn(history, "it's 123456", "cancel_appointment", "Cancelled.", appointment_id="123456")
+    turn(history, "ok", "thanks", "Anything else?")
+    turn(history, "no", "thanks", "Goodbye!")
+    compactor.compact(history)
+    summary = summary_of(history)
+    results.append(check("Completed requests accumulate, entities do not",
+                         summary["completed"] == ["book_appointment", "cancel_appointment 123456"]
+                         and summary["entities"] == {} and summary["patient_name"] == "John Smith", str(summary)))
+    results.append(check("Only one summary message is ever kept",
+                         sum(m["content"].startswith(SUMMARY_PREFIX) for m in history) == 1))
+
+    # A greeting or thanks does not end the request in progress
+    compactor = HistoryCompactor(budget=40, keep_messages=2)
+    history = [dict(SYSTEM)]
+    turn(history, "cancel my appointment", "cancel_appointment", "Which ID?")
+    turn(history, "thank you", "thanks", "You're welcome. Which ID?")
+    turn(history, "hmm", "unknown", "Your appointment ID?")
+    compactor.compact(history)
+    summary = summary_of(history)
+    results.append(check("Small talk leaves the request in progress alone",
+                         summary["intent"] == "cancel_appointment", str(summary)))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# test_intent_classifier.py
+"""
+Labeled corpus for the local fast-path intent classifier.
+Each case is (transcript, previous assistant intent, expected local intent). An expected
+intent of None means the turn must fall through to OpenAI. Reports accuracy and the
+fraction of turns answered without a network call; any wrong local answer fails.
+
+    python test_intent_classifier.py
+"""
+import io
+import os
+import sys
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.intent_classifier import LocalIntentClassifier
+
+CORPUS = [
+    # Greetings
+    ("hello", None, "greeting"),
+    ("hi", None, "greeting"),
+    ("hey there", None, "greeting"),
+    ("Good morning", None, "greeting"),
+    ("um hello", None, "greeting"),
+    ("hi hello", None, "greeting"),
+    ("good afternoon", "book_appointment", "greeting"),
+    ("hello I want to book an appointment", None, None),
+    ("hi my name is John", None, None),
+    ("hello is doctor Chen available tomorrow", None, None),
+
+    # Thanks / goodbye
+    ("thanks", "book_appointment", "thanks"),
+    ("thank you", "book_appointment", "thanks"),
+    ("thank you so much", "cancel_appointment", "thanks"),
+    ("thanks a lot", None, "thanks"),
+    ("okay thank you", "query_appointment", "thanks"),
+    ("great thanks", "book_appointment", "thanks"),
+    ("perfect thank you that's all", "book_appointment", "thanks"),
+    ("thanks bye", "book_appointment", "thanks"),
+    ("cheers", None, "thanks"),
+    ("bye", "book_appointment", "thanks"),
+    ("goodbye", None, "thanks"),
+    ("thanks can you also book me with doctor Chen", "book_appointment", None),
+    ("thank you but I need a different time", "book_appointment", None),
+    ("no thanks", "book_appointment", None),
+
+    # Bare appointment IDs in answer to "what is your appointment ID?"
+    ("one two three four five six", "cancel_appointment", "cancel_appointment"),
+    ("123456", "query_appointment", "query_appointment"),
+    ("my ID is four five six seven eight nine", "cancel_appointment", "cancel_appointment"),
+    ("it's 9 8 7 6 5 4", "reschedule_appointment", "reschedule_appointment"),
+    ("the appointment number is 555123", "query_appointment", "query_appointment"),
+    ("yes it is 246810", "cancel_appointment", "cancel_appointment"),
+    ("one two three four five six", None, None),
+    ("123456", "book_appointment", None),
+    ("one two three", "cancel_appointment", None),
+    ("1234567", "query_appointment", None),
+    ("my ID is 123456 and I want to move it to Friday", "reschedule_appointment", None),
+
+    # Explicit cancellation with an ID
+    ("cancel appointment 123456", None, "cancel_appointment"),
+    ("I want to cancel my appointment 654321", None, "cancel_appointment"),
+    ("can you cancel appointment number one one two two three three", "book_appointment", "cancel_appointment"),
+    ("cancel my appointment", None, None),
+    ("cancel my appointment with doctor Chen tomorrow", None, None),
+
+    # Everything else goes to the LLM
+    ("yes", "book_appointment", None),
+    ("no", "book_appointment", None),
+    ("yeah that's right", "book_appointment", None),
+    ("I want to book an appointment with doctor Sarah Chen", None, None),
+    ("tomorrow at ten", "book_appointment", None),
+    ("my name is John Smith", "book_appointment", None),
+    ("what time is my appointment", None, None),
+    ("can I reschedule to next Tuesday", "reschedule_appointment", None),
+    ("which doctors are available on Friday", None, None),
+    ("I have a headache", "book_appointment", None),
+    ("any doctor is fine", "book_appointment", None),
+    ("two pm", "book_appointment", None),
+    ("actually make it three", "book_appointment", None),
+    ("who is available for pediatrics", None, None),
+    ("I'd like to see a dermatologist next week", None, None),
+]
+
+
+def previous_result(intent):
+    if intent is None:
+        return None
+    return {"intent": intent, "entities": {"doctor_name": None, "date": None}}
+
+
+def main():
+    classifier = LocalIntentClassifier()
+    correct = 0
+    local = 0
+    failures = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for transcript, previous, expected in CORPUS:
+            response = classifier.classify(transcript, previous_result(previous))
+            got = response.intent.value if response else None
+            if response:
+                local += 1
+            if got == expected:
+                correct += 1
+            else:
+                failures.append((transcript, previous, expected, got))
+
+    total = len(CORPUS)
+    expected_local = sum(1 for case in CORPUS if case[2] is not None)
+    print(f"📊 Accuracy: {correct}/{total} ({correct / total:.1%})")
+    print(f"⚡ Answered locally: {local}/{total} ({local / total:.1%}) - "
+          f"{expected_local} turns in the corpus are trivial")
+    for transcript, previous, expected, got in failures:
+        print(f"❌ {transcript!r} (after {previous}): expected {expected}, got {got}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
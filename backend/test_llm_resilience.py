@@ -0,0 +1,245 @@
+# test_llm_resilience.py
+"""
+Deadline, hedging, retry and circuit-breaker tests against a local fake
+OpenAI-compatible server (chat completions, streamed and not) with injected latency
+and errors. Prints tail latency with and without hedging; any failed check exits 1.
+
+    python test_llm_resilience.py
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from checks import CheckFailed, check, require, report
+
+REPLY = {
+    "intent": "book_appointment",
+    "entities": {"doctor_name": "Sarah Chen", "date": None, "time": None},
+    "confidence": 0.9,
+    "processed_response": "Sure, what date would you like to see Dr. Chen?"
+}
+
+
+class FakeOpenAIServer:
+    """
+    Minimal OpenAI-compatible /v1/chat/completions endpoint.
+    plan(request_number) -> (delay_seconds, status) decides how each request is answered.
+    """
+
+    def __init__(self):
+        self.plan = lambda number: (0.0, 200)
+        self.requests = 0
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b""):
+                        break
+                    name, _, value = header.decode().partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length)) if length else {}
+                self.requests += 1
+                delay, status = self.plan(self.requests)
+                await asyncio.sleep(delay)
+                if status != 200:
+                    self._send(writer, status, json.dumps({"error": {"message": "injected", "type": "server_error"}}))
+                elif body.get("stream"):
+                    await self._send_stream(writer)
+                    return
+                else:
+                    self._send(writer, 200, json.dumps(self._completion()))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Hung requests are cancelled when the server stops
+            pass
+        finally:
+            writer.close()
+
+    def _send(self, writer, status, payload):
+        data = payload.encode()
+        writer.write(f"HTTP/1.1 {status} X\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+
+    def _completion(self):
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": "fake",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(REPLY)}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 30, "total_tokens": 130}
+        }
+
+    async def _send_stream(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        content = json.dumps(REPLY)
+        for start in range(0, len(content), 12):
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                     "choices": [{"index": 0, "delta": {"content": content[start:start + 12]}, "finish_reason": None}]}
+            writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+        usage = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+                 "choices": [], "usage": {"prompt_tokens": 100, "completion_tokens": 30, "total_tokens": 130}}
+        writer.write(f"data: {json.dumps(usage)}\n\ndata: [DONE]\n\n".encode())
+        await writer.drain()
+
+
+def percentiles(values):
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+    return f"p50 {pick(50):6.0f} ms   p95 {pick(95):6.0f} ms   p99 {pick(99):6.0f} ms   max {values[-1]:6.0f} ms"
+
+
+async def tail_latency(server, client):
+    """3% of requests stall for 600 ms; hedging at p95 should hide them"""
+    from app.services.llm_resilience import ResilientCaller
+
+    rng = random.Random(21)
+    server.plan = lambda number: (0.6 if rng.random() < 0.03 else 0.02, 200)
+
+    async def request(timeout):
+        response = await client.chat.completions.create(
+            model="fake", messages=[{"role": "user", "content": "hi"}], timeout=timeout
+        )
+        return response.choices[0].message.content
+
+    results = {}
+    for label, hedge in (("no hedging", False), ("hedged", True)):
+        caller = ResilientCaller(f"test_{label.replace(' ', '_')}", hedge=hedge,
+                                 hedge_min_ms=30, hedge_default_ms=100, deadline_s=5)
+        latencies = []
+        for _ in range(20):
+            async def timed():
+                started = time.perf_counter()
+                await caller.call(request)
+                latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.gather(*(timed() for _ in range(10)))
+        results[label] = latencies
+        print(f"  {label:<11} {percentiles(latencies)}")
+
+    p99 = lambda values: sorted(values)[int(0.99 * (len(values) - 1))]
+    require(p99(results["hedged"]) < p99(results["no hedging"]) / 2,
+            "hedging did not cut p99 latency in half")
+
+
+async def retries(server, service):
+    """One 503 then success - the retry answers the turn"""
+    first = [True]
+
+    def plan(number):
+        if first[0]:
+            first[0] = False
+            return 0.0, 503
+        return 0.0, 200
+    server.plan = plan
+    result = await service.analyze_intent("I want to see doctor Chen", session_id="retry")
+    require(result.intent.value == "book_appointment", f"retry did not recover: {result}")
+
+
+async def deadline(server, service):
+    """Provider hangs - the turn ends at the deadline with the local fallback"""
+    from app.services.openai_service import FALLBACK_REPLY
+
+    server.plan = lambda number: (30.0, 200)
+    for streaming in (False, True):
+        texts = []
+        started = time.perf_counter()
+        result = await service.analyze_intent(
+            "book me for tomorrow at 2 pm", session_id=f"deadline_{streaming}",
+            on_response_text=(lambda text, intent: texts.append(text)) if streaming else None
+        )
+        elapsed = time.perf_counter() - started
+        require(elapsed < service.llm.deadline_s + 0.5, f"turn took {elapsed:.2f}s")
+        require(result.processed_response == FALLBACK_REPLY, f"unexpected reply {result.processed_response!r}")
+        require(result.entities.get("time") == "14:00", f"resolved time lost: {result.entities}")
+        if streaming:
+            require(texts == [FALLBACK_REPLY], f"fallback not streamed: {texts}")
+        print(f"  {'streamed' if streaming else 'plain':<11} fallback after {elapsed:.2f}s")
+
+
+async def breaker(server, service):
+    """Provider keeps failing - the breaker opens, skips the network, then recovers via a probe"""
+    from app.services.metrics import metrics
+
+    service.llm.breaker.record_success()
+    server.plan = lambda number: (0.0, 500)
+    for turn in range(3):
+        await service.analyze_intent("I'd like an appointment", session_id="breaker")
+    require(service.llm.breaker.state == "open", f"breaker is {service.llm.breaker.state}")
+
+    before = server.requests
+    started = time.perf_counter()
+    result = await service.analyze_intent("I'd like an appointment", session_id="breaker")
+    require(server.requests == before, "open breaker still called the provider")
+    require(time.perf_counter() - started < 0.05, "open breaker did not answer immediately")
+    require(result.confidence == 0.0, f"expected the fallback, got {result}")
+    require(metrics.counters.get("openai.breaker.rejected", 0) >= 1, "rejection not counted")
+
+    server.plan = lambda number: (0.0, 200)
+    await asyncio.sleep(service.llm.breaker.cooldown_s)
+    result = await service.analyze_intent("I'd like an appointment", session_id="breaker")
+    require(result.intent.value == "book_appointment", f"probe did not get through: {result}")
+    require(service.llm.breaker.state == "closed", f"breaker is {service.llm.breaker.state} after a good probe")
+
+
+async def main():
+    server = FakeOpenAIServer()
+    await server.start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "test")
+    os.environ["LLM_TURN_DEADLINE_S"] = "1.0"
+    os.environ["LLM_BREAKER_FAILURES"] = "5"
+    os.environ["LLM_BREAKER_COOLDOWN_S"] = "0.5"
+    os.environ["LOCAL_INTENT_ENABLED"] = "false"
+
+    from openai import AsyncOpenAI
+    from app.services.openai_service import OpenAIService
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = AsyncOpenAI(max_retries=0)
+    service = OpenAIService()
+    sections = [
+        ("Hedging cuts p99 latency (200 calls, 10 concurrent, 3% stall 600 ms)", lambda: tail_latency(server, client)),
+        ("Retry after a 503", lambda: retries(server, service)),
+        ("Provider hangs: fallback at the deadline (1.0s)", lambda: deadline(server, service)),
+        ("Circuit breaker opens, skips the provider and closes after a probe", lambda: breaker(server, service)),
+    ]
+    results = []
+    try:
+        for name, section in sections:
+            reason = None
+            try:
+                await section()
+            except CheckFailed as e:
+                reason = str(e)
+            results.append(check(name, reason is None, reason))
+    finally:
+        await client.close()
+        await service.backend.close()
+        await server.stop()
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
\ No newline at end of file
@@ -0,0 +1,70 @@
+# test_llm_stream.py
+"""
+Randomized tests for the streaming JSON parser: replies shaped like the intent JSON
+(with nasty strings, nesting and escapes) are fed in random chunk sizes and must give
+the same fields as json.loads, with processed_response text streamed exactly once.
+
+    python test_llm_stream.py [iterations]
+"""
+import os
+import sys
+import json
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.llm_stream import StreamingJSONParser
+from checks import check, require, failure, report
+
+CHARS = 'ab "\\/\n\t{}[],:é😀 '
+
+
+def random_string(rng):
+    return ''.join(rng.choice(CHARS) for _ in range(rng.randint(0, 20)))
+
+
+def random_value(rng, depth=0):
+    roll = rng.random()
+    if depth < 3 and roll < 0.2:
+        return {random_string(rng): random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))}
+    if depth < 3 and roll < 0.3:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 3))]
+    return rng.choice([random_string(rng), rng.randint(-1000, 1000), rng.random(), True, False, None])
+
+
+def parse_random_replies(rng, iterations):
+    """Random intent-shaped replies in random chunk sizes give the json.loads fields"""
+    for _ in range(iterations):
+        reply = {
+            "intent": random_string(rng),
+            "entities": random_value(rng),
+            "confidence": rng.random(),
+            "processed_response": random_string(rng),
+            random_string(rng): random_value(rng)
+        }
+        source = json.dumps(reply, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2]))
+
+        parser = StreamingJSONParser()
+        events = []
+        position = 0
+        while position < len(source):
+            size = rng.randint(1, 8)
+            events += parser.feed(source[position:position + size])
+            position += size
+
+        streamed = ''.join(value for kind, key, value in events if kind == "delta" and key == "processed_response")
+        require(parser.done, f"parser did not finish: {source!r}")
+        require(parser.values == reply, f"fields differ for {source!r}: {parser.values!r}")
+        require(streamed == reply["processed_response"], f"streamed {streamed!r} for {source!r}")
+        require(("field", "intent", reply["intent"]) in events, f"intent not reported for {source!r}")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = random.Random(19)
+    reason = failure(lambda: parse_random_replies(rng, iterations))
+    return report([check(f"StreamingJSONParser matches json.loads ({iterations} cases)", reason is None, reason)])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
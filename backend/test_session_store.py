@@ -0,0 +1,111 @@
+# test_session_store.py
+"""
+Behaviour tests for SessionStore: least-recently-used eviction over the session cap, the byte
+cap (including values grown in place and re-measured with touch()), idle TTL expiry, and
+release of a session's state by the services when the client disconnects, and a session
+evicted while its LLM call is in flight.
+
+    python test_session_store.py
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.models.intent_model import IntentType
+from app.services.llm_backend import ScriptedBackend
+from app.services.openai_service import OpenAIService
+from app.services.session_store import SessionStore
+from app.services.metrics import metrics
+from app.services.openai_service import openai_service
+from app.services.conversation_service import conversation_service
+from checks import check, report
+
+
+async def evicted_mid_call(service, session_id):
+    """The store drops the session (LRU/TTL) while analyze_intent waits on the LLM"""
+    call = asyncio.create_task(service.analyze_intent("I'd like to book an appointment", session_id))
+    await asyncio.sleep(0.01)
+    service.conversation_history.release(session_id)
+    return await call
+
+
+def main():
+    results = []
+
+    # Session cap: the least recently used session goes first
+    store = SessionStore("test_lru", max_sessions=3, ttl=60)
+    for session_id in ("a", "b", "c"):
+        store[session_id] = session_id
+    store["a"]  # a is now the most recently used
+    store["d"] = "d"
+    results.append(check("Over the session cap the least recently used session is evicted",
+                         list(store.entries) == ["c", "a", "d"] and "b" not in store, str(list(store.entries))))
+    results.append(check("LRU evictions are counted", metrics.counters.get("sessions.test_lru.evicted.lru") == 1))
+
+    # Byte cap, with sizes measured by len()
+    store = SessionStore("test_bytes", max_bytes=10, ttl=60, sizeof=len)
+    store["a"] = "aaaa"
+    store["b"] = "bbbb"
+    store["c"] = "ccc"
+    results.append(check("Over the byte cap the least recently used sessions are evicted",
+                         list(store.entries) == ["b", "c"] and store.bytes == 7, f"{list(store.entries)}, {store.bytes}"))
+
+    history = ["x"]
+    store["h"] = history
+    history.extend(["x"] * 8)  # grown in place, e.g. a conversation history
+    store.touch("h")
+    results.append(check("touch() re-measures a value grown in place and enforces the cap",
+                         list(store.entries) == ["h"] and store.bytes == 9, f"{list(store.entries)}, {store.bytes}"))
+
+    store["big"] = "z" * 50
+    results.append(check("A single session larger than the cap is kept on its own",
+                         list(store.entries) == ["big"] and store.bytes == 50, f"{list(store.entries)}, {store.bytes}"))
+
+    # Idle expiry
+    store = SessionStore("test_ttl", ttl=0.05)
+    store["a"] = "a"
+    store["b"] = "b"
+    time.sleep(0.03)
+    store.get("a")  # keeps a alive
+    time.sleep(0.03)
+    results.append(check("Sessions idle for longer than the TTL expire, used ones stay",
+                         "b" not in store and "a" in store and store.stats()["live"] == 1, str(list(store.entries))))
+    time.sleep(0.06)
+    stats = store.stats()
+    results.append(check("Expired sessions free their bytes", stats["live"] == 0 and stats["bytes"] == 0, str(stats)))
+
+    # Release
+    store = SessionStore("test_release", ttl=60)
+    store["a"] = {"history": ["hello"]}
+    store["b"] = "b"
+    released = store.release("a")
+    results.append(check("release() drops the session and its bytes",
+                         released and "a" not in store and store.bytes == store.sizeof("b"), str(store.stats())))
+    results.append(check("Releasing an unknown session is a no-op", not store.release("missing")))
+
+    # What deepgram_service does when the client disconnects
+    session_id = "disconnected-session"
+    openai_service.conversation_history[session_id] = [{"role": "system", "content": "prompt"}]
+    conversation_service.get_state(session_id)
+    openai_service.clear_conversation_history(session_id)
+    conversation_service.release(session_id)
+    results.append(check("History and slot-filling state are released on disconnect",
+                         session_id not in openai_service.conversation_history
+                         and session_id not in conversation_service.active_conversations))
+
+    service = OpenAIService(ScriptedBackend(latency_ms=100, tokens_per_second=0))
+    service.streaming = False
+    service.local_classifier = None
+    result = asyncio.run(evicted_mid_call(service, "evicted"))
+    results.append(check("A session evicted during its LLM call still gets the reply, and stays evicted",
+                         result.intent == IntentType.BOOK_APPOINTMENT and "evicted" not in service.conversation_history,
+                         str(result)))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# test_slot_extractors.py
+"""
+Table tests for the local patient-name extractor on unformatted (lowercase) transcripts: a name
+is taken only after an explicit introduction, every other short reply is left to the LLM, and
+answer_locally() never completes a name slot from one of them.
+
+    python test_slot_extractors.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.models.intent_model import IntentType
+from app.services.conversation_service import ConversationService
+from app.services.slot_extractors import extract_patient_name, extract_slot
+from checks import check, report
+
+NAMES = [
+    ("my name is john smith", "John Smith"),
+    ("my name's tom hardy", "Tom Hardy"),
+    ("yes my name is ann lee.", "Ann Lee"),
+    ("call me mike", "Mike"),
+    ("the name is sarah o'neil", "Sarah O'neil"),
+    ("it's mary jones", "Mary Jones"),
+    ("this is mary-kate olsen", "Mary-kate Olsen"),
+    ("My name is John Smith", "John Smith"),
+]
+
+# Replies to "may I have your full name?" that are not a name
+NOT_NAMES = [
+    "mary jones",  # bare - possibly a name, but the LLM decides
+    "John Smith",
+    "yep", "nope", "huh", "asap", "next week", "emergency", "chest pain",
+    "it is urgent", "it's chest pain", "it's for next week", "it's an emergency", "this is urgent",
+    "hold on", "sounds good", "i don't know", "tuesday", "i'm not sure", "um",
+    "can you repeat that", "one moment", "that's right", "my name is", "it's complicated",
+    "my name is john 123", "my name is john paul george ringo",
+]
+
+
+def main():
+    results = []
+
+    for transcript, expected in NAMES:
+        name = extract_patient_name(transcript)
+        results.append(check(f"{transcript!r} gives {expected!r}", name == expected, repr(name)))
+
+    wrong = {transcript: extract_patient_name(transcript) for transcript in NOT_NAMES}
+    wrong = {transcript: name for transcript, name in wrong.items() if name is not None}
+    results.append(check(f"{len(NOT_NAMES)} replies that are not introductions give no name", not wrong, str(wrong)))
+    results.append(check("extract_slot returns nothing for them",
+                         not any(extract_slot("patient_name", transcript) for transcript in NOT_NAMES)))
+
+    # Waiting for the name: a symptom goes to the LLM instead of being recorded as the patient
+    service = ConversationService(enabled=True)
+    state = service.get_state("waiting-for-name")
+    state.current_intent = IntentType.BOOK_APPOINTMENT
+    state.collected_entities = {"doctor_name": "Sarah Chen"}
+    state.missing_requirements = ["patient_name", "date", "time"]
+    results.append(check("answer_locally leaves a non-name reply to the LLM",
+                         service.answer_locally("chest pain", "waiting-for-name") is None))
+    answer = service.answer_locally("my name is john smith", "waiting-for-name")
+    results.append(check("answer_locally fills the name from an introduction",
+                         answer is not None and answer.entities.get("patient_name") == "John Smith"
+                         and answer.entities.get("doctor_name") == "Sarah Chen", str(answer)))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
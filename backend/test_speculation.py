@@ -0,0 +1,109 @@
+# test_speculation.py
+"""
+Behaviour tests for IntentSpeculator with OpenAIService on the offline scripted backend:
+a speculation on the committed text is adopted without a second call, a changed transcript or
+a history that moved on discards it, close() cancels a call in flight, and speculating never
+writes to the session history.
+
+    python test_speculation.py
+"""
+import os
+import sys
+import asyncio
+import functools
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.llm_backend import ScriptedBackend
+from app.services.openai_service import OpenAIService
+from app.services.speculation import IntentSpeculator
+from checks import check, report
+
+BOOKING = "I want to book an appointment with doctor Chen"
+STABLE_MS = 10
+
+
+class CountingBackend(ScriptedBackend):
+    """Scripted replies, counting the completions requested"""
+
+    def __init__(self, latency_ms=0.0):
+        super().__init__(latency_ms=latency_ms, tokens_per_second=0)
+        self.calls = 0
+
+    async def complete(self, messages, timeout, max_tokens=500, model=None):
+        self.calls += 1
+        return await super().complete(messages, timeout, max_tokens=max_tokens, model=model)
+
+
+def speculator_for(service, session_id):
+    return IntentSpeculator(functools.partial(service.speculate, session_id=session_id), stable_ms=STABLE_MS)
+
+
+async def main():
+    results = []
+
+    # Hit: the committed text is the one speculated on
+    backend = CountingBackend()
+    service = OpenAIService(backend)
+    service.streaming = False
+    speculator = speculator_for(service, "hit")
+    speculator.observe(BOOKING)
+    await asyncio.sleep(STABLE_MS / 1000 + 0.05)
+    results.append(check("A stable transcript starts one speculative call",
+                         speculator.started == 1 and backend.calls == 1, f"{speculator.started}, {backend.calls}"))
+    results.append(check("Speculating does not create or change the session history",
+                         "hit" not in service.conversation_history))
+    speculation = speculator.take(BOOKING)
+    result = await service.analyze_intent(BOOKING, "hit", speculation=speculation)
+    results.append(check("The speculative result is adopted without a second call",
+                         speculator.hits == 1 and backend.calls == 1 and result.intent == "book_appointment",
+                         f"{speculator.hits}, {backend.calls}, {result.intent}"))
+    history = service.conversation_history["hit"]
+    results.append(check("The adopted turn is recorded in the history once",
+                         [message["role"] for message in history] == ["system", "user", "assistant"],
+                         str([message["role"] for message in history])))
+
+    # Speculating on an existing session leaves its history as it was
+    before = list(history)
+    speculator.observe("and on Friday")
+    await asyncio.sleep(STABLE_MS / 1000 + 0.05)
+    results.append(check("A speculation on a running session leaves its history alone",
+                         service.conversation_history["hit"] == before and len(before) == 3))
+
+    # Miss: the transcript changed before the endpoint
+    speculation = speculator.take("and on Friday morning")
+    results.append(check("A different committed text discards the speculation",
+                         speculation is None and speculator.misses == 1 and speculator.wasted_tokens > 0,
+                         f"{speculator.misses}, {speculator.wasted_tokens}"))
+
+    # Miss: another turn was committed after the speculation started
+    speculator.observe("on Friday at ten")
+    await asyncio.sleep(STABLE_MS / 1000 + 0.05)
+    speculation = speculator.take("on Friday at ten")
+    await service.analyze_intent("actually make it Thursday", "hit")
+    calls = backend.calls
+    await service.analyze_intent("on Friday at ten", "hit", speculation=speculation)
+    results.append(check("A speculation made on an older history is discarded and the call made again",
+                         speculator.misses == 2 and speculator.hits == 1 and backend.calls > calls,
+                         f"{speculator.misses}, {speculator.hits}, {backend.calls - calls}"))
+    speculator.close()
+
+    # Cancel: the session ends while the call is still in flight
+    backend = CountingBackend(latency_ms=1000)
+    service = OpenAIService(backend)
+    speculator = speculator_for(service, "cancel")
+    speculator.observe(BOOKING)
+    await asyncio.sleep(STABLE_MS / 1000 + 0.05)
+    task = speculator.current.task
+    speculator.close()
+    await asyncio.sleep(0)
+    results.append(check("close() cancels the call in flight and counts its prompt as wasted",
+                         task.cancelled() and speculator.misses == 1 and speculator.wasted_tokens > 0
+                         and speculator.current is None, f"{speculator.misses}, {speculator.wasted_tokens}"))
+    results.append(check("A cancelled speculation leaves no history behind", "cancel" not in service.conversation_history))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,157 @@
+# test_speech_pipeline.py
+"""
+Behaviour tests for SentenceSplitter (abbreviations, initials, short fragments merged, streamed
+text split like the whole reply) and SpeechPipeline with a stub TTS: audio reaches the client in
+sentence order when later sentences finish synthesizing first, and a reply whose every sentence
+fails sends no speech_start/speech_end pair.
+
+    python test_speech_pipeline.py
+"""
+import os
+import sys
+import random
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.speech_pipeline import SentenceSplitter, SpeechPipeline, split_sentences
+from checks import check, report
+
+SPLITS = [
+    ("Dr. Sarah Chen is available on Monday. Which time works for you?",
+     ["Dr. Sarah Chen is available on Monday.", "Which time works for you?"]),
+    ("Your doctor is J. R. Smith at the main clinic. Anything else?",
+     ["Your doctor is J. R. Smith at the main clinic.", "Anything else?"]),
+    ("Bring your ID, e.g. a passport or license. See you then!",
+     ["Bring your ID, e.g. a passport or license.", "See you then!"]),
+    ("Mrs. Lee and Prof. Adams are both free. Who would you prefer?",
+     ["Mrs. Lee and Prof. Adams are both free.", "Who would you prefer?"]),
+    ("Hi. How can I help you today?", ["Hi. How can I help you today?"]),  # shorter than min_chars: merged
+    ("Sure! Booked.", ["Sure! Booked."]),
+    ('He said "book it." Then he left the room.', ['He said "book it."', "Then he left the room."]),
+    ("What date would you like? Monday or Tuesday?", ["What date would you like?", "Monday or Tuesday?"]),
+    ("Your appointment ID is 654321", ["Your appointment ID is 654321"]),  # no punctuation: flushed at the end
+]
+
+REPLY = ("I'd be happy to help! Dr. Sarah Chen has openings on Monday. Dr. Emily Watson is free on "
+         "Tuesday afternoon. Which one would you like? I can also check J. R. Smith's schedule.")
+
+
+class ClientState:
+    name = "CONNECTED"
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.client_state = ClientState()
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    def types(self):
+        return [message["type"] if isinstance(message, dict) else "audio" for message in self.sent]
+
+
+class StubTTS:
+    """Streams two chunks per sentence after delays[sentence] seconds; sentences in failing raise"""
+
+    streaming = True
+    output_format = "mp3_44100_128"
+
+    def __init__(self, delays=None, failing=()):
+        self.delays = delays or {}
+        self.failing = set(failing)
+        self.finished = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def synthesize(self, sentence):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(sentence, 0))
+            if sentence in self.failing:
+                raise ConnectionError("ElevenLabs unavailable")
+            self.finished.append(sentence)
+            yield f"{sentence}|1".encode()
+            yield f"{sentence}|2".encode()
+        finally:
+            self.in_flight -= 1
+
+
+def streamed(text, rng):
+    """The text fed in random pieces, as the LLM streams it"""
+    splitter = SentenceSplitter()
+    sentences = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 12)
+        sentences += splitter.feed(text[position:position + size])
+        position += size
+    return sentences + splitter.flush()
+
+
+async def speak(tts, text, slots=2):
+    websocket = RecordingWebSocket()
+    speech = SpeechPipeline(websocket, tts, slots=asyncio.Semaphore(slots))
+    speech.feed(text)
+    stats = await speech.close()
+    return websocket, stats
+
+
+async def main():
+    results = []
+
+    for text, expected in SPLITS:
+        sentences = split_sentences(text)
+        results.append(check(f"{text!r} splits into {len(expected)}", sentences == expected, str(sentences)))
+
+    rng = random.Random(7)
+    texts = [text for text, _ in SPLITS] + [REPLY]
+    differing = [text for text in texts for _ in range(50) if streamed(text, rng) != split_sentences(text)]
+    results.append(check("Streamed text in random pieces splits like the whole reply", not differing, str(differing[:1])))
+
+    # The first sentence is the slowest to synthesize - its audio still goes out first
+    sentences = split_sentences(REPLY)
+    tts = StubTTS(delays={sentences[0]: 0.1, sentences[1]: 0.05})
+    websocket, stats = await speak(tts, REPLY)
+    audio = [message.decode().split("|") for message in websocket.sent if isinstance(message, bytes)]
+    headers = [message for message in websocket.sent if isinstance(message, dict) and message["type"] == "speech_chunk"]
+    results.append(check("Synthesis finished out of order", tts.finished[:2] != sentences[:2], str(tts.finished[:2])))
+    results.append(check("Audio is sent in sentence order, chunk by chunk",
+                         audio == [[sentence, part] for sentence in sentences for part in ("1", "2")], str(audio[:3])))
+    results.append(check("Chunk headers number the audio in order",
+                         [header["seq"] for header in headers] == list(range(len(audio)))
+                         and [header["sentence"] for header in headers] == sorted(header["sentence"] for header in headers)))
+    results.append(check("speech_start comes before the audio and speech_end after it",
+                         websocket.types()[0] == "speech_start" and websocket.types()[-1] == "speech_end"
+                         and websocket.types().count("speech_start") == 1, str(websocket.types()[:2])))
+    results.append(check("No more syntheses in flight than there are slots", tts.max_in_flight <= 2, str(tts.max_in_flight)))
+    results.append(check("close() returns the playback stats",
+                         stats["sentences"] == len(sentences) and stats["chunks"] == len(audio), str(stats)))
+
+    # Every sentence fails: nothing to play, and the caller reports the error
+    tts = StubTTS(failing=sentences)
+    websocket, stats = await speak(tts, REPLY)
+    results.append(check("When every sentence fails no speech_start/speech_end is sent",
+                         websocket.sent == [] and stats["chunks"] == 0, f"{websocket.types()}, {stats}"))
+
+    # One sentence fails: the others are still spoken between one start and one end
+    tts = StubTTS(failing=sentences[1:2])
+    websocket, stats = await speak(tts, REPLY)
+    results.append(check("A failed sentence is skipped and the rest is spoken",
+                         websocket.types().count("speech_start") == 1 and websocket.types()[-1] == "speech_end"
+                         and stats["chunks"] == 2 * (len(sentences) - 1), f"{websocket.types()}, {stats}"))
+
+    websocket, stats = await speak(StubTTS(), "")
+    results.append(check("An empty reply sends nothing and returns None", stats is None and websocket.sent == []))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,108 @@
+# test_text_normalizer.py
+"""
+Table tests for TranscriptNormalizer (number words, honorifics, names after a title or an
+introduction, sentence case) and a property test: one normalizer fed a session's interim
+results - each extending, revising or shortening the previous one - gives exactly what a fresh
+normalizer gives for every interim.
+
+    python test_text_normalizer.py [iterations]
+"""
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.text_normalizer import TranscriptNormalizer
+from checks import check, require, failure, report
+
+CASES = [
+    # Numbers
+    ("one two three four five six", "123456"),
+    ("my id is one two three four five six.", "My id is 123456."),
+    ("twenty five", "25"),
+    ("twenty", "20"),
+    ("ninety nine problems", "99 problems"),
+    ("twenty one two", "21 2"),
+    ("at ten thirty", "At 10 30"),
+    ("it is four. then what", "It is 4. Then what"),
+    # Honorifics and "I"
+    ("dr. smith is fine", "Dr. Smith is fine"),
+    ("mrs. brown and mr. green", "Mrs. Brown and Mr. Green"),
+    ("i'd like to see dr chen", "I'd like to see Dr Chen"),
+    ("yes. i'm here", "Yes. I'm here"),
+    # Names after a title or an introduction, ended by a stop word
+    ("i want to see doctor chen tomorrow", "I want to see doctor Chen tomorrow"),
+    ("i want to see doctor chen's office", "I want to see doctor Chen's office"),
+    ("doctor chen. yes please", "Doctor Chen. Yes please"),
+    ("professor ada lovelace please", "Professor Ada Lovelace please"),
+    ("my name is john smith and i need help", "My name is John Smith and I need help"),
+    ("my name is sean o'brien", "My name is Sean O'Brien"),
+    ("", ""),
+]
+
+VOCABULARY = [
+    "one", "two", "three", "five", "six", "nine", "zero", "ten", "twelve", "twenty", "thirty", "ninety",
+    "doctor", "dr", "dr.", "mrs", "professor", "my", "name", "is", "call", "me", "i", "i'm", "i'd",
+    "chen", "chen's", "smith", "o'brien", "john", "sarah", "and", "the", "at", "tomorrow", "please",
+    "yes", "appointment", "book", "want", "to", "see", "id", "on", "tuesday", "fine",
+]
+PUNCTUATION = ["", "", "", "", ".", ",", "?", "!"]
+
+
+def random_token(rng):
+    return rng.choice(VOCABULARY) + rng.choice(PUNCTUATION)
+
+
+def interims(rng):
+    """Interim results of one utterance as Deepgram sends them"""
+    tokens = []
+    for _ in range(rng.randint(1, 40)):
+        roll = rng.random()
+        if roll < 0.6 or not tokens:
+            tokens = tokens + [random_token(rng) for _ in range(rng.randint(1, 3))]  # extends
+        elif roll < 0.85:
+            keep = rng.randint(0, len(tokens) - 1)
+            tokens = tokens[:keep] + [random_token(rng) for _ in range(rng.randint(1, 3))]  # revised tail
+        else:
+            tokens = tokens[:rng.randint(0, len(tokens))]  # shorter
+        yield " ".join(tokens)
+
+
+def property_incremental_matches_fresh(rng, iterations):
+    reused = 0
+    for _ in range(iterations):
+        normalizer = TranscriptNormalizer()
+        for text in interims(rng):
+            incremental = normalizer.normalize(text)
+            fresh = TranscriptNormalizer().normalize(text)
+            require(incremental == fresh, f"{text!r}: incremental {incremental!r}, fresh {fresh!r}")
+        reused += normalizer.tokens_reused
+    require(reused > 0, "no token prefix was ever reused")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    results = []
+
+    for text, expected in CASES:
+        normalized = TranscriptNormalizer().normalize(text)
+        results.append(check(f"{text!r} -> {expected!r}", normalized == expected, repr(normalized)))
+
+    normalizer = TranscriptNormalizer()
+    normalizer.normalize("i want to see doctor")
+    normalizer.normalize("i want to see doctor chen on tuesday")
+    results.append(check("An interim extending the previous one only processes the new tokens",
+                         normalizer.tokens_reused == 5 and normalizer.tokens_processed == 8,
+                         f"{normalizer.tokens_reused} reused, {normalizer.tokens_processed} processed"))
+
+    rng = random.Random(11)
+    reason = failure(lambda: property_incremental_matches_fresh(rng, iterations))
+    results.append(check(f"Incremental output equals fresh normalization on revised interims ({iterations} sessions)",
+                         reason is None, reason))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
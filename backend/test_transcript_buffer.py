@@ -0,0 +1,151 @@
+# test_transcript_buffer.py
+"""
+Property tests for the segment-based TranscriptBuffer.
+Random Deepgram-like result streams (interims, finals, revised finals, late replays)
+are fed to the buffer and checked against a simple reference model.
+
+    python test_transcript_buffer.py [iterations]
+"""
+import io
+import os
+import sys
+import random
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.transcript_buffer import TranscriptBuffer
+from checks import check, require, failure, report
+
+WORDS = ["i", "want", "to", "book", "doctor", "chen", "tomorrow", "at", "ten", "yes", "my", "name", "is", "john"]
+
+
+def random_text(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 6)))
+
+
+def generate_stream(rng):
+    """
+    Results for consecutive audio windows, with commit markers carrying the text the
+    buffer must return at that point (latest final per window, in audio order).
+    """
+    events = []  # ("result", text, is_final, start, duration) | ("commit", expected)
+    audio = 0.0
+    expected_windows = []
+
+    for _ in range(rng.randint(1, 30)):
+        start = round(audio, 2)
+        duration = round(rng.uniform(0.3, 2.0), 2)
+
+        # Interims for the window, then its final - sometimes revised by a second final
+        for _ in range(rng.randint(0, 4)):
+            events.append(("result", random_text(rng), False, start, round(duration * rng.random(), 2)))
+        final_text = random_text(rng)
+        events.append(("result", final_text, True, start, duration))
+        if rng.random() < 0.2:
+            final_text = random_text(rng)
+            events.append(("result", final_text, True, start, duration))
+        expected_windows.append(final_text)
+        audio += duration
+
+        if rng.random() < 0.3:
+            events.append(("commit", " ".join(expected_windows)))
+            committed_start, committed_duration = start, duration
+            expected_windows = []
+            # Late replay of a final that was already committed must be ignored
+            if rng.random() < 0.3:
+                events.append(("result", random_text(rng), True, committed_start, committed_duration))
+
+    if expected_windows:
+        events.append(("commit", " ".join(expected_windows)))
+    return events
+
+
+def property_commits_match_reference(rng):
+    """take_sentence() returns exactly the latest final of each window since the last commit"""
+    buffer = TranscriptBuffer()
+    for event in generate_stream(rng):
+        if event[0] == "result":
+            _, text, is_final, start, duration = event
+            buffer.add_transcript(text, is_final, start, duration)
+        else:
+            sentence = buffer.take_sentence()
+            require(sentence == event[1], f"committed {sentence!r}, expected {event[1]!r}")
+            require(not buffer.has_text and buffer.word_count == 0, "buffer not empty after commit")
+
+
+def property_word_count_is_incremental(rng):
+    """word_count always equals the words of the pending final text"""
+    buffer = TranscriptBuffer()
+    for event in generate_stream(rng):
+        if event[0] == "result":
+            _, text, is_final, start, duration = event
+            buffer.add_transcript(text, is_final, start, duration)
+        else:
+            buffer.take_sentence()
+        require(buffer.word_count == len(buffer.buffer.split()), "word_count out of sync")
+
+
+def property_interims_never_committed(rng):
+    """Interim-only audio never reaches take_sentence()"""
+    buffer = TranscriptBuffer()
+    for index in range(rng.randint(1, 20)):
+        buffer.add_transcript(random_text(rng), False, index * 0.5, 0.4)
+    require(buffer.take_sentence() is None, "interim text was committed")
+
+
+def property_dedupe_window_is_bounded(rng):
+    """Memory for duplicate detection does not grow with the session"""
+    buffer = TranscriptBuffer(dedupe_window=8)
+    for index in range(500):
+        buffer.add_transcript(f"{random_text(rng)} {index}", True, index * 1.0, 0.9)
+        buffer.take_sentence()
+    require(len(buffer.recent) == 8, f"dedupe window grew to {len(buffer.recent)}")
+
+
+def property_untimed_duplicates_dropped(rng):
+    """Without timestamps the same sentence twice in a row is committed once"""
+    buffer = TranscriptBuffer()
+    text = random_text(rng)
+    buffer.add_transcript(text, True)
+    first = buffer.take_sentence()
+    buffer.add_transcript(text, True)
+    require(first == text and buffer.take_sentence() is None, "untimed duplicate committed twice")
+
+
+def property_repeated_words_over_new_audio_kept(rng):
+    """The patient saying "yes" twice (different audio) is two sentences"""
+    buffer = TranscriptBuffer()
+    buffer.add_transcript("yes", True, 1.0, 0.5)
+    first = buffer.take_sentence()
+    buffer.add_transcript("yes", True, 4.0, 0.5)
+    require(first == "yes" and buffer.take_sentence() == "yes", "repeated answer dropped")
+
+
+PROPERTIES = [
+    property_commits_match_reference,
+    property_word_count_is_incremental,
+    property_interims_never_committed,
+    property_dedupe_window_is_bounded,
+    property_untimed_duplicates_dropped,
+    property_repeated_words_over_new_audio_kept,
+]
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(13)
+    results = []
+    for prop in PROPERTIES:
+        def run():
+            # Silence the buffer's per-update logging
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(iterations):
+                    prop(rng)
+        reason = failure(run)
+        results.append(check(f"{prop.__name__} ({iterations} cases)", reason is None, reason))
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
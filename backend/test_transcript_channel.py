@@ -0,0 +1,151 @@
+# test_transcript_channel.py
+"""
+Behaviour tests for TranscriptChannel: transcript_delta computation against the last text the
+client acked (a client that misses a delta still ends up with the right line), finals starting
+a new line, and interim rate limiting.
+
+    python test_transcript_channel.py
+"""
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.transcript_channel import TranscriptChannel
+from checks import check, report
+
+
+class ClientState:
+    name = "CONNECTED"
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.client_state = ClientState()
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class Client:
+    """The browser side (DocTalkApp.js): applies deltas to their base line and acks them"""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.lines = {0: ""}
+        self.text = ""
+
+    def receive(self, message, ack=True):
+        if message["type"] == "transcript":
+            self.lines = {message["seq"]: ""}
+            self.text = ""
+            return
+        base = self.lines.get(message["base"])
+        if base is None:
+            return
+        self.text = base[:message["keep"]] + message["text"]
+        self.lines = {seq: line for seq, line in self.lines.items() if seq >= message["base"]}
+        self.lines[message["seq"]] = self.text
+        if ack:
+            self.channel.ack(message["seq"])
+
+
+async def main():
+    results = []
+
+    websocket = RecordingWebSocket()
+    channel = TranscriptChannel(websocket, max_rate=0)
+    await channel.interim("I would")
+    first = websocket.sent[-1]
+    results.append(check("First delta carries the whole line",
+                         (first["seq"], first["base"], first["keep"], first["text"]) == (1, 0, 0, "I would"), str(first)))
+
+    await channel.interim("I would like")
+    second = websocket.sent[-1]
+    results.append(check("Without an ack the next delta is still based on the empty line",
+                         (second["base"], second["keep"], second["text"]) == (0, 0, "I would like"), str(second)))
+
+    channel.ack(2)
+    await channel.interim("I would like to book")
+    third = websocket.sent[-1]
+    results.append(check("After an ack only the new words are sent",
+                         (third["base"], third["keep"], third["text"]) == (2, 12, " to book"), str(third)))
+
+    channel.ack(3)
+    await channel.interim("I would like to cook")
+    fourth = websocket.sent[-1]
+    results.append(check("A revised word keeps only the common prefix of the acked line",
+                         (fourth["base"], fourth["keep"], fourth["text"]) == (3, 16, "cook"), str(fourth)))
+
+    channel.ack(4)
+    channel.ack(3)  # arrives late
+    await channel.interim("I would like to cook it")
+    fifth = websocket.sent[-1]
+    results.append(check("A stale ack does not move the base back", fifth["base"] == 4, str(fifth)))
+
+    # The client applies what it receives, but one delta is lost on the way
+    websocket = RecordingWebSocket()
+    channel = TranscriptChannel(websocket, max_rate=0)
+    client = Client(channel)
+    updates = ["my name", "my name is", "my name is John", "my name is John Smith", "my name is Jon Smith"]
+    for index, text in enumerate(updates):
+        await channel.interim(text)
+        if index != 2:
+            client.receive(websocket.sent[-1])
+        results.append(check(f"Client shows {text!r}" if index != 2 else "Client skips a lost delta",
+                             client.text == (text if index != 2 else updates[1]), repr(client.text)))
+
+    # Acks that arrive late: deltas stay based on what the client has
+    websocket = RecordingWebSocket()
+    channel = TranscriptChannel(websocket, max_rate=0)
+    client = Client(channel)
+    held = []
+    for text in ("next", "next Tuesday", "next Tuesday at", "next Tuesday at ten"):
+        await channel.interim(text)
+        client.receive(websocket.sent[-1], ack=False)
+        held.append(websocket.sent[-1]["seq"])
+        if len(held) == 2:
+            channel.ack(held.pop(0))
+    results.append(check("Delayed acks still give the right line", client.text == "next Tuesday at ten",
+                         repr(client.text)))
+
+    # A final starts a new line; the next deltas are based on it
+    await channel.final("next Tuesday at ten.")
+    final = websocket.sent[-1]
+    client.receive(final)
+    await channel.interim("please")
+    delta = websocket.sent[-1]
+    client.receive(delta)
+    results.append(check("Final is a full transcript message and the base of the next line",
+                         final["type"] == "transcript" and final["is_final"] and delta["base"] == final["seq"]
+                         and delta["keep"] == 0 and client.text == "please", f"{final}, {delta}"))
+
+    # Rate limiting: a burst inside one window is coalesced into the newest text
+    websocket = RecordingWebSocket()
+    channel = TranscriptChannel(websocket, max_rate=20)
+    words = "could I see doctor Chen on Friday morning".split()
+    for count in range(1, len(words) + 1):
+        await channel.interim(" ".join(words[:count]))
+    immediate = len(websocket.sent)
+    await asyncio.sleep(0.08)
+    results.append(check("Burst sends the first update at once and the newest after the window",
+                         immediate == 1 and len(websocket.sent) == 2
+                         and websocket.sent[-1]["text"] == " ".join(words), str(websocket.sent)))
+    stats = channel.stats()
+    results.append(check("Coalesced updates are counted as saved",
+                         stats["results"] == len(words) and stats["messages_saved"] == len(words) - 2, str(stats)))
+
+    await channel.interim("could I see doctor Chen on Friday morning please")
+    await channel.final("Could I see Doctor Chen on Friday morning, please?")
+    await asyncio.sleep(0.08)
+    results.append(check("A final supersedes the interim waiting for the window",
+                         [message["type"] for message in websocket.sent[2:]] == ["transcript"], str(websocket.sent[2:])))
+    channel.close()
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,125 @@
+# test_tts_cache.py
+"""
+Behaviour tests for TTSCache and its use by ElevenLabsService (stub client, temporary cache
+directory): memory hits and LRU eviction, only warm phrases written to disk and served from it
+after a restart, other files pruned at startup, and record() storing a sentence only when its
+stream completed.
+
+    python test_tts_cache.py
+"""
+import os
+import sys
+import shutil
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services.elevenlabs_service import elevenlabs_service
+from app.services.tts_cache import TTSCache, TTS_CACHE_WARM_PHRASES
+from checks import check, report
+
+
+class StubTextToSpeech:
+    def __init__(self):
+        self.requests = []
+
+    def convert_as_stream(self, text, **kwargs):
+        self.requests.append(text)
+        return iter([text.encode(), b"|end"])
+
+
+class StubClient:
+    def __init__(self):
+        self.text_to_speech = StubTextToSpeech()
+
+
+def files(directory):
+    return sorted(name for name in os.listdir(directory))
+
+
+def cut_off(cache, key, chunks):
+    """A consumer that stops after the first chunk (barge-in)"""
+    stream = cache.record(key, iter(chunks))
+    next(stream)
+    stream.close()
+
+
+def broken(cache, key):
+    """ElevenLabs drops the connection mid-sentence"""
+    def chunks():
+        yield b"first"
+        raise ConnectionError("stream reset")
+    try:
+        list(cache.record(key, chunks()))
+    except ConnectionError:
+        pass
+
+
+async def main():
+    results = []
+    directory = tempfile.mkdtemp(prefix="tts_cache_test_")
+
+    # Memory tier: hits and misses, LRU eviction over the byte budget
+    cache = TTSCache(max_bytes=10, directory="")
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    results.append(check("A stored sentence is a hit, an unknown one a miss",
+                         cache.get("a") == b"aaaa" and cache.get("x") is None
+                         and (cache.hits, cache.misses) == (1, 1), str(cache.stats())))
+    cache.put("c", b"cccc")  # "b" is now the least recently used
+    results.append(check("Over the byte budget the least recently used entry is evicted",
+                         cache.get("b") is None and cache.get("a") == b"aaaa" and cache.size == 8, str(cache.stats())))
+    cache.put("big", b"z" * 11)
+    results.append(check("An entry larger than the budget is not kept", cache.get("big") is None))
+
+    # Disk tier: only warm phrases are written
+    cache = TTSCache(directory=directory, persistent=["warm"])
+    cache.put("warm", b"hello")
+    cache.put("patient", b"Thank you, John! Your appointment ID is 123456.")
+    cache.put("warmed-later", b"welcome", persist=True)
+    results.append(check("Only warm phrases are written to disk",
+                         files(directory) == ["warm.audio", "warmed-later.audio"], str(files(directory))))
+
+    restarted = TTSCache(directory=directory, persistent=["warm"])
+    results.append(check("After a restart warm phrases are served from disk",
+                         await restarted.lookup("warm") == b"hello" and await restarted.lookup("patient") is None))
+    results.append(check("Files that are not warm phrases are removed at startup",
+                         files(directory) == ["warm.audio"], str(files(directory))))
+
+    # record(): only a stream that completed is stored
+    cache = TTSCache(directory=directory, persistent=["warm", "cut", "broken"])
+    stored = list(cache.record("whole", iter([b"one ", b"", b"two"])))
+    results.append(check("A completed stream passes every chunk through and is stored",
+                         stored == [b"one ", b"", b"two"] and cache.get("whole") == b"one two"))
+    cut_off(cache, "cut", [b"first", b"second"])
+    results.append(check("A stream cut off by the consumer is not stored",
+                         cache.get("cut") is None and "cut.audio" not in files(directory)))
+    broken(cache, "broken")
+    results.append(check("A stream that fails mid-sentence is not stored",
+                         cache.get("broken") is None and "broken.audio" not in files(directory)))
+
+    # ElevenLabsService: a per-patient sentence is replayed from memory and never written to disk
+    # (the cache below only keeps the service's warm phrases, so the files above are pruned)
+    client = StubClient()
+    elevenlabs_service.client = client
+    elevenlabs_service.streaming = True
+    elevenlabs_service.cache = TTSCache(directory=directory, persistent=elevenlabs_service._warm_keys())
+    sentence = "Thank you, John Smith! Your appointment ID is 654321."
+    first = b"".join([chunk async for chunk in elevenlabs_service.synthesize(sentence)])
+    second = b"".join([chunk async for chunk in elevenlabs_service.synthesize(sentence)])
+    results.append(check("A repeated sentence is synthesized once and replayed from the cache",
+                         first == second and client.text_to_speech.requests == [sentence], str(client.text_to_speech.requests)))
+    results.append(check("Sentences with patient details stay off the disk", files(directory) == [],
+                         str(files(directory))))
+    warm = TTS_CACHE_WARM_PHRASES[0]
+    b"".join([chunk async for chunk in elevenlabs_service.synthesize(warm)])
+    results.append(check("A warm phrase synthesized during a session is written to disk",
+                         f"{elevenlabs_service._cache_key(warm)}.audio" in files(directory), str(files(directory))))
+
+    shutil.rmtree(directory)
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
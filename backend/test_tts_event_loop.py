@@ -0,0 +1,115 @@
+# test_tts_event_loop.py
+"""
+Regression test: TTS synthesis must not block the event loop.
+Runs 20 concurrent syntheses against a local stub of the (synchronous) ElevenLabs client
+and measures event-loop lag with a 10 ms ticker. The old path - iterating the blocking
+generator on the loop - is measured too for comparison.
+
+    python test_tts_event_loop.py
+"""
+import gc
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+os.environ["TTS_CACHE_ENABLED"] = "false"
+
+from app.services.elevenlabs_service import elevenlabs_service
+from app.services.tts_executor import tts_executor
+from app.services.metrics import metrics
+
+SYNTHESES = 20
+CHUNKS = 5
+CHUNK_DELAY = 0.03    # blocking network read per chunk in the stub
+TICK = 0.01
+MAX_LAG_MS = 50       # pass/fail threshold for the executor path
+
+
+class StubTextToSpeech:
+    """Blocks like the real synchronous client: time.sleep() between chunks"""
+
+    def _chunks(self, **kwargs):
+        for _ in range(CHUNKS):
+            time.sleep(CHUNK_DELAY)
+            yield b"\xff" * 512
+
+    def convert(self, **kwargs):
+        return self._chunks(**kwargs)
+
+    def convert_as_stream(self, **kwargs):
+        return self._chunks(**kwargs)
+
+
+class StubClient:
+    text_to_speech = StubTextToSpeech()
+
+
+async def measure_lag(work):
+    """Run work() while a ticker records how late each 10 ms wake-up is"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(TICK)
+            lags.append((time.perf_counter() - started - TICK) * 1000)
+
+    tick_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick_task
+    lags.sort()
+    return {
+        "max_lag_ms": round(lags[-1], 1) if lags else 0.0,
+        "p95_lag_ms": round(lags[int(0.95 * (len(lags) - 1))], 1) if lags else 0.0,
+        "elapsed_s": round(elapsed, 2)
+    }
+
+
+async def blocking_syntheses():
+    """What process_complete_sentence used to do: iterate the sync generator on the loop"""
+    async def one(index):
+        audio = elevenlabs_service.client.text_to_speech.convert(text=f"Sentence {index}")
+        return b"".join(audio)
+    await asyncio.gather(*(one(i) for i in range(SYNTHESES)))
+
+
+async def executor_syntheses():
+    async def one(index):
+        total = 0
+        async for chunk in elevenlabs_service.synthesize(f"Sentence {index}"):
+            total += len(chunk)
+        return total
+    sizes = await asyncio.gather(*(one(i) for i in range(SYNTHESES)))
+    assert all(size == CHUNKS * 512 for size in sizes), sizes
+
+
+async def main():
+    elevenlabs_service.client = StubClient()
+    elevenlabs_service.streaming = True
+    # A full collection over everything the app imported pauses the loop too - keep it out of the measurement
+    gc.collect()
+    gc.freeze()
+    print(f"🧪 {SYNTHESES} syntheses, {CHUNKS} chunks x {CHUNK_DELAY * 1000:.0f} ms each, "
+          f"{tts_executor.workers} TTS workers")
+
+    blocking = await measure_lag(blocking_syntheses)
+    print(f"⛔ On the event loop:   {blocking}")
+
+    offloaded = await measure_lag(executor_syntheses)
+    print(f"🧵 On the TTS executor: {offloaded}")
+    print(f"⏳ Queue wait: {metrics.summary('tts.executor.queue_wait_ms')}")
+
+    if offloaded["max_lag_ms"] > MAX_LAG_MS:
+        print(f"❌ Event loop lag {offloaded['max_lag_ms']} ms exceeds {MAX_LAG_MS} ms")
+        sys.exit(1)
+    print(f"✅ Event loop lag stays under {MAX_LAG_MS} ms while synthesizing")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,155 @@
+# test_turn_controller.py
+"""
+Behaviour tests for TurnController with stub turn handlers: sentences queued behind a running
+turn are merged, a barge-in while thinking carries the sentence over to the next turn, one
+while acting lets the database step finish, one while the client is still playing the reply
+stops playback, and close() cancels everything.
+
+    python test_turn_controller.py
+"""
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+from app.services import turn_controller
+from app.services.turn_controller import TurnController
+from checks import check, report
+
+
+class ClientState:
+    name = "CONNECTED"
+
+
+class RecordingWebSocket:
+    def __init__(self):
+        self.client_state = ClientState()
+        self.sent = []
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+class StubTurns:
+    """Turn handler that records its text, enters a phase and waits until released"""
+
+    def __init__(self, controller, phase=TurnController.THINKING, playback_ms=None):
+        self.controller = controller
+        self.phase = phase
+        self.playback_ms = playback_ms
+        self.handled = []
+        self.finished = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, text):
+        self.handled.append(text)
+        self.controller.set_phase(self.phase)
+        await self.release.wait()
+        if self.playback_ms is not None:
+            self.controller.start_playback(self.playback_ms)
+        self.finished.append(text)
+        self.controller.set_phase(TurnController.IDLE)
+
+
+def stops(websocket):
+    return [message["turn_id"] for message in websocket.sent if message["type"] == "stop_playback"]
+
+
+async def main():
+    results = []
+    turn_controller.PLAYBACK_GRACE_MS = 0
+
+    # Sentences committed while a turn runs are merged into one queued turn
+    controller = TurnController(RecordingWebSocket())
+    turns = StubTurns(controller)
+    controller.submit("I want to book", turns)
+    await asyncio.sleep(0.01)  # let the turn start
+    controller.submit("with doctor Chen", turns)
+    controller.submit("on Friday", turns)
+    turns.release.set()
+    await controller.drain()
+    results.append(check("Queued sentences are merged into the next turn",
+                         turns.handled == ["I want to book", "with doctor Chen on Friday"]
+                         and controller.counters["merged"] == 1, f"{turns.handled}, {controller.counters}"))
+
+    # Barge-in before the LLM answered: the turn is cancelled and its sentence carried over
+    websocket = RecordingWebSocket()
+    controller = TurnController(websocket)
+    turns = StubTurns(controller)
+    controller.submit("I need to cancel", turns)
+    await asyncio.sleep(0.01)  # let the turn start
+    interrupted = await controller.barge_in()
+    results.append(check("Barge-in while thinking cancels the turn and stops playback",
+                         interrupted and not controller.busy and turns.finished == [] and stops(websocket) == [1],
+                         f"{websocket.sent}"))
+    results.append(check("The cancelled sentence is carried over", controller.carry_over == "I need to cancel"))
+    turns.release.set()
+    controller.submit("appointment 123456", turns)
+    await controller.drain()
+    results.append(check("Carried-over sentence joins the next one",
+                         turns.handled[-1] == "I need to cancel appointment 123456" and controller.carry_over is None,
+                         f"{turns.handled}"))
+
+    # Barge-in during the database step: it finishes, but its reply is not spoken
+    websocket = RecordingWebSocket()
+    controller = TurnController(websocket)
+    turns = StubTurns(controller, phase=TurnController.ACTING)
+    controller.submit("book it", turns)
+    await asyncio.sleep(0.01)  # let the turn start
+    interrupted = await controller.barge_in()
+    results.append(check("Barge-in while acting marks the turn interrupted without cancelling it",
+                         interrupted and controller.interrupted and controller.busy, f"{controller.counters}"))
+    turns.release.set()
+    await controller.drain()
+    results.append(check("The database step still completes", turns.finished == ["book it"]))
+
+    # The reply was sent in full but the client is still playing it
+    websocket = RecordingWebSocket()
+    controller = TurnController(websocket)
+    turns = StubTurns(controller, playback_ms=5000)
+    turns.release.set()
+    controller.submit("what time is my appointment", turns)
+    await controller.drain()
+    results.append(check("Session stays SPEAKING after the turn while the reply plays",
+                         not controller.busy and controller.playing and controller.phase == TurnController.SPEAKING,
+                         controller.phase))
+    interrupted = await controller.barge_in()
+    results.append(check("Barge-in during playback stops the client's playback",
+                         interrupted and stops(websocket) == [1] and not controller.playing
+                         and controller.phase == TurnController.IDLE, f"{websocket.sent}"))
+    results.append(check("No second barge-in once playback was stopped", not await controller.barge_in()))
+
+    # Client ack ends playback early
+    controller.start_playback(5000)
+    controller.playback_ended()
+    results.append(check("playback_ended ack returns the session to IDLE",
+                         controller.phase == TurnController.IDLE and not await controller.barge_in()
+                         and controller.counters["playback_acks"] == 1, f"{controller.counters}"))
+
+    # Without an ack playback ends once the audio duration has elapsed
+    controller.start_playback(30)
+    playing = controller.playing
+    await asyncio.sleep(0.06)
+    results.append(check("Playback ends after the audio duration without an ack",
+                         playing and not controller.playing and not await controller.barge_in()))
+
+    # Disconnect: running and queued turns are cancelled, later sentences ignored
+    controller = TurnController(RecordingWebSocket())
+    turns = StubTurns(controller)
+    controller.submit("first", turns)
+    await asyncio.sleep(0.01)  # let the turn start
+    controller.submit("second", turns)
+    await controller.close()
+    controller.submit("third", turns)
+    await asyncio.sleep(0.01)  # a turn submitted after close() must never start
+    results.append(check("close() cancels the running turn and drops the queued one",
+                         not controller.busy and controller.worker_task.done() and turns.handled == ["first"]
+                         and controller.counters["cancelled"] == 2 and controller.phase == TurnController.IDLE,
+                         f"{turns.handled}, {controller.counters}"))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,109 @@
+# test_vad.py
+"""
+Behaviour tests for VoiceActivityDetector on synthetic 16 kHz linear16 audio:
+energy and zero-crossing gating, hangover after speech, pre-roll before it, and the same
+output whatever chunk sizes the client sends.
+
+    python test_vad.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '.'))
+
+import numpy as np
+from app.services.vad import VoiceActivityDetector, FRAME_SAMPLES, FRAME_BYTES, SAMPLE_RATE
+from checks import check, report
+
+HANGOVER_FRAMES = 10
+PREROLL_FRAMES = 5
+
+
+def silence(frames):
+    return np.zeros(frames * FRAME_SAMPLES, dtype=np.int16)
+
+
+def tone(frames, dbfs=-20.0, hz=200.0):
+    """Voiced-like signal: loud, few zero crossings"""
+    t = np.arange(frames * FRAME_SAMPLES) / SAMPLE_RATE
+    return (np.sin(2 * np.pi * hz * t) * 32767 * 10 ** (dbfs / 20)).astype(np.int16)
+
+
+def hiss(frames, dbfs=-45.0, seed=1):
+    """Background noise: above the energy floor but crossing zero on most samples"""
+    rng = np.random.default_rng(seed)
+    rms = 32767 * 10 ** (dbfs / 20)
+    return np.clip(rng.normal(0, rms, frames * FRAME_SAMPLES), -32768, 32767).astype(np.int16)
+
+
+def detector():
+    return VoiceActivityDetector(hangover_ms=HANGOVER_FRAMES * 20, preroll_ms=PREROLL_FRAMES * 20)
+
+
+def frames_of(audio: np.ndarray, start: int, end: int) -> bytes:
+    return audio[start * FRAME_SAMPLES:end * FRAME_SAMPLES].tobytes()
+
+
+def feed(vad, audio: bytes, chunk_bytes: int) -> bytes:
+    return b"".join(vad.process(audio[i:i + chunk_bytes]) for i in range(0, len(audio), chunk_bytes))
+
+
+def main():
+    results = []
+
+    vad = detector()
+    out = vad.process(silence(100).tobytes())
+    results.append(check("Silence is not forwarded", out == b"", f"{len(out)} bytes"))
+
+    vad = detector()
+    out = vad.process(hiss(100).tobytes())
+    results.append(check("Low-level hiss (high zero-crossing rate) is gated", len(out) == 0,
+                         f"{len(out) // FRAME_BYTES} frames forwarded"))
+
+    # 20 frames silence, 10 frames speech, 30 frames silence
+    audio = np.concatenate([silence(20), tone(10), silence(30)])
+    vad = detector()
+    out = vad.process(audio.tobytes())
+    expected = frames_of(audio, 20 - PREROLL_FRAMES, 30 + HANGOVER_FRAMES)
+    results.append(check("Speech is forwarded with pre-roll before and hangover after", out == expected,
+                         f"{len(out) // FRAME_BYTES} frames, expected {len(expected) // FRAME_BYTES}"))
+
+    # Same audio in odd-sized chunks (partial frames carried over) - identical output
+    for chunk_ms in (7, 37, 100, 233, 333, 500):
+        vad = detector()
+        chunked = feed(vad, audio.tobytes(), SAMPLE_RATE * 2 * chunk_ms // 1000 + 1)
+        results.append(check(f"Chunks of ~{chunk_ms} ms give the same output", chunked == expected,
+                             f"{len(chunked) // FRAME_BYTES} frames"))
+
+    # Speech at the very top of a chunk: pre-roll comes from the frames held back from the last chunk
+    vad = detector()
+    first = vad.process(silence(20).tobytes())
+    second = vad.process(tone(10).tobytes())
+    results.append(check("Pre-roll is carried across chunks", first == b"" and
+                         second == silence(PREROLL_FRAMES).tobytes() + tone(10).tobytes()))
+
+    # Hangover runs on into the following chunks, then stops
+    third = vad.process(silence(4).tobytes())
+    fourth = vad.process(silence(20).tobytes())
+    results.append(check("Hangover continues across chunks and then stops",
+                         len(third) == 4 * FRAME_BYTES and len(fourth) == (HANGOVER_FRAMES - 4) * FRAME_BYTES,
+                         f"{len(third) // FRAME_BYTES} + {len(fourth) // FRAME_BYTES} frames"))
+
+    # Speech over steady hiss still gets through
+    noisy = np.concatenate([hiss(50), tone(10) + hiss(10, seed=2), hiss(50, seed=3)])
+    vad = detector()
+    out = vad.process(noisy.tobytes())
+    forwarded = len(out) // FRAME_BYTES
+    results.append(check("Speech over background hiss is forwarded, the hiss is not",
+                         forwarded == PREROLL_FRAMES + 10 + HANGOVER_FRAMES, f"{forwarded} frames"))
+
+    stats = vad.stats()
+    results.append(check("Stats report received vs forwarded audio",
+                         stats["audio_seconds_received"] == round(len(noisy) / SAMPLE_RATE, 2) and stats["savings"] > 0.7,
+                         str(stats)))
+
+    return report(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -43,7 +43,7 @@ const StatusIndicator = ({ label, status, message, icon }) => {
 };
 
 // Enhanced Transcript Display Component
-const TranscriptDisplay = ({ interimText, userMessages, aiResponses, onClear }) => {
+const TranscriptDisplay = ({ interimText, userMessages, aiResponses, draftResponse, onClear }) => {
   const userBoxRef = useRef(null);
   const aiBoxRef = useRef(null);
 
@@ -57,7 +57,7 @@ const TranscriptDisplay = ({ interimText, userMessages, aiResponses, onClear })
     if (aiBoxRef.current) {
       aiBoxRef.current.scrollTop = aiBoxRef.current.scrollHeight;
     }
-  }, [aiResponses]);
+  }, [aiResponses, draftResponse]);
 
   return (
     <div className="mt-8">
@@ -135,6 +135,11 @@ const TranscriptDisplay = ({ interimText, userMessages, aiResponses, onClear })
                 </div>
               </div>
             )}
+            {draftResponse && (
+              <div className="mt-3 p-3 text-emerald-700 italic opacity-80 text-sm whitespace-pre-wrap bg-emerald-100 rounded-lg border border-emerald-200">
+                {draftResponse}
+              </div>
+            )}
           </div>
         </div>
       </div>
@@ -149,6 +154,7 @@ const DocTalkApp = () => {
   const [interimText, setInterimText] = useState('');
   const [userMessages, setUserMessages] = useState([]);
   const [aiResponses, setAiResponses] = useState([]);
+  const [draftResponse, setDraftResponse] = useState('');
   const [backendStatus, setBackendStatus] = useState({ status: 'disconnected', message: 'Checking...' });
   const [websocketStatus, setWebsocketStatus] = useState({ status: 'disconnected', message: 'Disconnected' });
   const [microphoneStatus, setMicrophoneStatus] = useState({ status: 'disconnected', message: 'Not active' });
@@ -156,9 +162,12 @@ const DocTalkApp = () => {
 
   // Refs for audio handling
   const socketRef = useRef(null);
+  // Interim transcript lines by message number, for transcript_delta (0 = empty line)
+  const transcriptLinesRef = useRef({ 0: '' });
   const audioStreamRef = useRef(null);
   const audioContextRef = useRef(null);
   const processorRef = useRef(null);
+  const speechPlayerRef = useRef(null);
 
   // Test backend connection
   const testBackendConnection = async () => {
@@ -185,13 +194,121 @@ const DocTalkApp = () => {
     return int16Array;
   };
 
+  // Tell the server the reply finished playing - until then new speech barges in
+  const sendPlaybackEnded = () => {
+    if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
+      socketRef.current.send(JSON.stringify({ type: 'playback_ended' }));
+    }
+  };
+
+  // Streaming speech playback - MP3 chunks are appended to a MediaSource as they arrive
+  const startSpeechPlayback = () => {
+    stopSpeechPlayback();
+    const player = { pending: [], chunks: [], ended: false, mediaSource: null, sourceBuffer: null, audio: null, url: null };
+
+    if (window.MediaSource && MediaSource.isTypeSupported('audio/mpeg')) {
+      player.mediaSource = new MediaSource();
+      player.url = URL.createObjectURL(player.mediaSource);
+      player.audio = new Audio(player.url);
+      player.mediaSource.addEventListener('sourceopen', () => {
+        player.sourceBuffer = player.mediaSource.addSourceBuffer('audio/mpeg');
+        player.sourceBuffer.addEventListener('updateend', () => flushSpeechChunks(player));
+        flushSpeechChunks(player);
+      });
+      player.audio.onended = () => {
+        setIsPlayingAudio(false);
+        URL.revokeObjectURL(player.url);
+        sendPlaybackEnded();
+      };
+      player.audio.onerror = () => {
+        setIsPlayingAudio(false);
+      };
+      player.audio.play().catch(() => setIsPlayingAudio(false));
+    }
+
+    speechPlayerRef.current = player;
+    setIsPlayingAudio(true);
+  };
+
+  const flushSpeechChunks = (player) => {
+    const { mediaSource, sourceBuffer } = player;
+    if (!sourceBuffer || sourceBuffer.updating || mediaSource.readyState !== 'open') return;
+
+    if (player.pending.length > 0) {
+      sourceBuffer.appendBuffer(player.pending.shift());
+    } else if (player.ended) {
+      mediaSource.endOfStream();
+    }
+  };
+
+  const appendSpeechChunk = (chunk) => {
+    const player = speechPlayerRef.current;
+    if (!player) {
+      // Playback was stopped (barge-in) - drop chunks still in flight
+      return;
+    }
+
+    if (player.mediaSource) {
+      player.pending.push(chunk);
+      flushSpeechChunks(player);
+    } else {
+      player.chunks.push(chunk);
+    }
+  };
+
+  const finishSpeechPlayback = () => {
+    const player = speechPlayerRef.current;
+    if (!player) {
+      setIsPlayingAudio(false);
+      return;
+    }
+
+    player.ended = true;
+    if (player.mediaSource) {
+      flushSpeechChunks(player);
+    } else {
+      // MediaSource not supported - play the collected chunks in one go
+      playAudioBlob(new Blob(player.chunks, { type: 'audio/mpeg' }));
+      speechPlayerRef.current = null;
+    }
+  };
+
+  const stopSpeechPlayback = () => {
+    const player = speechPlayerRef.current;
+    if (player && player.audio) {
+      player.audio.pause();
+      URL.revokeObjectURL(player.url);
+    }
+    speechPlayerRef.current = null;
+  };
+
+  const playAudioBlob = (blob) => {
+    setIsPlayingAudio(true);
+    const audioUrl = URL.createObjectURL(blob);
+    const audio = new Audio(audioUrl);
+
+    audio.onended = () => {
+      setIsPlayingAudio(false);
+      URL.revokeObjectURL(audioUrl);
+      sendPlaybackEnded();
+    };
+
+    audio.onerror = () => {
+      setIsPlayingAudio(false);
+    };
+
+    audio.play();
+  };
+
   // Start recording function
   const startRecording = async () => {
     if (isRecording) return;
 
     setInterimText('');
+    transcriptLinesRef.current = { 0: '' };
     setUserMessages([]);
     setAiResponses([]);
+    setDraftResponse('');
 
     // Check backend connection first
     if (!await testBackendConnection()) {
@@ -219,6 +336,7 @@ const DocTalkApp = () => {
       setWebsocketStatus({ status: 'waiting', message: 'Connecting...' });
 
       socketRef.current = new WebSocket(wsUrl);
+      socketRef.current.binaryType = 'arraybuffer';
 
       socketRef.current.onopen = () => {
         setWebsocketStatus({ status: 'connected', message: 'Connected' });
@@ -244,22 +362,9 @@ const DocTalkApp = () => {
       };
 
       socketRef.current.onmessage = async (event) => {
-        if (event.data instanceof Blob) {
-          // Audio data from ElevenLabs
-          setIsPlayingAudio(true);
-          const audioUrl = URL.createObjectURL(event.data);
-          const audio = new Audio(audioUrl);
-          
-          audio.onended = () => {
-            setIsPlayingAudio(false);
-            URL.revokeObjectURL(audioUrl);
-          };
-          
-          audio.onerror = () => {
-            setIsPlayingAudio(false);
-          };
-          
-          audio.play();
+        if (event.data instanceof ArrayBuffer) {
+          // Audio chunk from ElevenLabs (announced by a speech_chunk message)
+          appendSpeechChunk(event.data);
         } else {
           // Text data (intent/transcript)
           try {
@@ -268,6 +373,10 @@ const DocTalkApp = () => {
             // Handle different message types
             switch(data.type) {
               case 'transcript':
+                if (data.is_final && data.seq !== undefined) {
+                  // A final starts a new interim line - the next deltas are based on it
+                  transcriptLinesRef.current = { [data.seq]: '' };
+                }
                 if (data.transcript) {
                   if (data.is_final) {
                     setUserMessages(prev => [...prev, data.transcript]);
@@ -278,18 +387,50 @@ const DocTalkApp = () => {
                 }
                 break;
 
+              case 'transcript_delta': {
+                // Interim update: keep the first `keep` characters of line `base` and append the new text
+                const base = transcriptLinesRef.current[data.base];
+                if (base === undefined) {
+                  break; // base never arrived - the next delta is built on a line we acked
+                }
+                const line = base.slice(0, data.keep) + data.text;
+                // Lines older than the base are never used again
+                const lines = {};
+                Object.keys(transcriptLinesRef.current)
+                  .filter(seq => Number(seq) >= data.base)
+                  .forEach(seq => { lines[seq] = transcriptLinesRef.current[seq]; });
+                lines[data.seq] = line;
+                transcriptLinesRef.current = lines;
+                setInterimText(line);
+                socketRef.current.send(JSON.stringify({ type: 'transcript_ack', seq: data.seq }));
+                break;
+              }
+
+              case 'response_delta':
+                // Reply text as the LLM generates it - replaced by the final intent message
+                setDraftResponse(prev => prev + data.text);
+                break;
+
               case 'intent':
+                setDraftResponse('');
                 if (data.processed_response) {
                   setAiResponses(prev => [...prev, data.processed_response]);
                 }
                 break;
 
               case 'speech_start':
-                setIsPlayingAudio(true);
+                startSpeechPlayback();
                 break;
 
               case 'speech_end':
+                finishSpeechPlayback();
+                break;
+
+              case 'stop_playback':
+                // Patient interrupted - drop the rest of the reply
+                stopSpeechPlayback();
                 setIsPlayingAudio(false);
+                setDraftResponse('');
                 break;
 
               default:
@@ -336,6 +477,7 @@ const DocTalkApp = () => {
       audioContextRef.current.close();
     }
 
+    stopSpeechPlayback();
     setIsRecording(false);
     setMicrophoneStatus({ status: 'disconnected', message: 'Not active' });
     setWebsocketStatus({ status: 'disconnected', message: 'Disconnected' });
@@ -347,6 +489,7 @@ const DocTalkApp = () => {
     setInterimText('');
     setUserMessages([]);
     setAiResponses([]);
+    setDraftResponse('');
   };
 
   // Test backend connection on component mount
@@ -407,6 +550,7 @@ const DocTalkApp = () => {
             interimText={interimText}
             userMessages={userMessages}
             aiResponses={aiResponses}
+            draftResponse={draftResponse}
             onClear={clearTranscript}
           />
         </div>